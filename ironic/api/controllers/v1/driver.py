@@ -173,7 +173,8 @@ class DriversController(rest.RestController):
         #              will break from a single-line doc string.
         #              This is a result of a bug in sphinxcontrib-pecanwsme
         # https://github.com/dreamhost/sphinxcontrib-pecanwsme/issues/8
-        driver_list = pecan.request.dbapi.get_active_driver_dict()
+        driver_list = pecan.request.dbapi.get_active_driver_dict(
+            use_slave=True)
         return DriverList.convert_with_links(driver_list)
 
     @wsme_pecan.wsexpose(Driver, wtypes.text)
@@ -184,7 +185,8 @@ class DriversController(rest.RestController):
         # this path must be exposed for Pecan to route any paths we might
         # choose to expose below it.
 
-        driver_dict = pecan.request.dbapi.get_active_driver_dict()
+        driver_dict = pecan.request.dbapi.get_active_driver_dict(
+            use_slave=True)
         for name, hosts in driver_dict.iteritems():
             if name == driver_name:
                 return Driver.convert_with_links(name, list(hosts))
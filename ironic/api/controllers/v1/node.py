@@ -707,7 +707,7 @@ class NodesController(rest.RestController):
 
             nodes = objects.Node.list(pecan.request.context, limit, marker_obj,
                                       sort_key=sort_key, sort_dir=sort_dir,
-                                      filters=filters)
+                                      filters=filters, use_slave=True)
 
         parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
         if associated:
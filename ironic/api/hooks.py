@@ -88,10 +88,20 @@ class ContextHook(hooks.PecanHook):
 
 
 class RPCHook(hooks.PecanHook):
-    """Attach the rpcapi object to the request so controllers can get to it."""
+    """Attach the rpcapi object to the request so controllers can get to it.
+
+    A single ConductorAPI instance, and with it the RPC client, serializer
+    and hash ring manager, is shared by all requests.
+
+    """
+    def __init__(self):
+        super(RPCHook, self).__init__()
+        self._rpcapi = None
 
     def before(self, state):
-        state.request.rpcapi = rpcapi.ConductorAPI()
+        if self._rpcapi is None:
+            self._rpcapi = rpcapi.ConductorAPI()
+        state.request.rpcapi = self._rpcapi
 
 
 class AdminAuthHook(hooks.PecanHook):
@@ -15,6 +15,7 @@
 #    under the License.
 
 
+import collections
 import functools
 import logging
 import os
@@ -34,6 +35,51 @@ from ironic.common.i18n import _LE
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
 
+# The images got from glance, in least recently used order. The keys are
+# (API version, endpoint, auth token, project id, image id) tuples: the API
+# versions return differently shaped images, an href may name another glance
+# than the configured one, and an image got with the credentials of one
+# request must not be returned to another one, which glance may deny access
+# to. The values are (cached_at, image)
+# tuples.
+_IMAGE_CACHE = collections.OrderedDict()
+
+
+def _get_cached_image(key):
+    """Returns the cached image of the given key, or None."""
+    entry = _IMAGE_CACHE.pop(key, None)
+    if entry is None:
+        return None
+
+    if time.time() - entry[0] > CONF.glance.image_metadata_cache_ttl:
+        return None
+
+    _IMAGE_CACHE[key] = entry
+    return entry[1]
+
+
+def _cache_image(key, image):
+    """Caches an image got from glance.
+
+    Only active images are cached, the checksum and the size of the other
+    ones are yet to change.
+    """
+    if (CONF.glance.image_metadata_cache_ttl <= 0 or
+            CONF.glance.image_metadata_cache_size <= 0 or
+            getattr(image, 'status', None) != 'active'):
+        return
+
+    _IMAGE_CACHE.pop(key, None)
+    _IMAGE_CACHE[key] = (time.time(), image)
+    while len(_IMAGE_CACHE) > CONF.glance.image_metadata_cache_size:
+        _IMAGE_CACHE.popitem(last=False)
+
+
+def _forget_image(image_id):
+    """Drops an image from the cache, as got by any request."""
+    for key in [key for key in _IMAGE_CACHE if key[-1] == image_id]:
+        del _IMAGE_CACHE[key]
+
 
 def _translate_image_exception(image_id, exc_value):
     if isinstance(exc_value, (exception.Forbidden,
@@ -187,7 +233,17 @@ class BaseImageService(object):
         (image_id, self.glance_host,
          self.glance_port, use_ssl) = service_utils.parse_image_ref(image_href)
 
-        image = self.call(method, image_id)
+        # The configured glance API servers all serve the same images
+        endpoint = None
+        if urlparse.urlparse(str(image_href)).scheme in ('http', 'https'):
+            endpoint = (self.glance_host, self.glance_port, use_ssl)
+        cache_key = (str(self.version), endpoint,
+                     getattr(self.context, 'auth_token', None),
+                     getattr(self.context, 'project_id', None), image_id)
+        image = _get_cached_image(cache_key)
+        if image is None:
+            image = self.call(method, image_id)
+            _cache_image(cache_key, image)
 
         if not service_utils.is_image_available(self.context, image):
             raise exception.ImageNotFound(image_id=image_id)
@@ -256,6 +312,7 @@ class BaseImageService(object):
         """
         (image_id, self.glance_host,
          self.glance_port, use_ssl) = service_utils.parse_image_ref(image_id)
+        _forget_image(image_id)
         if image_meta:
             image_meta = service_utils.translate_to_glance(image_meta)
         else:
@@ -291,4 +348,5 @@ class BaseImageService(object):
         (image_id, glance_host,
          glance_port, use_ssl) = service_utils.parse_image_ref(image_id)
 
+        _forget_image(image_id)
         self.call(method, image_id)
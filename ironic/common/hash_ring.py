@@ -16,6 +16,7 @@
 import bisect
 import hashlib
 import threading
+import time
 
 from oslo.config import cfg
 
@@ -46,6 +47,16 @@ hash_opts = [
                     'conductor services to prepare deployment environments '
                     'and potentially allow the Ironic cluster to recover '
                     'more quickly if a conductor instance is terminated.'),
+    cfg.IntOpt('hash_ring_reset_interval',
+               default=10,
+               help='Interval (in seconds) after which the cached hash '
+                    'rings are rebuilt from the list of active conductors. '
+                    'Rings are also rebuilt whenever a lookup fails for a '
+                    'driver which is not in the cached rings. Conductors '
+                    'only join or leave the list of active conductors as '
+                    'they heart beat, so this should not exceed '
+                    '[conductor]heartbeat_interval, whose default it '
+                    'matches.'),
 ]
 
 CONF = cfg.CONF
@@ -159,6 +170,7 @@ class HashRing(object):
 
 class HashRingManager(object):
     _hash_rings = None
+    _updated_at = 0
     _lock = threading.Lock()
 
     def __init__(self):
@@ -166,14 +178,16 @@ class HashRingManager(object):
 
     @property
     def ring(self):
+        limit = time.time() - CONF.hash_ring_reset_interval
         # Hot path, no lock
-        if self._hash_rings is not None:
+        if self._hash_rings is not None and self._updated_at >= limit:
             return self._hash_rings
 
         with self._lock:
-            if self._hash_rings is None:
+            if self._hash_rings is None or self._updated_at < limit:
                 rings = self._load_hash_rings()
                 self.__class__._hash_rings = rings
+                self.__class__._updated_at = time.time()
             return self._hash_rings
 
     def _load_hash_rings(self):
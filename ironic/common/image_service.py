@@ -46,6 +46,16 @@ glance_opts = [
                default='keystone',
                help='Default protocol to use when connecting to glance. '
                'Set to https for SSL.'),
+    cfg.IntOpt('image_metadata_cache_ttl',
+               default=60,
+               help='Seconds the metadata of active images got from glance '
+                    'is cached by the conductor. Changes to the images made '
+                    'outside of ironic are seen after at most this time. '
+                    'Set to 0 to disable the cache.'),
+    cfg.IntOpt('image_metadata_cache_size',
+               default=1000,
+               help='Maximum number of images whose metadata is cached. '
+                    'The least recently used entries are evicted first.'),
 ]
 
 
@@ -32,6 +32,7 @@ from ironic.common.i18n import _LE
 from ironic.common import image_service as service
 from ironic.common import paths
 from ironic.common import utils
+from ironic.common import vfat
 from ironic.openstack.common import fileutils
 from ironic.openstack.common import imageutils
 from ironic.openstack.common import log as logging
@@ -84,10 +85,9 @@ def create_vfat_image(output_file, files_info=None, parameters=None,
                       parameters_file='parameters.txt', fs_size_kib=100):
     """Creates the fat fs image on the desired file.
 
-    This method copies the given files to a root directory (optional),
-    writes the parameters specified to the parameters file within the
-    root directory (optional), and then creates a vfat image of the root
-    directory.
+    This method writes a vfat image containing the given files (optional)
+    and a parameters file with the parameters specified (optional). The
+    image is written in-process, without mounting it.
 
     :param output_file: The path to the file where the fat fs image needs
         to be created.
@@ -100,44 +100,29 @@ def create_vfat_image(output_file, files_info=None, parameters=None,
     :param parameters: A dict containing key-value pairs of parameters.
     :param parameters_file: The filename for the parameters file.
     :param fs_size_kib: size of the vfat filesystem in KiB.
-    :raises: ImageCreationFailed, if image creation failed while doing any
-        of filesystem manipulation activities like creating dirs, mounting,
-        creating filesystem, copying files, etc.
+    :raises: ImageCreationFailed, if image creation failed while reading
+        the files to copy, writing the image or if the files do not fit in
+        the image.
     """
     try:
-        utils.dd('/dev/zero', output_file, 'count=1', "bs=%dKiB" % fs_size_kib)
-    except processutils.ProcessExecutionError as e:
+        files = {}
+        if files_info:
+            for src_file, path in files_info.items():
+                with open(src_file, 'rb') as fileobj:
+                    files[path] = fileobj.read()
+
+        if parameters:
+            params_list = ['%(key)s=%(val)s' % {'key': k, 'val': v}
+                       for k, v in parameters.items()]
+            files[parameters_file] = '\n'.join(params_list)
+
+        with open(output_file, 'wb') as fileobj:
+            vfat.create_image(fileobj, files, fs_size_kib)
+
+    except (IOError, OSError, ValueError) as e:
+        LOG.exception(_LE("vfat image creation failed. Error: %s"), e)
         raise exception.ImageCreationFailed(image_type='vfat', error=e)
 
-    with utils.tempdir() as tmpdir:
-
-        try:
-            utils.mkfs('vfat', output_file)
-            utils.mount(output_file, tmpdir, '-o', 'umask=0')
-        except processutils.ProcessExecutionError as e:
-            raise exception.ImageCreationFailed(image_type='vfat', error=e)
-
-        try:
-            if files_info:
-                _create_root_fs(tmpdir, files_info)
-
-            if parameters:
-                parameters_file = os.path.join(tmpdir, parameters_file)
-                params_list = ['%(key)s=%(val)s' % {'key': k, 'val': v}
-                           for k, v in parameters.items()]
-                file_contents = '\n'.join(params_list)
-                utils.write_to_file(parameters_file, file_contents)
-
-        except Exception as e:
-            LOG.exception(_LE("vfat image creation failed. Error: %s"), e)
-            raise exception.ImageCreationFailed(image_type='vfat', error=e)
-
-        finally:
-            try:
-                utils.umount(tmpdir)
-            except processutils.ProcessExecutionError as e:
-                raise exception.ImageCreationFailed(image_type='vfat', error=e)
-
 
 def _generate_isolinux_cfg(kernel_params):
     """Generates a isolinux configuration file.
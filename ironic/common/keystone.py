@@ -12,10 +12,12 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+from keystoneclient import access
 from keystoneclient import exceptions as ksexception
 # NOTE(deva): import auth_token so oslo.config pulls in keystone_authtoken
 from keystonemiddleware import auth_token  # noqa
 from oslo.config import cfg
+from oslo.utils import timeutils
 from six.moves.urllib import parse
 
 from ironic.common import exception
@@ -23,6 +25,14 @@ from ironic.common.i18n import _
 
 CONF = cfg.CONF
 
+# The Keystone client authenticated with the admin credentials, by the
+# configuration it has been created from. It is reused, along with its
+# token, until the token is about to expire.
+_ADMIN_CLIENT = {}
+# The endpoints found in the service catalog of the admin client, by
+# (service_type, endpoint_type).
+_SERVICE_URLS = {}
+
 
 def _is_apiv3(auth_url, auth_version):
     """Checks if V3 version of API is being used or not.
@@ -67,6 +77,30 @@ def _get_ksclient(token=None):
                                           ' %s') % err)
 
 
+def _get_admin_ksclient(duration=None):
+    """Returns a Keystone client authenticated as the admin user.
+
+    The client is cached, a new one is created when the token of the cached
+    one expires within the given duration.
+
+    :param duration: the time in seconds the token of the client should
+        still be valid for. Defaults to keystoneclient's stale duration.
+    """
+    key = (CONF.keystone_authtoken.auth_uri,
+           CONF.keystone_authtoken.auth_version,
+           CONF.keystone_authtoken.admin_user,
+           CONF.keystone_authtoken.admin_password,
+           CONF.keystone_authtoken.admin_tenant_name)
+    ksclient = _ADMIN_CLIENT.get(key)
+    if (ksclient is None or
+            ksclient.auth_ref.will_expire_soon(stale_duration=duration)):
+        ksclient = _get_ksclient()
+        _ADMIN_CLIENT.clear()
+        _SERVICE_URLS.clear()
+        _ADMIN_CLIENT[key] = ksclient
+    return ksclient
+
+
 def get_keystone_url(auth_url, auth_version):
     """Gives an http/https url to contact keystone.
 
@@ -95,7 +129,10 @@ def get_service_url(service_type='baremetal', endpoint_type='internal'):
     :param endpoint_type: the type of endpoint for the service.
     :returns: an http/https url for the desired endpoint.
     """
-    ksclient = _get_ksclient()
+    ksclient = _get_admin_ksclient()
+    endpoint = _SERVICE_URLS.get((service_type, endpoint_type))
+    if endpoint:
+        return endpoint
 
     if not ksclient.has_service_catalog():
         raise exception.KeystoneFailure(_('No Keystone service catalog '
@@ -108,20 +145,38 @@ def get_service_url(service_type='baremetal', endpoint_type='internal'):
         raise exception.CatalogNotFound(service_type=service_type,
                                         endpoint_type=endpoint_type)
 
+    _SERVICE_URLS[(service_type, endpoint_type)] = endpoint
     return endpoint
 
 
-def get_admin_auth_token():
-    """Get an admin auth_token from the Keystone."""
-    ksclient = _get_ksclient()
+def get_admin_auth_token(duration=None):
+    """Get an admin auth_token from the Keystone.
+
+    The token is reused until it is about to expire.
+
+    :param duration: the time in seconds the token should still be valid
+        for. Defaults to keystoneclient's stale duration.
+    """
+    ksclient = _get_admin_ksclient(duration=duration)
     return ksclient.auth_token
 
 
 def token_expires_soon(token, duration=None):
     """Determines if token expiration is about to occur.
 
+    The expiry time of the cached admin token is already known, Keystone is
+    asked about any other token so that revoked tokens are not trusted.
+
     :param duration: time interval in seconds
     :returns: boolean : true if expiration is within the given duration
     """
-    ksclient = _get_ksclient(token=token)
-    return ksclient.auth_ref.will_expire_soon(stale_duration=duration)
+    for ksclient in _ADMIN_CLIENT.values():
+        if ksclient.auth_token == token:
+            break
+    else:
+        ksclient = _get_ksclient(token=token)
+
+    if duration is None:
+        duration = access.STALE_TOKEN_DURATION
+    expires = timeutils.normalize_time(ksclient.auth_ref.expires)
+    return timeutils.is_soon(expires, duration)
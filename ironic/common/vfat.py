@@ -0,0 +1,310 @@
+# Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Writer of small FAT12 filesystem images.
+
+The images are built in memory layout order and written sequentially to a
+file object, so neither root privileges nor external tools are needed to
+create them.
+"""
+
+import collections
+import struct
+import time
+
+import six
+
+from ironic.common.i18n import _
+
+SECTOR_SIZE = 512
+DIR_ENTRY_SIZE = 32
+ROOT_DIR_ENTRIES = 112
+RESERVED_SECTORS = 1
+NUM_FATS = 2
+MEDIA_DESCRIPTOR = 0xF8
+MAX_CLUSTERS = 4084
+MAX_SECTORS_PER_CLUSTER = 64
+
+ATTR_DIRECTORY = 0x10
+ATTR_ARCHIVE = 0x20
+ATTR_LONG_NAME = 0x0F
+
+_END_OF_CHAIN = 0xFFF
+_LFN_CHARS_PER_ENTRY = 13
+_SHORT_NAME_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+                              "!#$%&'()-@^_`{}~")
+
+_BOOT_SECTOR = struct.Struct('<3s8sHBHBHHBHHHIIBBBI11s8s')
+_DIR_ENTRY = struct.Struct('<11sBBBHHHHHHHI')
+_LFN_ENTRY = struct.Struct('<B10sBBB12sH4s')
+
+
+def _is_short_name(name):
+    """Tells whether name can be stored as is in a 8.3 directory entry."""
+    base, dot, ext = name.partition('.')
+    return (0 < len(base) <= 8 and len(ext) <= 3 and
+            (not dot or ext) and
+            all(c in _SHORT_NAME_CHARS for c in base + ext))
+
+
+def _pack_short_name(name):
+    base, dot, ext = name.partition('.')
+    return (base.ljust(8) + ext.ljust(3)).encode('ascii')
+
+
+def _get_short_name(name, used):
+    """Returns an unique 8.3 name for name among the used ones.
+
+    :param name: the name of the file.
+    :param used: the set of the 8.3 names already used in the directory.
+        The returned name is added to it.
+    :returns: a tuple (short_name, needs_long_name) where short_name is the
+        packed 11 bytes 8.3 name.
+    """
+    if _is_short_name(name) and _pack_short_name(name) not in used:
+        short_name = _pack_short_name(name)
+        used.add(short_name)
+        return short_name, False
+
+    cleaned = ''.join(c if c in _SHORT_NAME_CHARS or c == '.' else '_'
+                      for c in name.upper().replace(' ', '').lstrip('.'))
+    base, dot, ext = cleaned.rpartition('.')
+    if not dot:
+        base, ext = ext, ''
+    base = base.replace('.', '') or '_'
+    ext = ext[:3]
+
+    n = 1
+    while True:
+        tail = '~%d' % n
+        short_name = _pack_short_name(
+            base[:8 - len(tail)] + tail + ('.' + ext if ext else ''))
+        if short_name not in used:
+            used.add(short_name)
+            return short_name, True
+        n += 1
+
+
+def _short_name_checksum(short_name):
+    checksum = 0
+    for c in bytearray(short_name):
+        checksum = (((checksum & 1) << 7) + (checksum >> 1) + c) & 0xFF
+    return checksum
+
+
+def _long_name_entries(name, short_name):
+    """Returns the VFAT long name entries for name, in on-disk order."""
+    chars = six.text_type(name).encode('utf-16-le')
+    if len(chars) % (2 * _LFN_CHARS_PER_ENTRY):
+        chars += b'\x00\x00'
+    padding = -len(chars) % (2 * _LFN_CHARS_PER_ENTRY)
+    chars += b'\xff' * padding
+
+    checksum = _short_name_checksum(short_name)
+    count = len(chars) // (2 * _LFN_CHARS_PER_ENTRY)
+    entries = []
+    for i in range(count):
+        part = chars[i * 26:(i + 1) * 26]
+        order = i + 1
+        if order == count:
+            order |= 0x40
+        entries.append(_LFN_ENTRY.pack(order, part[:10], ATTR_LONG_NAME, 0,
+                                       checksum, part[10:22], 0, part[22:]))
+    entries.reverse()
+    return entries
+
+
+def _dir_entry(short_name, attributes, cluster, size, timestamp):
+    date = (((timestamp.tm_year - 1980) << 9) | (timestamp.tm_mon << 5) |
+            timestamp.tm_mday)
+    tm_time = ((timestamp.tm_hour << 11) | (timestamp.tm_min << 5) |
+               (min(timestamp.tm_sec, 59) // 2))
+    return _DIR_ENTRY.pack(short_name, attributes, 0, 0, tm_time, date, date,
+                           0, tm_time, date, cluster, size)
+
+
+class _Directory(object):
+    def __init__(self):
+        self.children = collections.OrderedDict()
+        self.cluster = 0
+        self.entries = []
+
+
+class _File(object):
+    def __init__(self, contents):
+        # The sizes written in the image are the sizes of the encoded
+        # contents, not their number of characters.
+        if isinstance(contents, six.text_type):
+            contents = contents.encode('utf-8')
+        self.contents = contents
+        self.cluster = 0
+
+
+def _build_tree(files):
+    root = _Directory()
+    for path in sorted(files):
+        parts = [part for part in path.split('/') if part]
+        if not parts:
+            raise ValueError(_("Invalid path %r in the vfat image.") % path)
+        directory = root
+        for part in parts[:-1]:
+            directory = directory.children.setdefault(part, _Directory())
+            if not isinstance(directory, _Directory):
+                raise ValueError(_("%r is both a file and a directory in "
+                                   "the vfat image.") % part)
+        if parts[-1] in directory.children:
+            raise ValueError(_("Duplicate path %r in the vfat image.") % path)
+        directory.children[parts[-1]] = _File(files[path])
+    return root
+
+
+def _get_geometry(total_sectors):
+    """Returns (sectors_per_cluster, fat_sectors, clusters) for a size."""
+    root_dir_sectors = ROOT_DIR_ENTRIES * DIR_ENTRY_SIZE // SECTOR_SIZE
+    sectors_per_cluster = 1
+    while True:
+        fat_sectors = 1
+        while True:
+            data_sectors = (total_sectors - RESERVED_SECTORS -
+                            root_dir_sectors - NUM_FATS * fat_sectors)
+            clusters = data_sectors // sectors_per_cluster
+            needed = ((clusters + 2) * 3 + 1) // 2
+            needed = (needed + SECTOR_SIZE - 1) // SECTOR_SIZE
+            if needed <= fat_sectors:
+                break
+            fat_sectors = needed
+        if clusters <= MAX_CLUSTERS:
+            break
+        if sectors_per_cluster == MAX_SECTORS_PER_CLUSTER:
+            raise ValueError(_("The vfat image is too large for FAT12."))
+        sectors_per_cluster *= 2
+
+    if clusters < 1:
+        raise ValueError(_("The vfat image is too small."))
+    return sectors_per_cluster, fat_sectors, clusters
+
+
+def create_image(fileobj, files, size_kib, label='NO NAME'):
+    """Writes a FAT12 filesystem image containing the given files.
+
+    :param fileobj: the file object to write the image to.
+    :param files: a dict mapping the paths of the files within the image,
+        like 'dir/file.txt', to their contents. Text contents are encoded
+        to UTF-8.
+    :param size_kib: the size of the image in KiB.
+    :param label: the volume label, up to 11 characters.
+    :raises: ValueError, if the files do not fit in the image or the size is
+        not suitable for FAT12.
+    """
+    total_sectors = size_kib * 1024 // SECTOR_SIZE
+    sectors_per_cluster, fat_sectors, clusters = _get_geometry(total_sectors)
+    cluster_size = sectors_per_cluster * SECTOR_SIZE
+    timestamp = time.localtime()
+
+    root = _build_tree(files)
+
+    # Allocate the clusters, in the order the data is written.
+    data = []
+    fat = [0xF00 | MEDIA_DESCRIPTOR, _END_OF_CHAIN]
+
+    def allocate(size):
+        count = (size + cluster_size - 1) // cluster_size
+        if not count:
+            return 0
+        first = len(fat)
+        fat.extend(range(first + 1, first + count))
+        fat.append(_END_OF_CHAIN)
+        if len(fat) - 2 > clusters:
+            raise ValueError(_("The files do not fit in the %d KiB vfat "
+                               "image.") % size_kib)
+        return first
+
+    def layout(directory, parent_cluster, is_root):
+        used = set()
+        named = []
+        for name, child in directory.children.items():
+            short_name, needs_long_name = _get_short_name(name, used)
+            entries = (_long_name_entries(name, short_name)
+                       if needs_long_name else [])
+            named.append((short_name, entries, child))
+
+        size = DIR_ENTRY_SIZE * (sum(len(e) + 1 for s, e, c in named) +
+                                 (0 if is_root else 2))
+        if is_root:
+            if size > ROOT_DIR_ENTRIES * DIR_ENTRY_SIZE:
+                raise ValueError(_("Too many files in the root directory "
+                                   "of the vfat image."))
+        else:
+            directory.cluster = allocate(size)
+            data.append((directory, size))
+            directory.entries.append(_dir_entry(b'.'.ljust(11),
+                ATTR_DIRECTORY, directory.cluster, 0, timestamp))
+            directory.entries.append(_dir_entry(b'..'.ljust(11),
+                ATTR_DIRECTORY, parent_cluster, 0, timestamp))
+
+        for short_name, entries, child in named:
+            if isinstance(child, _Directory):
+                layout(child, directory.cluster, False)
+                entry = _dir_entry(short_name, ATTR_DIRECTORY, child.cluster,
+                                   0, timestamp)
+            else:
+                child.cluster = allocate(len(child.contents))
+                data.append((child, len(child.contents)))
+                entry = _dir_entry(short_name, ATTR_ARCHIVE, child.cluster,
+                                   len(child.contents), timestamp)
+            directory.entries.extend(entries)
+            directory.entries.append(entry)
+
+    layout(root, 0, True)
+
+    volume_id = int(time.time()) & 0xFFFFFFFF
+    boot_sector = _BOOT_SECTOR.pack(
+        b'\xeb\x3c\x90', b'IRONIC  ', SECTOR_SIZE, sectors_per_cluster,
+        RESERVED_SECTORS, NUM_FATS, ROOT_DIR_ENTRIES,
+        total_sectors if total_sectors < 0x10000 else 0, MEDIA_DESCRIPTOR,
+        fat_sectors, 32, 64, 0, total_sectors if total_sectors >= 0x10000
+        else 0, 0x80, 0, 0x29, volume_id,
+        label.upper().ljust(11)[:11].encode('ascii'), b'FAT12   ')
+    fileobj.write(boot_sector.ljust(SECTOR_SIZE - 2, b'\x00') + b'\x55\xaa')
+    written = SECTOR_SIZE * RESERVED_SECTORS
+
+    if len(fat) % 2:
+        fat.append(0)
+    fat_bytes = bytearray()
+    for i in range(0, len(fat), 2):
+        fat_bytes.extend((fat[i] & 0xFF,
+                          (fat[i] >> 8) | ((fat[i + 1] & 0xF) << 4),
+                          fat[i + 1] >> 4))
+    fat_bytes = bytes(fat_bytes).ljust(fat_sectors * SECTOR_SIZE, b'\x00')
+    for i in range(NUM_FATS):
+        fileobj.write(fat_bytes)
+        written += len(fat_bytes)
+
+    root_dir = b''.join(root.entries).ljust(ROOT_DIR_ENTRIES * DIR_ENTRY_SIZE,
+                                            b'\x00')
+    fileobj.write(root_dir)
+    written += len(root_dir)
+
+    for item, size in data:
+        if isinstance(item, _Directory):
+            contents = b''.join(item.entries)
+        else:
+            contents = item.contents
+        padding = -size % cluster_size
+        fileobj.write(contents)
+        fileobj.write(b'\x00' * padding)
+        written += size + padding
+
+    fileobj.write(b'\x00' * (total_sectors * SECTOR_SIZE - written))
@@ -44,14 +44,16 @@ a change, etc.
 import collections
 import datetime
 import threading
+import time
 
 import eventlet
 from eventlet import greenpool
-from oslo.concurrency import lockutils
 from oslo.config import cfg
 from oslo.db import exception as db_exception
 from oslo import messaging
 from oslo.utils import excutils
+from oslo.utils import timeutils
+from six.moves import queue
 
 from ironic.common import dhcp_factory
 from ironic.common import driver_factory
@@ -69,13 +71,17 @@ from ironic.common import utils as ironic_utils
 from ironic.conductor import task_manager
 from ironic.conductor import utils
 from ironic.db import api as dbapi
+from ironic.drivers import base as drivers_base
 from ironic import objects
 from ironic.openstack.common import context as ironic_context
 from ironic.openstack.common import log
 from ironic.openstack.common import periodic_task
 
 MANAGER_TOPIC = 'ironic.conductor_manager'
-WORKER_SPAWN_lOCK = "conductor_worker_spawn"
+# How often a request waiting for a free worker checks the pool, in seconds.
+WORKER_WAIT_POLL_INTERVAL = 0.1
+# How many node IDs are looked up per query when taking over nodes.
+TAKEOVER_IDS_PER_QUERY = 500
 
 LOG = log.getLogger(__name__)
 
@@ -109,6 +115,20 @@ conductor_opts = [
                         'state be set to the state recorded in the database '
                         '(True) or should the database be updated based on '
                         'the hardware state (False).'),
+        cfg.BoolOpt('sync_power_state_adaptive',
+                    default=False,
+                    help='Whether to sync the power state of the nodes '
+                         'whose power state has not changed less often. '
+                         'The interval between syncs of such a node doubles '
+                         'after each sync, up to '
+                         'sync_power_state_max_interval. It falls back to '
+                         'sync_power_state_interval when the node is '
+                         'updated or its power state changes.'),
+        cfg.IntOpt('sync_power_state_max_interval',
+                   default=600,
+                   help='With sync_power_state_adaptive, the maximum '
+                        'interval between syncs of the power state of a '
+                        'node, in seconds.'),
         cfg.IntOpt('power_state_sync_max_retries',
                    default=3,
                    help='During sync_power_state failures, limit the '
@@ -123,6 +143,18 @@ conductor_opts = [
         cfg.IntOpt('workers_pool_size',
                    default=100,
                    help='The size of the workers greenthread pool.'),
+        cfg.IntOpt('periodic_workers_pool_size',
+                   default=50,
+                   help='The maximum number of workers of the workers '
+                        'greenthread pool that periodic tasks can use at '
+                        'once. The rest of the pool is kept for the '
+                        'requests of users.'),
+        cfg.IntOpt('workers_pool_wait_timeout',
+                   default=5,
+                   help='The time in seconds a request waits for a worker '
+                        'to free up when the workers greenthread pool is '
+                        'full, before it is rejected. Set it to 0 to reject '
+                        'requests immediately. Periodic tasks never wait.'),
         cfg.IntOpt('node_locked_retry_attempts',
                    default=3,
                    help='Number of attempts to grab a node lock.'),
@@ -137,6 +169,17 @@ conductor_opts = [
                    default=600,
                    help='Seconds between conductor sending sensor data message'
                         ' to ceilometer via the notification bus.'),
+        cfg.IntOpt('send_sensor_data_workers',
+                   default=4,
+                   help='The maximum number of workers that can be started '
+                        'simultaneously to get and send the sensor data of '
+                        'nodes.'),
+        cfg.IntOpt('send_sensor_data_wait_timeout',
+                   default=300,
+                   help='The time in seconds to wait for the sensor data of '
+                        'all nodes to be sent. Nodes whose sensor data has '
+                        'not been got by then are skipped until the next '
+                        'run. Should be less than send_sensor_data_interval.'),
         cfg.ListOpt('send_sensor_data_types',
                    default=['ALL'],
                    help='List of comma separated metric types which need to be'
@@ -152,17 +195,37 @@ conductor_opts = [
                         'conductor will check for nodes that it should '
                         '"take over". Set it to a negative value to disable '
                         'the check entirely.'),
+        cfg.BoolOpt('handoff_on_shutdown',
+                    default=False,
+                    help='When stopping, have the conductors the nodes of '
+                         'this conductor are mapped to without it take them '
+                         'over, before unregistering. This spares the nodes '
+                         'the time until the other conductors notice it is '
+                         'gone.'),
+        cfg.IntOpt('handoff_timeout',
+                   default=600,
+                   help='The time in seconds to wait for the nodes to be '
+                        'taken over when stopping with handoff_on_shutdown.'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(conductor_opts, 'conductor')
 
 
+def _get_takeover_group(driver, driver_info, instance_info):
+    """Get a key grouping the nodes using the same images to take over."""
+    deploy_images = tuple(sorted(
+        (key, str(value)) for key, value in (driver_info or {}).items()
+        if key.endswith(('deploy_kernel', 'deploy_ramdisk', 'deploy_iso'))))
+    return (driver, deploy_images,
+            str((instance_info or {}).get('image_source')))
+
+
 class ConductorManager(periodic_task.PeriodicTasks):
     """Ironic Conductor manager main class."""
 
     # NOTE(rloo): This must be in sync with rpcapi.ConductorAPI's.
-    RPC_API_VERSION = '1.21'
+    RPC_API_VERSION = '1.22'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -173,7 +236,19 @@ class ConductorManager(periodic_task.PeriodicTasks):
         self.host = host
         self.topic = topic
         self.power_state_sync_count = collections.defaultdict(int)
+        # When the power state of each node has been synced last, and the
+        # interval until the next sync, by node UUID.
+        self.power_state_sync_schedule = {}
         self.notifier = rpc.get_notifier()
+        # Each periodic task runs in its own greenthread, so that a slow
+        # task does not hold up the others. Their stats are only kept in
+        # memory, for the life of the conductor.
+        self.periodic_task_stats = {}
+        self._periodic_task_threads = {}
+        self._periodic_workers = set()
+        """The workers of the pool running for periodic tasks."""
+        self._periodic_tasks = [(name, self._periodic_task_runner(name, task))
+                                for name, task in self._periodic_tasks]
 
     def _get_driver(self, driver_name):
         """Get the driver.
@@ -232,6 +307,12 @@ class ConductorManager(periodic_task.PeriodicTasks):
                 self.del_host()
 
     def del_host(self):
+        self._stop_periodic_tasks()
+        if CONF.conductor.handoff_on_shutdown:
+            # Keep heartbeating meanwhile, or the other conductors would
+            # consider this one dead and race with the handoff to take its
+            # nodes over.
+            self._hand_off_nodes()
         self._keepalive_evt.set()
         try:
             # Inform the cluster that this conductor is shutting down.
@@ -245,7 +326,79 @@ class ConductorManager(periodic_task.PeriodicTasks):
 
     def periodic_tasks(self, context, raise_on_error=False):
         """Periodic tasks are run at pre-specified interval."""
-        return self.run_periodic_tasks(context, raise_on_error=raise_on_error)
+        threads = dict(self._periodic_task_threads)
+        idle = self.run_periodic_tasks(context, raise_on_error=raise_on_error)
+        if raise_on_error:
+            # The tasks run in their own greenthreads; wait for the ones
+            # started now so that their errors are raised here.
+            for task_name, thread in self._periodic_task_threads.items():
+                if threads.get(task_name) is not thread:
+                    error = thread.wait()
+                    if error is not None:
+                        raise error
+        return idle
+
+    def _stop_periodic_tasks(self):
+        """Stop the periodic tasks running in their greenthreads.
+
+        The workers of the pool started by the periodic tasks are killed
+        too. The GreenletExit raised in a worker unwinds its task manager,
+        which releases the node it holds.
+        """
+        for thread in self._periodic_task_threads.values():
+            thread.kill()
+        self._periodic_task_threads.clear()
+        for thread in list(self._periodic_workers):
+            thread.kill()
+
+    def _periodic_task_runner(self, task_name, task):
+        """Get a function starting a periodic task in a greenthread.
+
+        A run of the task is skipped while the previous one is not over.
+
+        :param task_name: the name of the periodic task.
+        :param task: the periodic task function.
+        :returns: a function taking the manager and the context, like the
+            periodic task.
+        """
+        stats = {'runs': 0, 'overruns': 0, 'last_run': None,
+                 'last_duration': None, 'max_duration': 0.0}
+        self.periodic_task_stats[task_name] = stats
+
+        def run(manager, context):
+            thread = self._periodic_task_threads.get(task_name)
+            if thread is not None and not thread.dead:
+                stats['overruns'] += 1
+                # The previous run may not have started yet
+                running_time = 0
+                if stats['last_run'] is not None:
+                    running_time = time.time() - stats['last_run']
+                LOG.warning(_LW("Periodic task %(task)s has been running "
+                                "for %(time)d seconds, skipping this run."),
+                            {'task': task_name, 'time': running_time})
+                return
+            self._periodic_task_threads[task_name] = eventlet.spawn(
+                self._run_periodic_task, task_name, task, context)
+
+        return run
+
+    def _run_periodic_task(self, task_name, task, context):
+        """Run a periodic task, returning the exception it raised if any."""
+        stats = self.periodic_task_stats[task_name]
+        stats['last_run'] = time.time()
+        try:
+            task(self, context)
+        except Exception as e:
+            LOG.exception(_LE("Error during periodic task %(task)s: %(e)s"),
+                          {'task': task_name, 'e': e})
+            return e
+        finally:
+            duration = time.time() - stats['last_run']
+            stats['runs'] += 1
+            stats['last_duration'] = duration
+            stats['max_duration'] = max(stats['max_duration'], duration)
+            LOG.debug("Periodic task %(task)s took %(time).2f seconds.",
+                      {'task': task_name, 'time': duration})
 
     @messaging.expected_exceptions(exception.InvalidParameterValue,
                                    exception.MissingParameterValue,
@@ -341,6 +494,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                   "The desired new state is %(state)s."
                   % {'node': node_id, 'state': new_state})
 
+        self._wait_for_free_worker()
         with task_manager.acquire(context, node_id, shared=False) as task:
             task.driver.power.validate(task)
             # Set the target_power_state and clear any last_error, since we're
@@ -415,6 +569,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                 "@passthru decorator."))
                 vendor_iface.validate(task, method=driver_method,
                                             **info)
+                self._wait_for_free_worker()
                 task.spawn_after(self._spawn_worker,
                                  vendor_iface.vendor_passthru, task,
                                  method=driver_method, **info)
@@ -444,6 +599,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
             is_async = vendor_opts['async']
             ret = None
             if is_async:
+                self._wait_for_free_worker()
                 task.spawn_after(self._spawn_worker, vendor_func, task, **info)
             else:
                 ret = vendor_func(task, **info)
@@ -535,6 +691,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
         driver.vendor.driver_validate(method=driver_method, **info)
 
         if is_async:
+            self._wait_for_free_worker()
             self._spawn_worker(vendor_func, context, **info)
         else:
             ret = vendor_func(context, **info)
@@ -646,6 +803,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
         """
         LOG.debug("RPC do_node_deploy called for node %s." % node_id)
 
+        self._wait_for_free_worker()
         # NOTE(comstud): If the _sync_power_states() periodic task happens
         # to have locked this node, we'll fail to acquire the lock. The
         # client should perhaps retry in this case unless we decide we
@@ -752,6 +910,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
         """
         LOG.debug("RPC do_node_tear_down called for node %s." % node_id)
 
+        self._wait_for_free_worker()
         with task_manager.acquire(context, node_id, shared=False) as task:
             node = task.node
             if node.provision_state not in [states.ACTIVE,
@@ -852,6 +1011,12 @@ class ConductorManager(periodic_task.PeriodicTasks):
         LOG.error(msg)
 
     def _do_sync_power_state(self, task):
+        """Sync the power state of a node with the recorded one.
+
+        :param task: a TaskManager instance with an exclusive lock.
+        :returns: True if the power state of the node matched the recorded
+            one, False otherwise.
+        """
         node = task.node
         power_state = None
 
@@ -862,10 +1027,11 @@ class ConductorManager(periodic_task.PeriodicTasks):
                 task.driver.power.validate(task)
             except (exception.InvalidParameterValue,
                     exception.MissingParameterValue):
-                return
+                return False
 
         try:
             power_state = task.driver.power.get_power_state(task)
+            utils.record_power_state(node.uuid, power_state)
             if power_state == states.ERROR:
                 raise exception.PowerStateFailure(_("Driver returns ERROR"
                                                     " state."))
@@ -879,7 +1045,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                 CONF.conductor.power_state_sync_max_retries):
                 self._handle_sync_power_state_max_retries_exceeded(task,
                                                                    power_state)
-            return
+            return False
 
         if node.power_state is None:
             LOG.info(_LI("During sync_power_state, node %(node)s has no "
@@ -892,7 +1058,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
         if power_state == node.power_state:
             if node.uuid in self.power_state_sync_count:
                 del self.power_state_sync_count[node.uuid]
-            return
+            return True
 
         if not CONF.conductor.force_power_state_during_sync:
             LOG.warning(_LW("During sync_power_state, node %(node)s state "
@@ -902,13 +1068,13 @@ class ConductorManager(periodic_task.PeriodicTasks):
                              'state': node.power_state})
             node.power_state = power_state
             node.save()
-            return
+            return False
 
         if (self.power_state_sync_count[node.uuid] >=
             CONF.conductor.power_state_sync_max_retries):
             self._handle_sync_power_state_max_retries_exceeded(task,
                                                                power_state)
-            return
+            return False
 
         # Force actual power_state of node equal to DB power_state of node
         LOG.warning(_LW("During sync_power_state, node %(node)s state "
@@ -933,6 +1099,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
         finally:
             # Update power state sync count for current node
             self.power_state_sync_count[node.uuid] += 1
+        return False
 
     @periodic_task.periodic_task(
             spacing=CONF.conductor.sync_power_state_interval)
@@ -969,31 +1136,193 @@ class ConductorManager(periodic_task.PeriodicTasks):
         filters = {'reserved': False, 'maintenance': False}
         columns = ['id', 'uuid', 'driver']
         node_list = self.dbapi.get_nodeinfo_list(columns=columns,
-                                                 filters=filters)
+                                                 filters=filters,
+                                                 use_slave=True)
+        nodes = []
+        listed_uuids = set()
+        mapped_uuids = set()
         for (node_id, node_uuid, driver) in node_list:
+            listed_uuids.add(node_uuid)
             try:
                 if not self._mapped_to_this_conductor(node_uuid, driver):
                     continue
+                mapped_uuids.add(node_uuid)
                 node = objects.Node.get_by_id(context, node_id)
                 if (node.provision_state == states.DEPLOYWAIT or
                         node.maintenance or node.reservation is not None):
                     continue
-                with task_manager.acquire(context, node_id) as task:
+                nodes.append(node)
+            except exception.NodeNotFound:
+                mapped_uuids.discard(node_uuid)
+                LOG.info(_LI("During sync_power_state, node %(node)s was not "
+                             "found and presumed deleted by another process."),
+                         {'node': node_uuid})
+            finally:
+                # Yield on every iteration
+                eventlet.sleep(0)
+
+        self._prune_power_state_sync_records(listed_uuids, mapped_uuids)
+        now = timeutils.utcnow()
+        mapped_count = len(nodes)
+        if CONF.conductor.sync_power_state_adaptive:
+            nodes = [mapped_node for mapped_node in nodes
+                     if self._power_state_sync_due(mapped_node, now)]
+
+        # Drivers able to get the power states of several nodes at once
+        # are asked for them upfront. Nodes whose power state matches the
+        # recorded one need not be locked; any other node is synced as
+        # usual, reading its power state again under the lock.
+        power_states = self._get_power_states(context, nodes)
+
+        for node in nodes:
+            in_sync = False
+            try:
+                if power_states.get(node.uuid, False) == node.power_state:
+                    self.power_state_sync_count.pop(node.uuid, None)
+                    in_sync = True
+                    continue
+                with task_manager.acquire(context, node.id) as task:
                     if (task.node.provision_state != states.DEPLOYWAIT and
                             not task.node.maintenance):
-                        self._do_sync_power_state(task)
+                        in_sync = self._do_sync_power_state(task)
             except exception.NodeNotFound:
                 LOG.info(_LI("During sync_power_state, node %(node)s was not "
                              "found and presumed deleted by another process."),
-                         {'node': node_uuid})
+                         {'node': node.uuid})
             except exception.NodeLocked:
                 LOG.info(_LI("During sync_power_state, node %(node)s was "
                              "already locked by another process. Skip."),
-                         {'node': node_uuid})
+                         {'node': node.uuid})
             finally:
+                self._schedule_power_state_sync(node, in_sync, now)
                 # Yield on every iteration
                 eventlet.sleep(0)
 
+        LOG.debug("Synced the power state of %(synced)d of the %(mapped)d "
+                  "nodes mapped to this conductor.",
+                  {'synced': len(nodes), 'mapped': mapped_count})
+
+    def _prune_power_state_sync_records(self, listed_uuids, mapped_uuids):
+        """Forget the power state sync records of nodes not synced anymore.
+
+        The records of the nodes which were deleted or rebalanced to another
+        conductor since the previous sync are dropped, which bounds them to
+        the nodes mapped to this conductor. The nodes with records which
+        were not listed for the sync are looked up by UUID, so that the
+        nodes which are only locked or in maintenance for now keep their
+        records.
+
+        :param listed_uuids: the UUIDs of the nodes listed for the sync.
+        :param mapped_uuids: the UUIDs of the listed nodes which are mapped
+            to this conductor.
+        """
+        keep_uuids = set(mapped_uuids)
+        unlisted_uuids = (set(self.power_state_sync_count) |
+                          set(self.power_state_sync_schedule)) - listed_uuids
+        if unlisted_uuids:
+            node_list = self.dbapi.get_nodeinfo_list(
+                columns=['uuid', 'driver'],
+                filters={'uuids': list(unlisted_uuids)},
+                use_slave=True)
+            keep_uuids.update(
+                node_uuid for node_uuid, driver in node_list
+                if self._mapped_to_this_conductor(node_uuid, driver))
+        for records in (self.power_state_sync_count,
+                        self.power_state_sync_schedule):
+            for node_uuid in list(records):
+                if node_uuid not in keep_uuids:
+                    del records[node_uuid]
+        utils.prune_power_states(keep_uuids)
+
+    def _power_state_sync_due(self, node, now):
+        """Tells whether the power state of a node is due to be synced.
+
+        :param node: a Node object.
+        :param now: the time of the current sync.
+        """
+        schedule = self.power_state_sync_schedule.get(node.uuid)
+        if schedule is None or node.uuid in self.power_state_sync_count:
+            return True
+        synced_at, interval = schedule
+        if (node.updated_at is not None and
+                timeutils.normalize_time(node.updated_at) > synced_at):
+            # Something happened to the node since, like a power action.
+            return True
+        # The runs of the task drift by the time spent scanning the nodes,
+        # tolerate it so that a node isn't pushed back a whole run.
+        tolerance = CONF.conductor.sync_power_state_interval / 2.0
+        return now >= synced_at + datetime.timedelta(
+            seconds=interval - tolerance)
+
+    def _schedule_power_state_sync(self, node, in_sync, now):
+        """Schedules the next sync of the power state of a node.
+
+        :param node: a Node object.
+        :param in_sync: whether the power state of the node was found to
+            match the recorded one.
+        :param now: the time of the current sync.
+        """
+        interval = CONF.conductor.sync_power_state_interval
+        schedule = self.power_state_sync_schedule.get(node.uuid)
+        if in_sync and schedule is not None:
+            interval = min(max(schedule[1] * 2, interval),
+                           CONF.conductor.sync_power_state_max_interval)
+        self.power_state_sync_schedule[node.uuid] = (now, interval)
+        LOG.debug("The power state of node %(node)s is next synced in "
+                  "%(interval)d seconds.",
+                  {'node': node.uuid, 'interval': interval})
+
+    def _get_power_states(self, context, nodes):
+        """Get the power states of several nodes from their drivers.
+
+        The nodes are grouped by driver, and each driver implementing
+        :meth:`ironic.drivers.base.PowerInterface.get_power_states` is
+        asked for the power states of all its nodes at once.
+
+        :param context: an admin context.
+        :param nodes: a list of Node objects.
+        :returns: a dictionary mapping node UUIDs to power states, for the
+            nodes whose power state could be got.
+        """
+        nodes_by_driver = collections.defaultdict(list)
+        for node in nodes:
+            nodes_by_driver[node.driver].append(node)
+
+        power_states = {}
+        for driver_name, driver_nodes in nodes_by_driver.items():
+            try:
+                driver = driver_factory.get_driver(driver_name)
+            except exception.DriverNotFound:
+                continue
+            # Building the tasks is only worth it if the driver overrides
+            # the default implementation, which gets no power state.
+            if (type(driver.power).get_power_states ==
+                    drivers_base.PowerInterface.get_power_states):
+                continue
+
+            tasks = []
+            for node in driver_nodes:
+                try:
+                    tasks.append(task_manager.acquire(context, node.id,
+                                                      shared=True))
+                except exception.NodeNotFound:
+                    pass
+            try:
+                driver_power_states = driver.power.get_power_states(tasks)
+            except Exception as e:
+                LOG.warning(_LW("During sync_power_state, could not get the "
+                                "power states of the nodes using driver "
+                                "%(driver)s. Error: %(err)s."),
+                            {'driver': driver_name, 'err': e})
+            else:
+                for node_uuid, power_state in driver_power_states.items():
+                    utils.record_power_state(node_uuid, power_state)
+                power_states.update(driver_power_states)
+            finally:
+                for task in tasks:
+                    task.release_resources()
+        return power_states
+
     @periodic_task.periodic_task(
             spacing=CONF.conductor.check_provision_state_interval)
     def _check_deploy_timeouts(self, context):
@@ -1010,7 +1339,8 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                     columns=columns,
                                     filters=filters,
                                     sort_key='provision_updated_at',
-                                    sort_dir='asc')
+                                    sort_dir='asc',
+                                    use_slave=True)
 
         workers_count = 0
         for node_uuid, driver in node_list:
@@ -1026,7 +1356,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                     if (task.node.maintenance or
                             task.node.provision_state != states.DEPLOYWAIT):
                         continue
-                    task.spawn_after(self._spawn_worker,
+                    task.spawn_after(self._spawn_periodic_worker,
                                      utils.cleanup_after_timeout, task)
             except exception.NoFreeConductorWorker:
                 break
@@ -1056,6 +1386,13 @@ class ConductorManager(periodic_task.PeriodicTasks):
         determines which, if any, nodes need to be "taken over".
         The ensuing actions could include preparing a PXE environment,
         updating the DHCP server, and so on.
+
+        Up to [conductor]periodic_max_workers nodes are taken over at once,
+        until all the nodes are. Nodes using the same images are taken over
+        one after the other, so that the images are fetched once.
+
+        The nodes this conductor is a replica for are not taken over, this
+        conductor prepares to take them over instead.
         """
         self.ring_manager.reset()
         filters = {'reserved': False,
@@ -1064,26 +1401,234 @@ class ConductorManager(periodic_task.PeriodicTasks):
         columns = ['id', 'uuid', 'driver', 'conductor_affinity']
         node_list = self.dbapi.get_nodeinfo_list(
                                     columns=columns,
-                                    filters=filters)
+                                    filters=filters,
+                                    use_slave=True)
 
-        admin_context = None
-        workers_count = 0
+        takeover_ids = []
+        standby_ids = []
         for node_id, node_uuid, driver, conductor_affinity in node_list:
             if not self._mapped_to_this_conductor(node_uuid, driver):
                 continue
+            if (CONF.hash_distribution_replicas > 1 and
+                    not self._is_primary_conductor(node_uuid, driver)):
+                # Node is mapped here as a replica
+                standby_ids.append(node_id)
+                continue
             if conductor_affinity == self.conductor.id:
                 continue
+            # Node is mapped here, but not updated by this conductor last
+            takeover_ids.append(node_id)
+        if not takeover_ids and not standby_ids:
+            return
 
-            # NOTE(lucasagomes): The context provided by the periodic task
-            # will make the glance client to fail with an 401 (Unauthorized)
-            # so we have to use the admin_context with an admin auth_token
-            if not admin_context:
-                admin_context = ironic_context.get_admin_context()
-                admin_context.auth_token = keystone.get_admin_auth_token()
+        groups = self._get_takeover_groups(takeover_ids + standby_ids)
+        takeovers = sorted((groups[node_id], node_id)
+                           for node_id in takeover_ids if node_id in groups)
+        standbys = {}
+        for node_id in standby_ids:
+            if node_id in groups:
+                # A single node per set of images is enough to have them
+                # cached
+                standbys.setdefault(groups[node_id], node_id)
+
+        if takeovers:
+            self._take_over_nodes([takeover[1] for takeover in takeovers])
+        if standbys:
+            self._prepare_standby_nodes([standbys[key]
+                                         for key in sorted(standbys)])
+
+    def _get_takeover_groups(self, node_ids):
+        """Get the keys grouping nodes using the same images to take over.
+
+        The nodes are looked up TAKEOVER_IDS_PER_QUERY at a time, to keep
+        the IN clauses of the queries short.
+
+        :param node_ids: a list of node IDs.
+        :returns: a dict mapping the IDs of the nodes which still exist to
+            their group key.
+        """
+        columns = ['id', 'driver', 'driver_info', 'instance_info']
+        groups = {}
+        for i in range(0, len(node_ids), TAKEOVER_IDS_PER_QUERY):
+            node_list = self.dbapi.get_nodeinfo_list(
+                columns=columns,
+                filters={'ids': node_ids[i:i + TAKEOVER_IDS_PER_QUERY]},
+                use_slave=True)
+            groups.update(
+                (node_id,
+                 _get_takeover_group(driver, driver_info, instance_info))
+                for node_id, driver, driver_info, instance_info in node_list)
+        return groups
+
+    def _take_over_nodes(self, node_ids):
+        """Take over nodes concurrently.
+
+        Up to [conductor]periodic_max_workers nodes are taken over at once,
+        in the given order.
+
+        :param node_ids: a list of the IDs of the nodes to take over.
+        :returns: the number of nodes taken over.
+        """
+        nodes = queue.Queue()
+        for node_id in node_ids:
+            nodes.put_nowait(node_id)
+
+        start_time = time.time()
+        workers = []
+        for _i in range(min(CONF.conductor.periodic_max_workers,
+                            nodes.qsize())):
+            try:
+                workers.append(self._spawn_periodic_worker(
+                    self._takeover_nodes_task, nodes))
+            except exception.NoFreeConductorWorker:
+                break
+        if not workers:
+            LOG.warning(_LW("There is no free conductor worker to take "
+                            "over %(count)d nodes."),
+                        {'count': len(node_ids)})
+            return 0
+
+        taken_over_count = sum(worker.wait() for worker in workers)
+        LOG.info(_LI("Conductor %(cdr)s took over %(taken_over)d of "
+                     "%(count)d nodes with %(workers)d workers in "
+                     "%(time).2f seconds."),
+                 {'cdr': self.host, 'taken_over': taken_over_count,
+                  'count': len(node_ids), 'workers': len(workers),
+                  'time': time.time() - start_time})
+        return taken_over_count
+
+    def _get_admin_context(self):
+        """Get an admin context with an admin auth_token.
+
+        The token is reused until it is about to expire, so a context is got
+        for each node of a long run rather than for the whole run.
+        """
+        # NOTE(lucasagomes): The context provided by the periodic task
+        # will make the glance client to fail with an 401 (Unauthorized)
+        # so we have to use the admin_context with an admin auth_token
+        admin_context = ironic_context.get_admin_context()
+        admin_context.auth_token = keystone.get_admin_auth_token()
+        return admin_context
+
+    def _prepare_standby_nodes(self, node_ids):
+        """Prepare this conductor to take over nodes quickly.
+
+        The deploy interface of each node fetches ahead of time what it
+        needs to take the node over, typically into an image cache whose
+        size bounds the disk space used.
+
+        :param node_ids: a list of the IDs of nodes this conductor is a
+            replica for.
+        """
+        start_time = time.time()
+        prepared_count = 0
+        for node_id in node_ids:
+            try:
+                with task_manager.acquire(self._get_admin_context(), node_id,
+                                          shared=True) as task:
+                    task.driver.deploy.prepare_standby(task)
+            except exception.NodeNotFound:
+                continue
+            except Exception as e:
+                LOG.warning(_LW("Failed to prepare conductor %(cdr)s to take "
+                                "over node %(node)s. Error: %(err)s"),
+                            {'cdr': self.host, 'node': node_id, 'err': e})
+                continue
+            prepared_count += 1
 
-            # Node is mapped here, but not updated by this conductor last
+        LOG.info(_LI("Conductor %(cdr)s prepared to take over %(prepared)d "
+                     "of %(count)d sets of nodes in %(time).2f seconds."),
+                 {'cdr': self.host, 'prepared': prepared_count,
+                  'count': len(node_ids), 'time': time.time() - start_time})
+
+    def take_over_nodes(self, context, node_ids):
+        """RPC method to take over nodes from a conductor shutting down.
+
+        :param context: an admin context.
+        :param node_ids: a list of node ids.
+        :returns: the number of nodes taken over.
+        """
+        LOG.debug("RPC take_over_nodes called for %d nodes.", len(node_ids))
+        return self._take_over_nodes(node_ids)
+
+    def _hand_off_nodes(self):
+        """Have the nodes of this conductor taken over by other conductors.
+
+        The nodes this conductor prepared the deploy environment of are
+        grouped by the conductor they are mapped to once this one is gone,
+        and each of these conductors is asked to take its nodes over. The
+        nodes are then never left without a deploy environment, like when
+        they are only taken over once the other conductors notice this one
+        is gone.
+        """
+        # The RPC API module imports this one
+        from ironic.conductor import rpcapi
+
+        filters = {'reserved': False,
+                   'maintenance': False,
+                   'provision_state': states.ACTIVE}
+        columns = ['id', 'uuid', 'driver', 'conductor_affinity',
+                   'driver_info', 'instance_info']
+        node_list = self.dbapi.get_nodeinfo_list(columns=columns,
+                                                 filters=filters)
+
+        self.ring_manager.reset()
+        handoffs = collections.defaultdict(list)
+        for (node_id, node_uuid, driver, conductor_affinity, driver_info,
+             instance_info) in node_list:
+            if conductor_affinity != self.conductor.id:
+                continue
+            try:
+                hosts = self.ring_manager[driver].get_hosts(
+                    node_uuid, ignore_hosts=[self.host])
+            except exception.DriverNotFound:
+                continue
+            if not hosts:
+                continue
+            group = _get_takeover_group(driver, driver_info, instance_info)
+            handoffs[hosts[0]].append((group, node_id))
+        if not handoffs:
+            return
+
+        api = rpcapi.ConductorAPI()
+        context = ironic_context.get_admin_context()
+        threads = []
+        for host, takeovers in handoffs.items():
+            node_ids = [takeover[1] for takeover in sorted(takeovers)]
+            thread = eventlet.spawn(api.take_over_nodes, context, node_ids,
+                                    topic=api.topic + '.' + host,
+                                    timeout=CONF.conductor.handoff_timeout)
+            threads.append((host, node_ids, thread))
+
+        for host, node_ids, thread in threads:
+            try:
+                taken_over_count = thread.wait()
+            except Exception as e:
+                LOG.warning(_LW("Conductor %(host)s failed to take over "
+                                "%(count)d nodes from this conductor. "
+                                "Error: %(err)s"),
+                            {'host': host, 'count': len(node_ids), 'err': e})
+            else:
+                LOG.info(_LI("Conductor %(host)s took over %(taken_over)d "
+                             "of %(count)d nodes from this conductor."),
+                         {'host': host, 'taken_over': taken_over_count,
+                          'count': len(node_ids)})
+
+    def _takeover_nodes_task(self, nodes):
+        """Take over nodes from a queue until it is empty.
+
+        :param nodes: a Queue of the IDs of the nodes to take over.
+        :returns: the number of nodes taken over.
+        """
+        taken_over_count = 0
+        while True:
             try:
-                with task_manager.acquire(admin_context, node_id) as task:
+                node_id = nodes.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                with task_manager.acquire(self._get_admin_context(),
+                                          node_id) as task:
                     # NOTE(deva): now that we have the lock, check again to
                     # avoid racing with deletes and other state changes
                     node = task.node
@@ -1092,16 +1637,15 @@ class ConductorManager(periodic_task.PeriodicTasks):
                             node.provision_state != states.ACTIVE):
                         continue
 
-                    task.spawn_after(self._spawn_worker,
-                                     self._do_takeover, task)
-
-            except exception.NoFreeConductorWorker:
-                break
+                    self._do_takeover(task)
+                    taken_over_count += 1
             except (exception.NodeLocked, exception.NodeNotFound):
                 continue
-            workers_count += 1
-            if workers_count == CONF.conductor.periodic_max_workers:
-                break
+            except Exception as e:
+                LOG.exception(_LE("Failed to take over node %(node)s. "
+                                  "Error: %(err)s"),
+                              {'node': node_id, 'err': e})
+        return taken_over_count
 
     def _mapped_to_this_conductor(self, node_uuid, driver):
         """Check that node is mapped to this conductor.
@@ -1118,6 +1662,21 @@ class ConductorManager(periodic_task.PeriodicTasks):
 
         return self.host in ring.get_hosts(node_uuid)
 
+    def _is_primary_conductor(self, node_uuid, driver):
+        """Check that this conductor is the first a node is mapped to.
+
+        The requests for a node are sent to the first conductor it is mapped
+        to. The other conductors it is mapped to, when there are several
+        hash_distribution_replicas, are its replicas.
+        """
+        try:
+            ring = self.ring_manager[driver]
+        except exception.DriverNotFound:
+            return False
+
+        hosts = ring.get_hosts(node_uuid)
+        return bool(hosts) and hosts[0] == self.host
+
     @messaging.expected_exceptions(exception.NodeLocked)
     def validate_driver_interfaces(self, context, node_id):
         """Validate the `core` and `standardized` interfaces for drivers.
@@ -1154,18 +1713,68 @@ class ConductorManager(periodic_task.PeriodicTasks):
                     ret_dict[iface_name]['reason'] = reason
         return ret_dict
 
-    @lockutils.synchronized(WORKER_SPAWN_lOCK, 'ironic-')
     def _spawn_worker(self, func, *args, **kwargs):
 
         """Create a greenthread to run func(*args, **kwargs).
 
         Spawns a greenthread if there are free slots in pool, otherwise raises
-        exception. Execution control returns immediately to the caller.
+        exception. Execution control returns to the caller as soon as the
+        greenthread is spawned. Requests call _wait_for_free_worker() first.
 
         :returns: GreenThread object.
         :raises: NoFreeConductorWorker if worker pool is currently full.
 
         """
+        return self._spawn_pool_worker(func, *args, **kwargs)
+
+    def _wait_for_free_worker(self):
+        """Wait for a worker of the pool to free up if it is full.
+
+        Waits up to [conductor]workers_pool_wait_timeout seconds. This is
+        called before the node is locked where possible, so that a waiting
+        request does not hold the node's reservation. vendor_passthru only
+        knows whether its method needs a worker once the node is locked.
+        The worker is not reserved: spawning still raises
+        NoFreeConductorWorker if another request took it.
+
+        """
+        timeout = CONF.conductor.workers_pool_wait_timeout
+        if self._worker_pool.free() or timeout <= 0:
+            return
+        start_time = time.time()
+        while (not self._worker_pool.free() and
+               time.time() - start_time < timeout):
+            eventlet.sleep(WORKER_WAIT_POLL_INTERVAL)
+        LOG.debug("Waited %(time).2f seconds for a free conductor worker.",
+                  {'time': time.time() - start_time})
+
+    def _spawn_periodic_worker(self, func, *args, **kwargs):
+        """Create a periodic task greenthread to run func(*args, **kwargs).
+
+        Periodic tasks use at most [conductor]periodic_workers_pool_size
+        workers of the pool, so that they do not starve the requests of
+        users. They never wait for a worker: the work is picked up by the
+        next run of the task instead.
+
+        :returns: GreenThread object.
+        :raises: NoFreeConductorWorker if worker pool is currently full or
+            the periodic tasks already use all the workers they can.
+
+        """
+        if (len(self._periodic_workers) >=
+                CONF.conductor.periodic_workers_pool_size):
+            raise exception.NoFreeConductorWorker()
+        thread = self._spawn_pool_worker(func, *args, **kwargs)
+        self._periodic_workers.add(thread)
+        thread.link(self._periodic_workers.discard)
+        return thread
+
+    def _spawn_pool_worker(self, func, *args, **kwargs):
+        """Spawn a greenthread in the pool if it has a free slot."""
+        # Checking for a free slot and taking it does not yield to other
+        # greenthreads, so no lock is needed to make it atomic. Spawning
+        # into a full pool must be avoided: GreenPool would block, or run
+        # func right away when called from one of its own greenthreads.
         if self._worker_pool.free():
             return self._worker_pool.spawn(func, *args, **kwargs)
         else:
@@ -1254,6 +1863,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                   'enabled %(enabled)s' % {'node': node_id,
                                            'enabled': enabled})
 
+        self._wait_for_free_worker()
         with task_manager.acquire(context, node_id, shared=False) as task:
             node = task.node
             if not getattr(task.driver, 'console', None):
@@ -1361,9 +1971,75 @@ class ConductorManager(periodic_task.PeriodicTasks):
         filters = {'associated': True}
         columns = ['uuid', 'driver', 'instance_uuid']
         node_list = self.dbapi.get_nodeinfo_list(columns=columns,
-                                                 filters=filters)
+                                                 filters=filters,
+                                                 use_slave=True)
+
+        nodes = queue.Queue()
+        for node_info in node_list:
+            nodes.put_nowait(node_info)
+
+        start_time = time.time()
+        workers = []
+        for _i in range(min(CONF.conductor.send_sensor_data_workers,
+                            nodes.qsize())):
+            try:
+                workers.append(self._spawn_periodic_worker(
+                    self._sensors_nodes_task, context, nodes))
+            except exception.NoFreeConductorWorker:
+                LOG.warning(_LW("There is no more conductor workers for "
+                                "sending sensor data. %(workers)d workers "
+                                "have been already spawned."),
+                            {'workers': len(workers)})
+                break
+
+        sent_count = 0
+        with eventlet.Timeout(CONF.conductor.send_sensor_data_wait_timeout,
+                              False):
+            for worker in workers:
+                sent_count += worker.wait()
+
+        if not all(worker.dead for worker in workers):
+            # Stop the workers after their current node rather than let
+            # them overlap with the next run.
+            skipped_count = 0
+            while True:
+                try:
+                    nodes.get_nowait()
+                except queue.Empty:
+                    break
+                skipped_count += 1
+            LOG.warning(_LW("Sending sensor data did not complete within "
+                            "%(timeout)s seconds, the sensor data of "
+                            "%(skipped)d nodes is skipped until the next "
+                            "run."),
+                        {'timeout':
+                            CONF.conductor.send_sensor_data_wait_timeout,
+                         'skipped': skipped_count})
+
+        LOG.debug("Sent the sensor data of %(count)d nodes with %(workers)d "
+                  "workers in %(time).2f seconds.",
+                  {'count': sent_count, 'workers': len(workers),
+                   'time': time.time() - start_time})
+
+    def _sensors_nodes_task(self, context, nodes):
+        """Send the sensor data of the nodes taken from a queue.
+
+        :param context: an admin context.
+        :param nodes: a queue of (uuid, driver, instance_uuid) tuples of
+            the nodes to send the sensor data of. The task returns when the
+            queue is empty.
+        :returns: the number of nodes whose sensor data has been sent.
+        """
+        sensor_types = CONF.conductor.send_sensor_data_types
+        if 'all' in (t.lower() for t in sensor_types):
+            sensor_types = None
+        sent_count = 0
+        while True:
+            try:
+                node_uuid, driver, instance_uuid = nodes.get_nowait()
+            except queue.Empty:
+                return sent_count
 
-        for (node_uuid, driver, instance_uuid) in node_list:
             # only handle the nodes mapped to this conductor
             if not self._mapped_to_this_conductor(node_uuid, driver):
                 continue
@@ -1381,7 +2057,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                           shared=True) as task:
                     task.driver.management.validate(task)
                     sensors_data = task.driver.management.get_sensors_data(
-                        task)
+                        task, sensor_types=sensor_types)
             except NotImplementedError:
                 LOG.warn(_LW('get_sensors_data is not implemented for driver'
                     ' %(driver)s, node_uuid is %(node)s'),
@@ -1407,6 +2083,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                 if message['payload']:
                     self.notifier.info(context, "hardware.ipmi.metrics",
                                        message)
+                    sent_count += 1
             finally:
                 # Yield on every iteration
                 eventlet.sleep(0)
@@ -64,11 +64,12 @@ class ConductorAPI(object):
     |           driver_vendor_passthru
     |    1.21 - Added get_node_vendor_passthru_methods and
     |           get_driver_vendor_passthru_methods
+    |    1.22 - Added take_over_nodes.
 
     """
 
     # NOTE(rloo): This must be in sync with manager.ConductorManager's.
-    RPC_API_VERSION = '1.21'
+    RPC_API_VERSION = '1.22'
 
     def __init__(self, topic=None):
         super(ConductorAPI, self).__init__()
@@ -85,6 +86,24 @@ class ConductorAPI(object):
         # NOTE(deva): this is going to be buggy
         self.ring_manager = hash_ring.HashRingManager()
 
+    def _get_ring(self, driver_name):
+        """Get the hash ring for a driver, reloading the rings on a miss.
+
+        The rings are shared by the whole process and only rebuilt
+        periodically, so a conductor which registered recently may not
+        be part of them yet.
+
+        :param driver_name: the name of the driver.
+        :returns: a :class:`ironic.common.hash_ring.HashRing` object.
+        :raises: DriverNotFound
+
+        """
+        try:
+            return self.ring_manager[driver_name]
+        except exception.DriverNotFound:
+            self.ring_manager.reset()
+            return self.ring_manager[driver_name]
+
     def get_topic_for(self, node):
         """Get the RPC topic for the conductor service the node is mapped to.
 
@@ -93,10 +112,8 @@ class ConductorAPI(object):
         :raises: NoValidHost
 
         """
-        self.ring_manager.reset()
-
         try:
-            ring = self.ring_manager[node.driver]
+            ring = self._get_ring(node.driver)
             dest = ring.get_hosts(node.uuid)
             return self.topic + "." + dest[0]
         except exception.DriverNotFound:
@@ -116,9 +133,7 @@ class ConductorAPI(object):
         :raises: DriverNotFound
 
         """
-        self.ring_manager.reset()
-
-        hash_ring = self.ring_manager[driver_name]
+        hash_ring = self._get_ring(driver_name)
         host = random.choice(list(hash_ring.hosts))
         return self.topic + "." + host
 
@@ -460,3 +475,21 @@ class ConductorAPI(object):
         cctxt = self.client.prepare(topic=topic or self.topic, version='1.17')
         return cctxt.call(context, 'get_supported_boot_devices',
                           node_id=node_id)
+
+    def take_over_nodes(self, context, node_ids, topic=None, timeout=None):
+        """Synchronously, have a conductor take over nodes.
+
+        This is used by a conductor shutting down to hand the nodes it
+        manages over to the conductors they are mapped to without it.
+
+        :param context: request context.
+        :param node_ids: a list of node ids.
+        :param topic: RPC topic. Defaults to self.topic.
+        :param timeout: the time in seconds to wait for the nodes to be
+            taken over. Defaults to the RPC response timeout.
+        :returns: the number of nodes taken over.
+
+        """
+        cctxt = self.client.prepare(topic=topic or self.topic, version='1.22',
+                                    timeout=timeout)
+        return cctxt.call(context, 'take_over_nodes', node_ids=node_ids)
@@ -12,6 +12,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import time
+
+from oslo.config import cfg
 from oslo.utils import excutils
 
 from ironic.common import exception
@@ -22,8 +25,66 @@ from ironic.common import states
 from ironic.conductor import task_manager
 from ironic.openstack.common import log
 
+utils_opts = [
+    cfg.IntOpt('power_state_cache_max_age',
+               default=60,
+               help='Maximum age in seconds of an observed power state '
+                    'for a power action to trust it instead of reading '
+                    'the power state from the driver first. The power '
+                    'state is still read when the observed one is the '
+                    'requested state. Set to 0 to always read it.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(utils_opts, group='conductor')
+
 LOG = log.getLogger(__name__)
 
+# The power states last observed by this conductor, by node UUID. The
+# values are (observed_at, power_state) tuples.
+_POWER_STATES = {}
+
+
+def record_power_state(node_uuid, power_state):
+    """Records the power state of a node just got from its driver.
+
+    :param node_uuid: the UUID of the node.
+    :param power_state: the power state of the node. An ERROR or unknown
+        state is not recorded, and forgets the previous one.
+    """
+    if power_state in (None, states.ERROR):
+        _POWER_STATES.pop(node_uuid, None)
+    else:
+        _POWER_STATES[node_uuid] = (time.time(), power_state)
+
+
+def get_recent_power_state(node_uuid):
+    """Returns the power state of a node, if it has been observed recently.
+
+    :param node_uuid: the UUID of the node.
+    :returns: the power state observed at most
+        CONF.conductor.power_state_cache_max_age seconds ago, or None.
+    """
+    entry = _POWER_STATES.get(node_uuid)
+    if entry is None:
+        return None
+    if time.time() - entry[0] > CONF.conductor.power_state_cache_max_age:
+        del _POWER_STATES[node_uuid]
+        return None
+    return entry[1]
+
+
+def prune_power_states(node_uuids):
+    """Forgets the power states of other nodes, and the outdated ones.
+
+    :param node_uuids: the UUIDs of the nodes to keep the power states of,
+        typically the nodes mapped to this conductor.
+    """
+    oldest = time.time() - CONF.conductor.power_state_cache_max_age
+    for node_uuid, entry in list(_POWER_STATES.items()):
+        if node_uuid not in node_uuids or entry[0] < oldest:
+            del _POWER_STATES[node_uuid]
+
 
 @task_manager.require_exclusive_lock
 def node_set_boot_device(task, device, persistent=False):
@@ -64,15 +125,20 @@ def node_power_action(task, new_state):
     target_state = states.POWER_ON if new_state == states.REBOOT else new_state
 
     if new_state != states.REBOOT:
-        try:
-            curr_state = task.driver.power.get_power_state(task)
-        except Exception as e:
-            with excutils.save_and_reraise_exception():
-                node['last_error'] = _(
-                    "Failed to change power state to '%(target)s'. "
-                    "Error: %(error)s") % {'target': new_state, 'error': e}
-                node['target_power_state'] = states.NOSTATE
-                node.save()
+        # A recently observed power state spares reading it again, unless
+        # it would stop the action: only a fresh reading may do that.
+        curr_state = get_recent_power_state(node.uuid)
+        if curr_state in (None, new_state):
+            try:
+                curr_state = task.driver.power.get_power_state(task)
+            except Exception as e:
+                with excutils.save_and_reraise_exception():
+                    node['last_error'] = _(
+                        "Failed to change power state to '%(target)s'. "
+                        "Error: %(error)s") % {'target': new_state, 'error': e}
+                    node['target_power_state'] = states.NOSTATE
+                    node.save()
+            record_power_state(node.uuid, curr_state)
 
         if curr_state == new_state:
             # Neither the ironic service nor the hardware has erred. The
@@ -113,11 +179,13 @@ def node_power_action(task, new_state):
             task.driver.power.reboot(task)
     except Exception as e:
         with excutils.save_and_reraise_exception():
+            record_power_state(node.uuid, None)
             node['last_error'] = _(
                 "Failed to change power state to '%(target)s'. "
                 "Error: %(error)s") % {'target': target_state, 'error': e}
     else:
         # success!
+        record_power_state(node.uuid, target_state)
         node['power_state'] = target_state
         LOG.info(_LI('Succesfully set node %(node)s power state to '
                      '%(state)s.'),
@@ -44,7 +44,8 @@ class Connection(object):
 
     @abc.abstractmethod
     def get_nodeinfo_list(self, columns=None, filters=None, limit=None,
-                          marker=None, sort_key=None, sort_dir=None):
+                          marker=None, sort_key=None, sort_dir=None,
+                          use_slave=False):
         """Get specific columns for matching nodes.
 
         Return a list of the specified columns for all nodes that match the
@@ -63,18 +64,22 @@ class Connection(object):
                         :provisioned_before:
                             nodes with provision_updated_at field before this
                             interval in seconds
+                        :ids: list of node ids
+                        :uuids: list of node uuids
         :param limit: Maximum number of nodes to return.
         :param marker: the last item of the previous page; we return the next
                        result set.
         :param sort_key: Attribute by which results should be sorted.
         :param sort_dir: direction in which results should be sorted.
                          (asc, desc)
+        :param use_slave: If True, read from the slave database, if one
+                          is configured.
         :returns: A list of tuples of the specified columns.
         """
 
     @abc.abstractmethod
     def get_node_list(self, filters=None, limit=None, marker=None,
-                      sort_key=None, sort_dir=None):
+                      sort_key=None, sort_dir=None, use_slave=False):
         """Return a list of nodes.
 
         :param filters: Filters to apply. Defaults to None.
@@ -88,12 +93,16 @@ class Connection(object):
                         :provisioned_before:
                             nodes with provision_updated_at field before this
                             interval in seconds
+                        :ids: list of node ids
+                        :uuids: list of node uuids
         :param limit: Maximum number of nodes to return.
         :param marker: the last item of the previous page; we return the next
                        result set.
         :param sort_key: Attribute by which results should be sorted.
         :param sort_dir: direction in which results should be sorted.
                          (asc, desc)
+        :param use_slave: If True, read from the slave database, if one
+                          is configured.
         """
 
     @abc.abstractmethod
@@ -373,10 +382,12 @@ class Connection(object):
         """
 
     @abc.abstractmethod
-    def get_active_driver_dict(self, interval):
+    def get_active_driver_dict(self, interval, use_slave=False):
         """Retrieve drivers for the registered and active conductors.
 
         :param interval: Seconds since last check-in of a conductor.
+        :param use_slave: If True, read from the slave database, if one
+                          is configured.
         :returns: A dict which maps driver names to the set of hosts
                   which support them. For example:
 
@@ -0,0 +1,42 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Add indexes for periodic task and API node filters
+
+Revision ID: c54ca8c6e77f
+Revises: 242cc6a923b3
+Create Date: 2014-11-20 10:12:41.482105
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'c54ca8c6e77f'
+down_revision = '242cc6a923b3'
+
+from alembic import op
+
+
+def upgrade():
+    op.create_index('provision_and_update_idx', 'nodes',
+                    ['provision_state', 'provision_updated_at'])
+    op.create_index('reservation_maintenance_idx', 'nodes',
+                    ['reservation', 'maintenance'])
+    op.create_index('driver_idx', 'nodes', ['driver'])
+    op.create_index('online_and_update_idx', 'conductors',
+                    ['online', 'updated_at'])
+
+
+def downgrade():
+    op.drop_index('online_and_update_idx', 'conductors')
+    op.drop_index('driver_idx', 'nodes')
+    op.drop_index('reservation_maintenance_idx', 'nodes')
+    op.drop_index('provision_and_update_idx', 'nodes')
@@ -71,9 +71,12 @@ def model_query(model, *args, **kwargs):
     """Query helper for simpler session usage.
 
     :param session: if present, the session to use
+    :param use_slave: if True, read from the slave database, if one is
+                      configured. Ignored when a session is given.
     """
 
-    session = kwargs.get('session') or get_session()
+    session = kwargs.get('session') or get_session(
+        use_slave=kwargs.get('use_slave', False))
     query = session.query(model, *args)
     return query
 
@@ -141,6 +144,19 @@ def _check_port_change_forbidden(port, session):
                                        host=node_ref['reservation'])
 
 
+def _value_changed(current, value):
+    """Tells whether writing value would change the current column value.
+
+    Datetimes are compared once normalized to naive UTC, as the objects
+    hand over timezone-aware values while the DB returns naive ones.
+    """
+    if (isinstance(current, datetime.datetime) and
+            isinstance(value, datetime.datetime)):
+        return (timeutils.normalize_time(current) !=
+                timeutils.normalize_time(value))
+    return current != value
+
+
 def _paginate_query(model, limit=None, marker=None, sort_key=None,
                     sort_dir=None, query=None):
     if not query:
@@ -188,11 +204,16 @@ class Connection(api.Connection):
             limit = timeutils.utcnow() - datetime.timedelta(
                                          seconds=filters['provisioned_before'])
             query = query.filter(models.Node.provision_updated_at < limit)
+        if 'ids' in filters:
+            query = query.filter(models.Node.id.in_(filters['ids']))
+        if 'uuids' in filters:
+            query = query.filter(models.Node.uuid.in_(filters['uuids']))
 
         return query
 
     def get_nodeinfo_list(self, columns=None, filters=None, limit=None,
-                          marker=None, sort_key=None, sort_dir=None):
+                          marker=None, sort_key=None, sort_dir=None,
+                          use_slave=False):
         # list-ify columns default values because it is bad form
         # to include a mutable list in function definitions.
         if columns is None:
@@ -200,14 +221,15 @@ class Connection(api.Connection):
         else:
             columns = [getattr(models.Node, c) for c in columns]
 
-        query = model_query(*columns, base_model=models.Node)
+        query = model_query(*columns, base_model=models.Node,
+                            use_slave=use_slave)
         query = self._add_nodes_filters(query, filters)
         return _paginate_query(models.Node, limit, marker,
                                sort_key, sort_dir, query)
 
     def get_node_list(self, filters=None, limit=None, marker=None,
-                      sort_key=None, sort_dir=None):
-        query = model_query(models.Node)
+                      sort_key=None, sort_dir=None, use_slave=False):
+        query = model_query(models.Node, use_slave=use_slave)
         query = self._add_nodes_filters(query, filters)
         return _paginate_query(models.Node, limit, marker,
                                sort_key, sort_dir, query)
@@ -335,12 +357,26 @@ class Connection(api.Connection):
                 node=node_id)
 
     def _do_update_node(self, node_id, values):
+        # NOTE: the UPDATE only applies to the node as it was read, so a
+        # concurrent write in between makes it start over from a fresh read,
+        # in a new transaction, like SELECT FOR UPDATE would have waited.
+        while True:
+            ref = self._try_update_node(node_id, values)
+            if ref is not None:
+                return ref
+
+    def _try_update_node(self, node_id, values):
+        """Update a node unless it changed since it was read.
+
+        :returns: the updated node, or None if the node was written by
+            someone else between the read and the update.
+        """
         session = get_session()
         with session.begin():
             query = model_query(models.Node, session=session)
             query = add_identity_filter(query, node_id)
             try:
-                ref = query.with_lockmode('update').one()
+                ref = query.one()
             except NoResultFound:
                 raise exception.NodeNotFound(node=node_id)
 
@@ -352,7 +388,29 @@ class Connection(api.Connection):
             if 'provision_state' in values:
                 values['provision_updated_at'] = timeutils.utcnow()
 
-            ref.update(values)
+            # only write the columns whose value actually changes, so that
+            # eg. an unchanged driver_info or instance_info blob is neither
+            # re-serialized nor rewritten, and a no-op save writes nothing.
+            changes = dict((k, v) for k, v in values.items()
+                           if _value_changed(ref[k], v))
+            if not changes:
+                return ref
+            changes['updated_at'] = timeutils.utcnow()
+
+            # be optimistic and issue a single guarded UPDATE instead of
+            # locking the row on read: it only matches the row as it was
+            # read, and preventing instance_uuid overwriting is part of the
+            # WHERE clause so that concurrent writers cannot race past the
+            # check above.
+            update_query = query.filter_by(updated_at=ref.updated_at)
+            if changes.get('instance_uuid'):
+                update_query = update_query.filter_by(instance_uuid=None)
+            count = update_query.update(changes,
+                                        synchronize_session='evaluate')
+            if count != 1:
+                # The row changed underneath us: it has been updated,
+                # deleted or associated with another instance since.
+                return None
         return ref
 
     def get_port_by_id(self, port_id):
@@ -551,12 +609,12 @@ class Connection(api.Connection):
             if count == 0:
                 raise exception.ConductorNotFound(conductor=hostname)
 
-    def get_active_driver_dict(self, interval=None):
+    def get_active_driver_dict(self, interval=None, use_slave=False):
         if interval is None:
             interval = CONF.conductor.heartbeat_timeout
 
         limit = timeutils.utcnow() - datetime.timedelta(seconds=interval)
-        result = (model_query(models.Conductor)
+        result = (model_query(models.Conductor, use_slave=use_slave)
                   .filter_by(online=True)
                   .filter(models.Conductor.updated_at >= limit)
                   .all())
@@ -130,6 +130,7 @@ class Conductor(Base):
     __tablename__ = 'conductors'
     __table_args__ = (
         schema.UniqueConstraint('hostname', name='uniq_conductors0hostname'),
+        schema.Index('online_and_update_idx', 'online', 'updated_at'),
         table_args()
         )
     id = Column(Integer, primary_key=True)
@@ -146,6 +147,11 @@ class Node(Base):
         schema.UniqueConstraint('uuid', name='uniq_nodes0uuid'),
         schema.UniqueConstraint('instance_uuid',
                                 name='uniq_nodes0instance_uuid'),
+        schema.Index('provision_and_update_idx',
+                     'provision_state', 'provision_updated_at'),
+        schema.Index('reservation_maintenance_idx',
+                     'reservation', 'maintenance'),
+        schema.Index('driver_idx', 'driver'),
         table_args())
     id = Column(Integer, primary_key=True)
     uuid = Column(String(36))
@@ -215,6 +215,19 @@ class DeployInterface(object):
         :param task: a TaskManager instance containing the node to act on.
         """
 
+    def prepare_standby(self, task):
+        """Prepare this conductor to take over the task's node quickly.
+
+        This is called on the conductors which are replicas of the node's
+        conductor, when hash_distribution_replicas is greater than one. It
+        may be implemented by the driver to fetch ahead of time what
+        `prepare` would need to take over the node. It must not change
+        anything the node's conductor relies on, nor require an exclusive
+        lock.
+
+        :param task: a TaskManager instance containing the node to act on.
+        """
+
 
 @six.add_metaclass(abc.ABCMeta)
 class PowerInterface(object):
@@ -250,6 +263,23 @@ class PowerInterface(object):
         :returns: a power state. One of :mod:`ironic.common.states`.
         """
 
+    def get_power_states(self, tasks):
+        """Return the power states of several nodes.
+
+        Drivers which can get the power states of several nodes more
+        efficiently than one node at a time, for example with a single
+        request to a management endpoint shared by the nodes, should
+        override this method. The default implementation gets no power
+        state.
+
+        :param tasks: a list of TaskManager instances, each containing a
+            node to get the power state of.
+        :returns: a dictionary mapping node UUIDs to power states, one of
+            :mod:`ironic.common.states`. Nodes whose power state could not
+            be got are omitted.
+        """
+        return {}
+
     @abc.abstractmethod
     def set_power_state(self, task, power_state):
         """Set the power state of the task's node.
@@ -563,10 +593,13 @@ class ManagementInterface(object):
         """
 
     @abc.abstractmethod
-    def get_sensors_data(self, task):
+    def get_sensors_data(self, task, sensor_types=None):
         """Get sensors data method.
 
         :param task: a TaskManager instance.
+        :param sensor_types: a list of the sensor types to get the data of,
+            or None for all of them. Drivers may return other sensor types
+            too, the caller filters them out.
         :raises: FailedToGetSensorData when getting the sensor data fails.
         :raises: FailedToParseSensorData when parsing sensor data fails.
         :returns: returns a consistent format dict of sensor data grouped by
@@ -303,6 +303,19 @@ class AgentDeploy(base.DeployInterface):
         provider = dhcp_factory.DHCPFactory()
         provider.update_dhcp(task, CONF.agent.agent_pxe_bootfile_name)
 
+    def prepare_standby(self, task):
+        """Fetch the TFTP images of this node into the local cache.
+
+        The images are fetched only as long as they fit in the cache.
+
+        :param task: a TaskManager instance.
+        """
+        pxe_info = _get_tftp_image_info(task.node)
+        cache = AgentTFTPImageCache()
+        for uuid, path in pxe_info.values():
+            if not cache.cache_image(uuid, ctx=task.context):
+                break
+
 
 class AgentVendorInterface(base.VendorInterface):
 
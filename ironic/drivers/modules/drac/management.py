@@ -312,10 +312,12 @@ class DracManagement(base.ManagementInterface):
                             if value in instance_id), None)
         return {'boot_device': boot_device, 'persistent': persistent}
 
-    def get_sensors_data(self, task):
+    def get_sensors_data(self, task, sensor_types=None):
         """Get sensors data.
 
         :param task: a TaskManager instance.
+        :param sensor_types: a list of the sensor types to get the data of,
+            or None for all of them.
         :raises: FailedToGetSensorData when getting the sensor data fails.
         :raises: FailedToParseSensorData when parsing sensor data fails.
         :returns: returns a consistent format dict of sensor data grouped by
@@ -51,6 +51,18 @@ opts = [
                default=900,
                help='Amount of time in seconds for Swift objects to '
                     'auto-expire.'),
+    cfg.StrOpt('boot_iso_master_path',
+               default='/var/lib/ironic/master_boot_isos',
+               help='Directory where the boot ISOs built for instances are '
+                    'cached on the conductor.'),
+    cfg.IntOpt('boot_iso_cache_size',
+               default=2048,
+               help='Maximum size (in MiB) of cache for built boot ISOs, '
+                    'including those in use.'),
+    cfg.IntOpt('boot_iso_cache_ttl',
+               default=10080,
+               help='Maximum TTL (in minutes) for old built boot ISOs in '
+                    'cache.'),
 ]
 
 CONF = cfg.CONF
@@ -15,6 +15,8 @@
 iLO Deploy Driver(s) and supporting methods.
 """
 
+import hashlib
+import os
 import tempfile
 
 from oslo.config import cfg
@@ -27,12 +29,14 @@ from ironic.common.i18n import _LI
 from ironic.common import images
 from ironic.common import states
 from ironic.common import swift
+from ironic.common import utils
 from ironic.conductor import task_manager
 from ironic.conductor import utils as manager_utils
 from ironic.drivers import base
 from ironic.drivers.modules import agent
 from ironic.drivers.modules import deploy_utils
 from ironic.drivers.modules.ilo import common as ilo_common
+from ironic.drivers.modules import image_cache
 from ironic.drivers.modules import ipmitool
 from ironic.drivers.modules import iscsi_deploy
 from ironic.drivers.modules import pxe
@@ -55,6 +59,58 @@ CONF.import_opt('swift_ilo_container', 'ironic.drivers.modules.ilo.common',
                 group='ilo')
 
 
+@image_cache.cleanup(priority=25)
+class BootISOImageCache(image_cache.ImageCache):
+    """Conductor-local cache of the boot ISOs built for instances.
+
+    Cached ISOs are keyed by a hash of everything that goes into them, so
+    the instances deployed from the same image on this conductor share a
+    single build. Each instance still gets its own copy in Swift.
+    """
+
+    def __init__(self):
+        super(BootISOImageCache, self).__init__(
+            CONF.ilo.boot_iso_master_path,
+            # MiB -> B
+            cache_size=CONF.ilo.boot_iso_cache_size * 1024 * 1024,
+            # min -> sec
+            cache_ttl=CONF.ilo.boot_iso_cache_ttl * 60)
+        self._build_args = {}
+
+    def fetch_boot_iso(self, ctx, dest_path, kernel_uuid, ramdisk_uuid,
+                       root_uuid, kernel_params):
+        """Build a boot ISO, or link the cached build, to dest_path.
+
+        :param ctx: context
+        :param dest_path: destination file path
+        :param kernel_uuid: UUID of the kernel to use
+        :param ramdisk_uuid: UUID of the ramdisk to use
+        :param root_uuid: UUID of the root partition
+        :param kernel_params: a string containing whitespace separated values
+            kernel cmdline arguments of the form K=V or K (optional).
+        :raises: ImageCreationFailed, if creation of boot ISO failed.
+        """
+        build_args = (kernel_uuid, ramdisk_uuid, root_uuid, kernel_params)
+        key = hashlib.sha256(repr(build_args)).hexdigest()
+        self._build_args[key] = build_args
+        self.fetch_image(key, dest_path, ctx=ctx)
+
+    def _download_image(self, uuid, master_path, dest_path, ctx=None,
+                        force_raw=True):
+        """Build the boot ISO for a cache key and store it at a given path.
+
+        This method should be called with key-specific lock taken.
+        """
+        tmp_dir = tempfile.mkdtemp(dir=self.master_dir)
+        tmp_path = os.path.join(tmp_dir, uuid)
+        try:
+            images.create_boot_iso(ctx, tmp_path, *self._build_args[uuid])
+            os.link(tmp_path, master_path)
+            os.link(master_path, dest_path)
+        finally:
+            utils.rmtree_without_raise(tmp_dir)
+
+
 def _get_boot_iso_object_name(node):
     """Returns the floppy image name for a given node.
 
@@ -70,7 +126,8 @@ def _get_boot_iso(task, root_uuid):
     1. Image deployed has a meta-property 'boot_iso' in Glance. This should
        refer to the UUID of the boot_iso which exists in Glance.
     2. Generates a boot ISO on the fly using kernel and ramdisk mentioned in
-       the image deployed. It uploads the generated boot ISO to Swift.
+       the image deployed, reusing a build with the same inputs from the
+       conductor's BootISOImageCache. It uploads the boot ISO to Swift.
 
     :param task: a TaskManager instance containing the node to act on.
     :param root_uuid: the uuid of the root partition.
@@ -115,10 +172,12 @@ def _get_boot_iso(task, root_uuid):
         return
 
     # NOTE(rameshg87): Functionality to share the boot ISOs created for
-    # similar instances (instances with same deployed image) is
+    # similar instances (instances with same deployed image) in Swift is
     # not implemented as of now. Creation/Deletion of such a shared boot ISO
     # will require synchronisation across conductor nodes for the shared boot
     # ISO.  Such a synchronisation mechanism doesn't exist in ironic as of now.
+    # Builds are only shared through the conductor-local BootISOImageCache,
+    # and every instance gets its own Swift object.
 
     # Option 2 - Create boot_iso from kernel/ramdisk, upload to Swift
     # and provide its name.
@@ -126,13 +185,17 @@ def _get_boot_iso(task, root_uuid):
     kernel_params = CONF.pxe.pxe_append_params
     container = CONF.ilo.swift_ilo_container
 
-    with tempfile.NamedTemporaryFile() as fileobj:
-        boot_iso_tmp_file = fileobj.name
-        images.create_boot_iso(task.context, boot_iso_tmp_file,
+    cache = BootISOImageCache()
+    tmp_dir = tempfile.mkdtemp(dir=cache.master_dir)
+    try:
+        boot_iso_tmp_file = os.path.join(tmp_dir, boot_iso_object_name)
+        cache.fetch_boot_iso(task.context, boot_iso_tmp_file,
                 kernel_uuid, ramdisk_uuid, root_uuid, kernel_params)
         swift_api = swift.SwiftAPI()
         swift_api.create_object(container, boot_iso_object_name,
                 boot_iso_tmp_file)
+    finally:
+        utils.rmtree_without_raise(tmp_dir)
 
     LOG.debug("Created boot_iso %s in Swift", boot_iso_object_name)
 
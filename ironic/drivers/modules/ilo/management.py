@@ -147,10 +147,12 @@ class IloManagement(base.ManagementInterface):
         LOG.debug("Node %(uuid)s set to boot from %(device)s.",
                  {'uuid': task.node.uuid, 'device': device})
 
-    def get_sensors_data(self, task):
+    def get_sensors_data(self, task, sensor_types=None):
         """Get sensors data.
 
         :param task: a TaskManager instance.
+        :param sensor_types: a list of the sensor types to get the data of,
+            or None for all of them.
         :raises: FailedToGetSensorData when getting the sensor data fails.
         :raises: FailedToParseSensorData when parsing sensor data fails.
         :raises: InvalidParameterValue if required ipmi parameters
@@ -161,4 +163,5 @@ class IloManagement(base.ManagementInterface):
         """
         ilo_common.update_ipmi_properties(task)
         ipmi_management = ipmitool.IPMIManagement()
-        return ipmi_management.get_sensors_data(task)
+        return ipmi_management.get_sensors_data(task,
+                                                sensor_types=sensor_types)
@@ -132,6 +132,58 @@ class ImageCache(object):
         # NOTE(dtantsur): we increased cache size - time to clean up
         self.clean_up()
 
+    def cache_image(self, uuid, ctx=None, force_raw=True):
+        """Fetch image with given uuid into the cache only.
+
+        Does nothing if the cache already has the image or if there is no
+        cache. Unlike fetch_image, this never cleans up the cache to make
+        room for the image: it is not fetched if it does not fit in the
+        cache size left.
+
+        :param uuid: image UUID or href to fetch
+        :param ctx: context
+        :param force_raw: boolean value, whether to convert the image to raw
+                          format
+        :returns: True if the cache has the image, False otherwise.
+        """
+        if self.master_dir is None:
+            return False
+
+        master_file_name = service_utils.parse_image_ref(uuid)[0]
+        master_path = os.path.join(self.master_dir, master_file_name)
+        if os.path.exists(master_path):
+            return True
+
+        size = images.download_size(ctx, uuid, self._image_service)
+        if self._get_total_size() + size > self._cache_size:
+            LOG.debug("Not caching image %(uuid)s, the master image cache "
+                      "%(dir)s is full" %
+                      {'uuid': uuid, 'dir': self.master_dir})
+            return False
+
+        img_download_lock_name = 'download-image'
+        if CONF.parallel_image_downloads:
+            img_download_lock_name = 'download-image:%s' % master_file_name
+
+        with lockutils.lock(img_download_lock_name, 'ironic-'):
+            if os.path.exists(master_path):
+                return True
+
+            tmp_dir = tempfile.mkdtemp(dir=self.master_dir)
+            try:
+                self._download_image(uuid, master_path,
+                                     os.path.join(tmp_dir, 'image'),
+                                     ctx=ctx, force_raw=force_raw)
+            finally:
+                utils.rmtree_without_raise(tmp_dir)
+        return True
+
+    def _get_total_size(self):
+        """Get the size in bytes of all the files in the cache directory."""
+        total_listing = (os.path.join(self.master_dir, f)
+                         for f in os.listdir(self.master_dir))
+        return sum(os.path.getsize(f) for f in total_listing)
+
     def _download_image(self, uuid, master_path, dest_path, ctx=None,
                         force_raw=True):
         """Download image from Glance and store at a given path.
@@ -239,10 +291,7 @@ class ImageCache(object):
         listing = sorted(listing,
                          key=lambda entry: entry[1],
                          reverse=True)
-        total_listing = (os.path.join(self.master_dir, f)
-                         for f in os.listdir(self.master_dir))
-        total_size = sum(os.path.getsize(f)
-                         for f in total_listing)
+        total_size = self._get_total_size()
         while listing and (total_size > self._cache_size or
                (amount is not None and amount > 0)):
             file_name, last_used, stat = listing.pop()
@@ -21,6 +21,7 @@ Ironic Native IPMI power manager.
 
 import os
 import tempfile
+import time
 
 from oslo.config import cfg
 from oslo.utils import excutils
@@ -53,6 +54,13 @@ opts = [
                     'sent to a server. There is a risk with some hardware '
                     'that setting this too low may cause the BMC to crash. '
                     'Recommended setting is 5 seconds.'),
+    cfg.IntOpt('session_idle_timeout',
+               default=300,
+               help='Number of seconds after which an IPMI session opened '
+                    'by the native IPMI driver, and not used since, is '
+                    'logged out. Until then, the session is reused by '
+                    'operations on the same BMC. Set to 0 to not keep '
+                    'sessions for reuse.'),
     ]
 
 CONF = cfg.CONF
@@ -60,6 +68,10 @@ CONF.register_opts(opts, group='ipmi')
 
 LOG = logging.getLogger(__name__)
 
+# maps a (address, username, password) tuple identifying a BMC session to
+# a (ipmi_command.Command, last_used) tuple.
+_COMMANDS = {}
+
 REQUIRED_PROPERTIES = {'ipmi_address': _("IP of the node's BMC. Required."),
                        'ipmi_password': _("IPMI password. Required."),
                        'ipmi_username': _("IPMI username. Required.")}
@@ -114,6 +126,51 @@ def _parse_driver_info(node):
     return bmc_info
 
 
+def _logout(ipmicmd):
+    try:
+        ipmicmd.ipmi_session.logout()
+    except Exception as e:
+        LOG.debug("Failed to log out of IPMI session with %(bmc)s: "
+                  "%(error)s", {'bmc': ipmicmd.bmc, 'error': e})
+
+
+def _get_command(driver_info):
+    """Get a pyghmi command object for a node's BMC.
+
+    Command objects, and the IPMI sessions they are logged in to, are kept
+    for reuse by later operations on the same BMC, saving the session
+    establishment handshake. Sessions not used for
+    CONF.ipmi.session_idle_timeout seconds are logged out.
+
+    :param driver_info: the bmc access info for a node.
+    :raises: IpmiException if a session could not be established.
+    :returns: an ipmi_command.Command instance.
+    """
+    timeout = CONF.ipmi.session_idle_timeout
+    now = time.time()
+    for key, (ipmicmd, last_used) in list(_COMMANDS.items()):
+        if now - last_used >= timeout:
+            del _COMMANDS[key]
+            _logout(ipmicmd)
+
+    key = (driver_info['address'], driver_info['username'],
+           driver_info['password'])
+    entry = _COMMANDS.pop(key, None)
+    if entry is not None:
+        ipmicmd = entry[0]
+        session = ipmicmd.ipmi_session
+        if session.logged and not session.broken:
+            _COMMANDS[key] = (ipmicmd, now)
+            return ipmicmd
+
+    ipmicmd = ipmi_command.Command(bmc=driver_info['address'],
+                                   userid=driver_info['username'],
+                                   password=driver_info['password'])
+    if timeout > 0:
+        _COMMANDS[key] = (ipmicmd, time.time())
+    return ipmicmd
+
+
 def _console_pwfile_path(uuid):
     """Return the file path for storing the ipmi password."""
     file_name = "%(uuid)s.pw" % {'uuid': uuid}
@@ -133,9 +190,7 @@ def _power_on(driver_info):
     msg = _LW("IPMI power on failed for node %(node_id)s with the "
               "following error: %(error)s")
     try:
-        ipmicmd = ipmi_command.Command(bmc=driver_info['address'],
-                           userid=driver_info['username'],
-                           password=driver_info['password'])
+        ipmicmd = _get_command(driver_info)
         wait = CONF.ipmi.retry_timeout
         ret = ipmicmd.set_power('on', wait)
     except pyghmi_exception.IpmiException as e:
@@ -163,9 +218,7 @@ def _power_off(driver_info):
     msg = _LW("IPMI power off failed for node %(node_id)s with the "
               "following error: %(error)s")
     try:
-        ipmicmd = ipmi_command.Command(bmc=driver_info['address'],
-                           userid=driver_info['username'],
-                           password=driver_info['password'])
+        ipmicmd = _get_command(driver_info)
         wait = CONF.ipmi.retry_timeout
         ret = ipmicmd.set_power('off', wait)
     except pyghmi_exception.IpmiException as e:
@@ -195,9 +248,7 @@ def _reboot(driver_info):
     msg = _LW("IPMI power reboot failed for node %(node_id)s with the "
               "following error: %(error)s")
     try:
-        ipmicmd = ipmi_command.Command(bmc=driver_info['address'],
-                           userid=driver_info['username'],
-                           password=driver_info['password'])
+        ipmicmd = _get_command(driver_info)
         wait = CONF.ipmi.retry_timeout
         ret = ipmicmd.set_power('boot', wait)
     except pyghmi_exception.IpmiException as e:
@@ -222,9 +273,7 @@ def _power_status(driver_info):
     """
 
     try:
-        ipmicmd = ipmi_command.Command(bmc=driver_info['address'],
-                           userid=driver_info['username'],
-                           password=driver_info['password'])
+        ipmicmd = _get_command(driver_info)
         ret = ipmicmd.get_power()
     except pyghmi_exception.IpmiException as e:
         LOG.warning(_LW("IPMI get power state failed for node %(node_id)s "
@@ -255,9 +304,7 @@ def _get_sensors_data(driver_info):
     :returns: returns a dict of sensor data group by sensor type.
     """
     try:
-        ipmicmd = ipmi_command.Command(bmc=driver_info['address'],
-            userid=driver_info['username'],
-            password=driver_info['password'])
+        ipmicmd = _get_command(driver_info)
         ret = ipmicmd.get_sensor_data()
     except Exception as e:
         LOG.error(_LE("IPMI get sensor data failed for node %(node_id)s "
@@ -405,9 +452,7 @@ class NativeIPMIManagement(base.ManagementInterface):
                 "Invalid boot device %s specified.") % device)
         driver_info = _parse_driver_info(task.node)
         try:
-            ipmicmd = ipmi_command.Command(bmc=driver_info['address'],
-                               userid=driver_info['username'],
-                               password=driver_info['password'])
+            ipmicmd = _get_command(driver_info)
             bootdev = _BOOT_DEVICES_MAP[device]
             ipmicmd.set_bootdev(bootdev, persist=persistent)
         except pyghmi_exception.IpmiException as e:
@@ -436,9 +481,7 @@ class NativeIPMIManagement(base.ManagementInterface):
         driver_info = _parse_driver_info(task.node)
         response = {'boot_device': None}
         try:
-            ipmicmd = ipmi_command.Command(bmc=driver_info['address'],
-                               userid=driver_info['username'],
-                               password=driver_info['password'])
+            ipmicmd = _get_command(driver_info)
             ret = ipmicmd.get_bootdev()
             # FIXME(lucasagomes): pyghmi doesn't seem to handle errors
             # consistently, for some errors it raises an exception
@@ -459,10 +502,12 @@ class NativeIPMIManagement(base.ManagementInterface):
                                             if hdev == bootdev), None)
         return response
 
-    def get_sensors_data(self, task):
+    def get_sensors_data(self, task, sensor_types=None):
         """Get sensors data.
 
         :param task: a TaskManager instance.
+        :param sensor_types: a list of the sensor types to get the data of,
+            or None for all of them. The data of all sensors is returned.
         :raises: FailedToGetSensorData when getting the sensor data fails.
         :raises: MissingParameterValue if required ipmi parameters are missing
         :returns: returns a dict of sensor data group by sensor type.
@@ -30,6 +30,7 @@ DRIVER.
 """
 
 import contextlib
+import itertools
 import os
 import re
 import stat
@@ -39,6 +40,7 @@ import time
 from oslo.concurrency import processutils
 from oslo.config import cfg
 from oslo.utils import excutils
+import six
 
 from ironic.common import boot_devices
 from ironic.common import exception
@@ -477,38 +479,12 @@ def _power_status(driver_info):
         return states.ERROR
 
 
-def _process_sensor(sensor_data):
-    sensor_data_fields = sensor_data.split('\n')
-    sensor_data_dict = {}
-    for field in sensor_data_fields:
-        if not field:
-            continue
-        kv_value = field.split(':')
-        if len(kv_value) != 2:
-            continue
-        sensor_data_dict[kv_value[0].strip()] = kv_value[1].strip()
-
-    return sensor_data_dict
+# The sensor type is the first word of the value of one of these fields.
+_SENSOR_TYPE_FIELDS = ('Sensor Type (Analog)', 'Sensor Type (Discrete)',
+                       'Sensor Type (Threshold)')
 
 
-def _get_sensor_type(node, sensor_data_dict):
-    # Have only three sensor type name IDs: 'Sensor Type (Analog)'
-    # 'Sensor Type (Discrete)' and 'Sensor Type (Threshold)'
-
-    for key in ('Sensor Type (Analog)', 'Sensor Type (Discrete)',
-                'Sensor Type (Threshold)'):
-        try:
-            return sensor_data_dict[key].split(' ', 1)[0]
-        except KeyError:
-            continue
-
-    raise exception.FailedToParseSensorData(
-        node=node.uuid,
-        error=(_("parse ipmi sensor data failed, unknown sensor type"
-            " data: %(sensors_data)s"), {'sensors_data': sensor_data_dict}))
-
-
-def _parse_ipmi_sensors_data(node, sensors_data):
+def _parse_ipmi_sensors_data(node, sensors_data, sensor_types=None):
     """Parse the IPMI sensors data and format to the dict grouping by type.
 
     We run 'ipmitool' command with 'sdr -v' options, which can return sensor
@@ -516,7 +492,12 @@ def _parse_ipmi_sensors_data(node, sensors_data):
     dict-based data for Ceilometer Collector which can be sent it as payload
     out via notification bus and consumed by Ceilometer Collector.
 
+    The output is parsed in a single pass, and the fields of the sensors
+    whose type is not requested are not kept.
+
     :param sensors_data: the sensor data returned by ipmitool command.
+    :param sensor_types: an optional list of the sensor types to return,
+        compared case-insensitively. All sensor types are returned if None.
     :returns: the sensor data with JSON format, grouped by sensor type.
     :raises: FailedToParseSensorData when error encountered during parsing.
 
@@ -525,21 +506,49 @@ def _parse_ipmi_sensors_data(node, sensors_data):
     if not sensors_data:
         return sensors_data_dict
 
-    sensors_data_array = sensors_data.split('\n\n')
-    for sensor_data in sensors_data_array:
-        sensor_data_dict = _process_sensor(sensor_data)
-        if not sensor_data_dict:
+    if sensor_types is not None:
+        sensor_types = set(t.lower() for t in sensor_types)
+
+    # whether any sensor, requested or not, has a current reading
+    has_reading = False
+    sensor = {}
+    sensor_type = None
+    skipped = False
+    for line in itertools.chain(six.StringIO(sensors_data), ['']):
+        line = line.rstrip('\n')
+        if line:
+            kv_value = line.split(':')
+            if len(kv_value) != 2:
+                continue
+            key = kv_value[0].strip()
+            if key == 'Sensor Reading':
+                has_reading = True
+            if skipped:
+                continue
+            value = kv_value[1].strip()
+            sensor[key] = value
+            if sensor_type is None and key in _SENSOR_TYPE_FIELDS:
+                sensor_type = value.split(' ', 1)[0]
+                skipped = (sensor_types is not None and
+                           sensor_type.lower() not in sensor_types)
             continue
 
-        sensor_type = _get_sensor_type(node, sensor_data_dict)
-
+        # An empty line ends the current sensor.
+        if sensor and sensor_type is None:
+            raise exception.FailedToParseSensorData(
+                node=node.uuid,
+                error=(_("parse ipmi sensor data failed, unknown sensor type"
+                    " data: %(sensors_data)s"), {'sensors_data': sensor}))
         # ignore the sensors which has no current 'Sensor Reading' data
-        if 'Sensor Reading' in sensor_data_dict:
+        if not skipped and 'Sensor Reading' in sensor:
             sensors_data_dict.setdefault(sensor_type,
-                {})[sensor_data_dict['Sensor ID']] = sensor_data_dict
+                {})[sensor['Sensor ID']] = sensor
+        sensor = {}
+        sensor_type = None
+        skipped = False
 
     # get nothing, no valid sensor data
-    if not sensors_data_dict:
+    if not has_reading:
         raise exception.FailedToParseSensorData(
             node=node.uuid,
             error=(_("parse ipmi sensor data failed, get nothing with input"
@@ -794,10 +803,12 @@ class IPMIManagement(base.ManagementInterface):
         response['persistent'] = 'Options apply to all future boots' in out
         return response
 
-    def get_sensors_data(self, task):
+    def get_sensors_data(self, task, sensor_types=None):
         """Get sensors data.
 
         :param task: a TaskManager instance.
+        :param sensor_types: a list of the sensor types to get the data of,
+            or None for all of them.
         :raises: FailedToGetSensorData when getting the sensor data fails.
         :raises: FailedToParseSensorData when parsing sensor data fails.
         :raises: InvalidParameterValue if required ipmi parameters are missing
@@ -816,7 +827,7 @@ class IPMIManagement(base.ManagementInterface):
             raise exception.FailedToGetSensorData(node=task.node.uuid,
                                                   error=e)
 
-        return _parse_ipmi_sensors_data(task.node, out)
+        return _parse_ipmi_sensors_data(task.node, out, sensor_types)
 
 
 class VendorPassthru(base.VendorInterface):
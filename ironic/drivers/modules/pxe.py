@@ -255,7 +255,7 @@ def _create_token_file(task):
     if token:
         timeout = CONF.conductor.deploy_callback_timeout
         if timeout and keystone.token_expires_soon(token, timeout):
-            token = keystone.get_admin_auth_token()
+            token = keystone.get_admin_auth_token(timeout)
         utils.write_to_file(token_file_path, token)
     else:
         utils.unlink_without_raise(token_file_path)
@@ -425,6 +425,20 @@ class PXEDeploy(base.DeployInterface):
         provider = dhcp_factory.DHCPFactory()
         provider.update_dhcp(task, dhcp_opts)
 
+    def prepare_standby(self, task):
+        """Fetch the TFTP images of this task's node into the local cache.
+
+        The images are fetched only as long as they fit in the cache.
+
+        :param task: a TaskManager instance containing the node to act on.
+        """
+        pxe_info = _get_image_info(task.node, task.context)
+        cache = TFTPImageCache()
+        for uuid, path in pxe_info.values():
+            if not cache.cache_image(uuid, ctx=task.context,
+                                     force_raw=CONF.force_raw_images):
+                break
+
 
 class VendorPassthru(base.VendorInterface):
     """Interface to mix IPMI and PXE vendor-specific interfaces."""
@@ -602,11 +602,12 @@ class Management(base.ManagementInterface):
         # it's implemented.
         return {'boot_device': None, 'persistent': None}
 
-    def get_sensors_data(self, task):
+    def get_sensors_data(self, task, sensor_types=None):
         """Get sensors data method.
 
         Not implemented by this driver.
         :param task: a TaskManager instance.
+        :param sensor_types: a list of sensor types, or None.
 
         """
         raise NotImplementedError()
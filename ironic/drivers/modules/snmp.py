@@ -28,6 +28,7 @@ models.
 """
 
 import abc
+import collections
 
 from oslo.config import cfg
 from oslo.utils import importutils
@@ -55,7 +56,12 @@ else:
 opts = [
     cfg.IntOpt('power_timeout',
                default=10,
-               help='Seconds to wait for power action to be completed')
+               help='Seconds to wait for power action to be completed'),
+    cfg.IntOpt('max_oids_per_get',
+               default=24,
+               help='Maximum number of outlet power state objects to '
+                    'request in a single SNMP GET when reading the power '
+                    'states of several nodes powered by the same PDU.'),
     ]
 
 LOG = logging.getLogger(__name__)
@@ -143,10 +149,22 @@ class SNMPClient(object):
         :raises: SNMPFailure if an SNMP request fails.
         :returns: The value of the requested object.
         """
+        return self.get_many([oid])[0]
+
+    def get_many(self, oids):
+        """Use PySNMP to perform an SNMP GET operation on several objects.
+
+        All objects are requested in a single SNMP PDU.
+
+        :param oids: A list of the OIDs of the objects to get.
+        :raises: SNMPFailure if an SNMP request fails.
+        :returns: A list of the values of the requested objects, in the same
+            order as `oids`.
+        """
         try:
             results = self.cmd_gen.getCmd(self._get_auth(),
                                           self._get_transport(),
-                                          oid)
+                                          *oids)
         except snmp_error.PySnmpError as e:
             raise exception.SNMPFailure(operation="GET", error=e)
 
@@ -162,9 +180,8 @@ class SNMPClient(object):
             raise exception.SNMPFailure(operation="GET",
                     error=error_status.prettyPrint())
 
-        # We only expect a single value back
-        name, val = var_binds[0]
-        return val
+        # We expect a value back for each requested object
+        return [val for name, val in var_binds]
 
     def set(self, oid, value):
         """Use PySNMP to perform an SNMP SET operation on a single object.
@@ -217,17 +234,33 @@ class SNMPDriverBase(object):
     oid_enterprise = (1, 3, 6, 1, 4, 1)
     retry_interval = 1
 
-    def __init__(self, snmp_info):
+    def __init__(self, snmp_info, client=None):
         self.snmp_info = snmp_info
-        self.client = _get_client(snmp_info)
+        self.client = client or _get_client(snmp_info)
 
     @abc.abstractmethod
+    def _snmp_power_state_oid(self):
+        """Return the OID of the object holding the current power state.
+
+        :returns: Power state object OID as a tuple of integers.
+        """
+
+    @abc.abstractmethod
+    def _snmp_parse_power_state(self, state):
+        """Translate the value of the power state object to a power state.
+
+        :param state: The value of the power state object.
+        :returns: power state. One of :class:`ironic.common.states`.
+        """
+
     def _snmp_power_state(self):
         """Perform the SNMP request required to get the current power state.
 
         :raises: SNMPFailure if an SNMP request fails.
         :returns: power state. One of :class:`ironic.common.states`.
         """
+        state = self.client.get(self._snmp_power_state_oid())
+        return self._snmp_parse_power_state(state)
 
     @abc.abstractmethod
     def _snmp_power_on(self):
@@ -351,9 +384,10 @@ class SNMPDriverSimple(SNMPDriverBase):
         outlet = int(self.snmp_info['outlet'])
         return self.oid_enterprise + self.oid_device + (outlet,)
 
-    def _snmp_power_state(self):
-        state = self.client.get(self.oid)
+    def _snmp_power_state_oid(self):
+        return self.oid
 
+    def _snmp_parse_power_state(self, state):
         # Translate the state to an Ironic power state.
         if state == self.value_power_on:
             power_state = states.POWER_ON
@@ -490,10 +524,10 @@ class SNMPDriverEatonPower(SNMPDriverBase):
         outlet = int(self.snmp_info['outlet'])
         return self.oid_base + oid + (outlet,)
 
-    def _snmp_power_state(self):
-        oid = self._snmp_oid(self.oid_status)
-        state = self.client.get(oid)
+    def _snmp_power_state_oid(self):
+        return self._snmp_oid(self.oid_status)
 
+    def _snmp_parse_power_state(self, state):
         # Translate the state to an Ironic power state.
         if state in (self.status_on, self.status_pending_off):
             power_state = states.POWER_ON
@@ -609,6 +643,38 @@ def _get_driver(node):
     return cls(snmp_info)
 
 
+def _get_pdu_key(snmp_info):
+    """Return a key identifying the PDU and credentials of a node.
+
+    :param snmp_info: SNMP driver info.
+    :returns: A tuple which is equal for nodes powered by the same PDU that
+        may be queried with the same SNMP request.
+    """
+    return (snmp_info['address'], snmp_info['port'], snmp_info['version'],
+            snmp_info.get('community'), snmp_info.get('security'))
+
+
+def _get_pdu_power_states(drivers):
+    """Get the power states of several outlets of a single PDU.
+
+    The power state objects of the outlets are requested with as few
+    SNMP GET operations as possible.
+
+    :param drivers: A list of SNMP driver objects sharing a single client.
+    :raises: SNMPFailure if an SNMP request fails.
+    :returns: A list of power states, one of :class:`ironic.common.states`,
+        in the same order as `drivers`.
+    """
+    client = drivers[0].client
+    oids = [driver._snmp_power_state_oid() for driver in drivers]
+    step = CONF.snmp.max_oids_per_get
+    values = []
+    for i in range(0, len(oids), step):
+        values.extend(client.get_many(oids[i:i + step]))
+    return [driver._snmp_parse_power_state(value)
+            for driver, value in zip(drivers, values)]
+
+
 class SNMPPower(base.PowerInterface):
     """SNMP Power Interface.
 
@@ -646,6 +712,57 @@ class SNMPPower(base.PowerInterface):
         power_state = driver.power_state()
         return power_state
 
+    def get_power_states(self, tasks):
+        """Get the current power states of several nodes.
+
+        Nodes are grouped by the PDU powering them, and the power states of
+        all of a PDU's outlets are read with a single SNMP request, rather
+        than one request per node.
+
+        :param tasks: A list of `ironic.manager.task_manager.TaskManager`
+            instances.
+        :returns: A dict mapping node UUIDs to power states, one of
+            :class:`ironic.common.states`. Nodes whose power state could not
+            be read, because of invalid SNMP parameters, an invalid outlet
+            or a failed SNMP request, are not included.
+        """
+        pdus = collections.defaultdict(list)
+        for task in tasks:
+            try:
+                snmp_info = _parse_driver_info(task.node)
+            except (exception.MissingParameterValue,
+                    exception.InvalidParameterValue):
+                continue
+            pdus[_get_pdu_key(snmp_info)].append((task.node.uuid, snmp_info))
+
+        power_states = {}
+        for outlets in pdus.values():
+            client = _get_client(outlets[0][1])
+            node_uuids = []
+            drivers = []
+            for node_uuid, info in outlets:
+                try:
+                    drivers.append(DRIVER_CLASSES[info['driver']](info,
+                                                                  client))
+                except ValueError:
+                    LOG.debug("Invalid outlet %(outlet)s of SNMP PDU "
+                              "%(addr)s for node %(node)s",
+                              {'outlet': info['outlet'],
+                               'addr': client.address, 'node': node_uuid})
+                    continue
+                node_uuids.append(node_uuid)
+            if not drivers:
+                continue
+            try:
+                pdu_states = _get_pdu_power_states(drivers)
+            except exception.SNMPFailure as e:
+                LOG.warning(_LW("Failed to get the power states of the "
+                                "outlets of SNMP PDU %(addr)s: %(error)s"),
+                            {'addr': client.address, 'error': e})
+                continue
+            power_states.update(zip(node_uuids, pdu_states))
+        return power_states
+
     @task_manager.require_exclusive_lock
     def set_power_state(self, task, pstate):
         """Turn the power on or off.
@@ -26,10 +26,14 @@ Currently supported environments are:
     Parallels   (parallels)
 """
 
+import collections
+import contextlib
 import os
+import time
 
 from oslo.concurrency import processutils
 from oslo.config import cfg
+from oslo.utils import excutils
 
 from ironic.common import boot_devices
 from ironic.common import exception
@@ -49,11 +53,36 @@ libvirt_opts = [
                help='libvirt uri')
 ]
 
+connection_opts = [
+    cfg.IntOpt('connection_pool_size',
+               default=50,
+               help='Maximum number of SSH connections to keep open for '
+                    'reuse by later operations. When the limit is reached, '
+                    'the least recently used connection is closed. Set to 0 '
+                    'to open a new connection for every operation.'),
+    cfg.IntOpt('connection_idle_timeout',
+               default=120,
+               help='Number of seconds after which an SSH connection that '
+                    'has not been used is closed.'),
+    cfg.IntOpt('vm_mac_cache_timeout',
+               default=300,
+               help='Number of seconds for which the MAC addresses of the '
+                    'VMs listed on a hypervisor are cached to look up the '
+                    'VM of a node. A lookup of a MAC address missing from '
+                    'the cache lists the VMs again. Set to 0 to disable '
+                    'caching.'),
+]
+
 CONF = cfg.CONF
 CONF.register_opts(libvirt_opts, group='ssh')
+CONF.register_opts(connection_opts, group='ssh')
 
 LOG = logging.getLogger(__name__)
 
+# maps a (host, port, base_cmd) tuple identifying a hypervisor to a
+# (listed_at, {mac: vm_name}) tuple.
+_VM_MAC_INDEX = {}
+
 REQUIRED_PROPERTIES = {
     'ssh_address': _("IP address or hostname of the node to ssh into. "
                      "Required."),
@@ -219,7 +248,8 @@ def _get_boot_device(ssh_obj, driver_info):
         base_cmd = driver_info['cmd_set']['base_cmd']
         cmd_to_exec = cmd_to_exec.replace('{_NodeName_}', node_name)
         cmd_to_exec = cmd_to_exec.replace('{_BaseCmd_}', base_cmd)
-        stdout, stderr = _ssh_execute(ssh_obj, cmd_to_exec)
+        stdout, stderr = _ssh_execute_on_vm(ssh_obj, driver_info,
+                                            cmd_to_exec)
         return next((dev for dev, hdev in boot_device_map.items()
                      if hdev == stdout), None)
     else:
@@ -244,7 +274,7 @@ def _set_boot_device(ssh_obj, driver_info, device):
         cmd_to_exec = cmd_to_exec.replace('{_NodeName_}', node_name)
         cmd_to_exec = cmd_to_exec.replace('{_BootDevice_}', device)
         cmd_to_exec = cmd_to_exec.replace('{_BaseCmd_}', base_cmd)
-        _ssh_execute(ssh_obj, cmd_to_exec)
+        _ssh_execute_on_vm(ssh_obj, driver_info, cmd_to_exec)
     else:
         raise NotImplementedError()
 
@@ -331,6 +361,22 @@ def _parse_driver_info(node):
     return res
 
 
+def _get_power_state_from_list(node_name, running_list):
+    """Returns a node's power state given the list of running VMs.
+
+    :param node_name: the name the host uses to reference the node.
+    :param running_list: the output of the list_running command.
+    :returns: one of ironic.common.states POWER_OFF, POWER_ON.
+
+    """
+    for node in running_list:
+        if not node:
+            continue
+        if node_name in node:
+            return states.POWER_ON
+    return states.POWER_OFF
+
+
 def _get_power_status(ssh_obj, driver_info):
     """Returns a node's current power state.
 
@@ -340,7 +386,6 @@ def _get_power_status(ssh_obj, driver_info):
     :raises: NodeNotFound
 
     """
-    power_state = None
     cmd_to_exec = "%s %s" % (driver_info['cmd_set']['base_cmd'],
                              driver_info['cmd_set']['list_running'])
     running_list = _ssh_execute(ssh_obj, cmd_to_exec)
@@ -348,14 +393,7 @@ def _get_power_status(ssh_obj, driver_info):
     # not listed then we can assume it is not powered on.
     node_name = _get_hosts_name_for_node(ssh_obj, driver_info)
     if node_name:
-        for node in running_list:
-            if not node:
-                continue
-            if node_name in node:
-                power_state = states.POWER_ON
-                break
-        if not power_state:
-            power_state = states.POWER_OFF
+        power_state = _get_power_state_from_list(node_name, running_list)
     else:
         err_msg = _LE('Node "%(host)s" with MAC address %(mac)s not found.')
         LOG.error(err_msg, {'host': driver_info['host'],
@@ -366,14 +404,255 @@ def _get_power_status(ssh_obj, driver_info):
     return power_state
 
 
+class _SSHConnectionPool(object):
+    """A bounded pool of open SSH connections.
+
+    Connections are keyed by the address and credentials used to open them,
+    so that nodes hosted by the same hypervisor share a single connection.
+    A paramiko connection multiplexes a new channel for every command it
+    executes, so a pooled connection may be used by several operations at
+    the same time.
+
+    A connection is checked out by :meth:`get` until it is given back with
+    :meth:`release`. A connection dropped from the pool while checked out
+    is only closed once it is released by all the operations using it.
+    """
+
+    def __init__(self):
+        # maps a connection key to a (client, last_used) tuple, least
+        # recently used first.
+        self._connections = collections.OrderedDict()
+        # maps a client to the number of operations using it
+        self._checked_out = collections.Counter()
+        # checked out clients to close once they are released
+        self._closing = set()
+
+    @staticmethod
+    def _get_key(driver_info):
+        return tuple(driver_info.get(k) for k in ('host', 'port', 'username',
+                                                  'password', 'key_contents',
+                                                  'key_filename'))
+
+    @staticmethod
+    def _is_alive(client):
+        transport = client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def _close(self, client):
+        try:
+            client.close()
+        except Exception as e:
+            LOG.debug("Failed to close SSH connection: %s", e)
+
+    def _discard(self, client):
+        if self._checked_out[client]:
+            self._closing.add(client)
+        else:
+            self._close(client)
+
+    def _check_out(self, client):
+        self._checked_out[client] += 1
+        return client
+
+    def _evict_idle(self, now):
+        expired = now - CONF.ssh.connection_idle_timeout
+        for key, (client, last_used) in list(self._connections.items()):
+            if last_used > expired:
+                # the remaining connections have been used more recently
+                break
+            del self._connections[key]
+            self._discard(client)
+
+    def get(self, driver_info):
+        """Check out an SSH connection, reusing a pooled one if possible.
+
+        :param driver_info: information for accessing the hypervisor, as
+            returned by :func:`_parse_driver_info`.
+        :returns: paramiko.SSHClient, an active ssh connection.
+        :raises: SSHConnectFailed if a new connection could not be opened.
+
+        """
+        if CONF.ssh.connection_pool_size <= 0:
+            client = self._check_out(utils.ssh_connect(driver_info))
+            self._closing.add(client)
+            return client
+
+        now = time.time()
+        self._evict_idle(now)
+        key = self._get_key(driver_info)
+        entry = self._connections.pop(key, None)
+        if entry is not None:
+            client = entry[0]
+            if self._is_alive(client):
+                self._connections[key] = (client, now)
+                return self._check_out(client)
+            LOG.debug("Discarding inactive SSH connection to %s.",
+                      driver_info['host'])
+            self._discard(client)
+
+        client = utils.ssh_connect(driver_info)
+        # Another operation may have pooled a connection to the same host
+        # while this one was being opened, in which case it is shared and
+        # the new connection, which has not been used yet, is closed.
+        entry = self._connections.pop(key, None)
+        if entry is not None:
+            if self._is_alive(entry[0]):
+                self._connections[key] = entry
+                self._close(client)
+                return self._check_out(entry[0])
+            self._discard(entry[0])
+        self._connections[key] = (client, time.time())
+        self._check_out(client)
+        while len(self._connections) > CONF.ssh.connection_pool_size:
+            old_key, (old_client, last_used) = self._connections.popitem(
+                last=False)
+            self._discard(old_client)
+        return client
+
+    def release(self, client):
+        """Give back a connection checked out by :meth:`get`.
+
+        :param client: paramiko.SSHClient, as returned by :meth:`get`.
+
+        """
+        if not self._checked_out[client]:
+            return
+        self._checked_out[client] -= 1
+        if self._checked_out[client]:
+            return
+        del self._checked_out[client]
+        if client in self._closing:
+            self._closing.remove(client)
+            self._close(client)
+
+    def clear(self):
+        """Close all the pooled connections.
+
+        The connections that are checked out are closed once released.
+        """
+        while self._connections:
+            key, (client, last_used) = self._connections.popitem()
+            self._discard(client)
+
+
+_CONNECTION_POOL = _SSHConnectionPool()
+
+
 def _get_connection(node):
     """Returns an SSH client connected to a node.
 
+    The connection is taken from a pool of connections shared by all the
+    nodes using the same hypervisor address and credentials. It must be
+    given back with _CONNECTION_POOL.release(), see :func:`_connection`.
+
     :param node: the Node.
     :returns: paramiko.SSHClient, an active ssh connection.
 
     """
-    return utils.ssh_connect(_parse_driver_info(node))
+    return _CONNECTION_POOL.get(_parse_driver_info(node))
+
+
+@contextlib.contextmanager
+def _connection(node):
+    """Check out an SSH client connected to a node for a block of code.
+
+    :param node: the Node.
+    :returns: a context manager giving a paramiko.SSHClient, an active ssh
+        connection, that is not closed by the pool until the block exits.
+
+    """
+    ssh_obj = _get_connection(node)
+    try:
+        yield ssh_obj
+    finally:
+        _CONNECTION_POOL.release(ssh_obj)
+
+
+def _list_vm_macs(ssh_obj, driver_info):
+    """List the MAC addresses of all the VMs on a hypervisor.
+
+    The VMs and their MAC addresses are listed with a single command,
+    rather than one command per VM.
+
+    :param ssh_obj: paramiko.SSHClient, an active ssh connection.
+    :param driver_info: information for accessing the node.
+    :returns: a dict mapping normalized MAC addresses to VM names.
+    :raises: SSHCommandFailed on an error from ssh.
+
+    """
+    cmd_set = driver_info['cmd_set']
+    get_node_macs = "%s %s" % (cmd_set['base_cmd'], cmd_set['get_node_macs'])
+    get_node_macs = get_node_macs.replace('"{_NodeName_}"', '{_NodeName_}')
+    get_node_macs = get_node_macs.replace('{_NodeName_}', '"$_NodeName_"')
+    # The inner command reads from /dev/null, or it could consume the
+    # names of the next VMs from the outer loop's input.
+    cmd_to_exec = ('(%(base_cmd)s %(list_all)s) | '
+                   'while read -r _NodeName_; do '
+                   '[ -n "$_NodeName_" ] || continue; '
+                   '(%(get_node_macs)s) </dev/null | while read -r _Mac_; do '
+                   'echo "$_NodeName_ $_Mac_"; done; done'
+                   % {'base_cmd': cmd_set['base_cmd'],
+                      'list_all': cmd_set['list_all'],
+                      'get_node_macs': get_node_macs})
+    vm_macs = {}
+    for line in _ssh_execute(ssh_obj, cmd_to_exec):
+        try:
+            name, mac = line.rsplit(None, 1)
+        except ValueError:
+            continue
+        # Keep the first VM listed if several share a MAC address.
+        vm_macs.setdefault(_normalize_mac(mac), name)
+    LOG.debug("Retrieved VM MAC addresses: %s" % repr(vm_macs))
+
+    if CONF.ssh.vm_mac_cache_timeout > 0:
+        _VM_MAC_INDEX[_get_vm_macs_key(driver_info)] = (time.time(), vm_macs)
+    return vm_macs
+
+
+def _get_vm_macs_key(driver_info):
+    return (driver_info['host'], driver_info['port'],
+            driver_info['cmd_set']['base_cmd'])
+
+
+def _get_cached_vm_macs(driver_info):
+    """Get the cached MAC addresses of the VMs on a hypervisor.
+
+    :param driver_info: information for accessing the node.
+    :returns: a dict mapping normalized MAC addresses to VM names, or None
+        if the VMs have not been listed in the last vm_mac_cache_timeout
+        seconds.
+
+    """
+    key = _get_vm_macs_key(driver_info)
+    cached = _VM_MAC_INDEX.get(key)
+    if cached is None:
+        return None
+    listed_at, vm_macs = cached
+    if time.time() - listed_at >= CONF.ssh.vm_mac_cache_timeout:
+        del _VM_MAC_INDEX[key]
+        return None
+    return vm_macs
+
+
+def _ssh_execute_on_vm(ssh_obj, driver_info, cmd_to_exec):
+    """Executes a command on the VM of a node via ssh.
+
+    The name of the VM in the command may come from the cached MAC
+    addresses of the VMs on the hypervisor. They are dropped from the cache
+    if the command fails, in case the VM was renamed or recreated.
+
+    :param ssh_obj: paramiko.SSHClient, an active ssh connection.
+    :param driver_info: information for accessing the node.
+    :param cmd_to_exec: command to execute.
+    :returns: list of the lines of output from the command.
+    :raises: SSHCommandFailed on an error from ssh.
+
+    """
+    try:
+        return _ssh_execute(ssh_obj, cmd_to_exec)
+    except exception.SSHCommandFailed:
+        with excutils.save_and_reraise_exception():
+            _VM_MAC_INDEX.pop(_get_vm_macs_key(driver_info), None)
 
 
 def _get_hosts_name_for_node(ssh_obj, driver_info):
@@ -384,38 +663,23 @@ def _get_hosts_name_for_node(ssh_obj, driver_info):
     :returns: the name or None if not found.
 
     """
-    matched_name = None
-    cmd_to_exec = "%s %s" % (driver_info['cmd_set']['base_cmd'],
-                             driver_info['cmd_set']['list_all'])
-    full_node_list = _ssh_execute(ssh_obj, cmd_to_exec)
-    LOG.debug("Retrieved Node List: %s" % repr(full_node_list))
-    # for each node check Mac Addresses
-    for node in full_node_list:
-        if not node:
-            continue
-        LOG.debug("Checking Node: %s's Mac address." % node)
-        cmd_to_exec = "%s %s" % (driver_info['cmd_set']['base_cmd'],
-                                 driver_info['cmd_set']['get_node_macs'])
-        cmd_to_exec = cmd_to_exec.replace('{_NodeName_}', node)
-        hosts_node_mac_list = _ssh_execute(ssh_obj, cmd_to_exec)
-
-        for host_mac in hosts_node_mac_list:
-            if not host_mac:
+    def _find_name(vm_macs):
+        for node_mac in driver_info['macs']:
+            if not node_mac:
                 continue
-            for node_mac in driver_info['macs']:
-                if not node_mac:
-                    continue
-                if _normalize_mac(host_mac) in _normalize_mac(node_mac):
-                    LOG.debug("Found Mac address: %s" % node_mac)
-                    matched_name = node
-                    break
-
-            if matched_name:
-                break
+            name = vm_macs.get(_normalize_mac(node_mac))
+            if name:
+                LOG.debug("Found Mac address: %s" % node_mac)
+                return name
+
+    vm_macs = _get_cached_vm_macs(driver_info)
+    if vm_macs is not None:
+        matched_name = _find_name(vm_macs)
         if matched_name:
-            break
+            return matched_name
+        # The VM may have been created since the VMs were last listed.
 
-    return matched_name
+    return _find_name(_list_vm_macs(ssh_obj, driver_info))
 
 
 def _power_on(ssh_obj, driver_info):
@@ -435,7 +699,7 @@ def _power_on(ssh_obj, driver_info):
                                  driver_info['cmd_set']['start_cmd'])
     cmd_to_power_on = cmd_to_power_on.replace('{_NodeName_}', node_name)
 
-    _ssh_execute(ssh_obj, cmd_to_power_on)
+    _ssh_execute_on_vm(ssh_obj, driver_info, cmd_to_power_on)
 
     current_pstate = _get_power_status(ssh_obj, driver_info)
     if current_pstate == states.POWER_ON:
@@ -461,7 +725,7 @@ def _power_off(ssh_obj, driver_info):
                                   driver_info['cmd_set']['stop_cmd'])
     cmd_to_power_off = cmd_to_power_off.replace('{_NodeName_}', node_name)
 
-    _ssh_execute(ssh_obj, cmd_to_power_off)
+    _ssh_execute_on_vm(ssh_obj, driver_info, cmd_to_power_off)
 
     current_pstate = _get_power_status(ssh_obj, driver_info)
     if current_pstate == states.POWER_OFF:
@@ -470,6 +734,44 @@ def _power_off(ssh_obj, driver_info):
         return states.ERROR
 
 
+def _get_hosted_power_states(ssh_obj, nodes):
+    """Get the power states of several nodes hosted by the same host.
+
+    :param ssh_obj: paramiko.SSHClient, an active ssh connection.
+    :param nodes: a list of (node, driver_info) tuples.
+    :returns: a dict mapping node UUIDs to power states, for the nodes whose
+        VM could be found.
+    :raises: SSHCommandFailed if the running VMs could not be listed.
+
+    """
+    cmd_set = nodes[0][1]['cmd_set']
+    running_list = None
+    # Some virt_types can only tell whether a single VM is running, in
+    # which case each node is queried separately.
+    if '{_NodeName_}' not in cmd_set['list_running']:
+        running_list = _ssh_execute(ssh_obj, "%s %s" % (
+            cmd_set['base_cmd'], cmd_set['list_running']))
+
+    power_states = {}
+    for node, driver_info in nodes:
+        try:
+            if running_list is None:
+                power_states[node.uuid] = _get_power_status(ssh_obj,
+                                                            driver_info)
+                continue
+            node_name = _get_hosts_name_for_node(ssh_obj, driver_info)
+        except (exception.NodeNotFound,
+                exception.SSHCommandFailed) as e:
+            LOG.debug("Failed to get the power state of node "
+                      "%(node)s: %(error)s",
+                      {'node': node.uuid, 'error': e})
+            continue
+        if node_name:
+            power_states[node.uuid] = _get_power_state_from_list(
+                node_name, running_list)
+    return power_states
+
+
 class SSHPower(base.PowerInterface):
     """SSH Power Interface.
 
@@ -499,7 +801,8 @@ class SSHPower(base.PowerInterface):
             raise exception.MissingParameterValue(_("Node %s does not have "
                               "any port associated with it.") % task.node.uuid)
         try:
-            _get_connection(task.node)
+            with _connection(task.node):
+                pass
         except exception.SSHConnectFailed as e:
             raise exception.InvalidParameterValue(_("SSH connection cannot"
                                                     " be established: %s") % e)
@@ -520,8 +823,48 @@ class SSHPower(base.PowerInterface):
         """
         driver_info = _parse_driver_info(task.node)
         driver_info['macs'] = driver_utils.get_node_mac_addresses(task)
-        ssh_obj = _get_connection(task.node)
-        return _get_power_status(ssh_obj, driver_info)
+        with _connection(task.node) as ssh_obj:
+            return _get_power_status(ssh_obj, driver_info)
+
+    def get_power_states(self, tasks):
+        """Get the current power states of several nodes.
+
+        Nodes are grouped by the host running their VMs, and the running
+        VMs of each host are listed once for all of its nodes, rather than
+        once per node.
+
+        :param tasks: a list of TaskManager instances, each containing a
+            node to get the power state of.
+        :returns: a dict mapping node UUIDs to power states, one of
+            :class:`ironic.common.states`. Nodes whose power state could not
+            be read, because of invalid driver_info, an error from ssh or
+            a VM that could not be found, are not included.
+        """
+        hosts = collections.defaultdict(list)
+        for task in tasks:
+            try:
+                driver_info = _parse_driver_info(task.node)
+            except (exception.InvalidParameterValue,
+                    exception.MissingParameterValue):
+                continue
+            driver_info['macs'] = driver_utils.get_node_mac_addresses(task)
+            key = (driver_info['host'], driver_info['port'],
+                   driver_info['username'], driver_info['cmd_set']['base_cmd'])
+            hosts[key].append((task.node, driver_info))
+
+        power_states = {}
+        for nodes in hosts.values():
+            node, driver_info = nodes[0]
+            try:
+                with _connection(node) as ssh_obj:
+                    power_states.update(
+                        _get_hosted_power_states(ssh_obj, nodes))
+            except (exception.SSHConnectFailed,
+                    exception.SSHCommandFailed) as e:
+                LOG.warning(_LW("Failed to get the power states of the "
+                                "nodes hosted by %(host)s: %(error)s"),
+                            {'host': driver_info['host'], 'error': e})
+        return power_states
 
     @task_manager.require_exclusive_lock
     def set_power_state(self, task, pstate):
@@ -542,15 +885,14 @@ class SSHPower(base.PowerInterface):
         """
         driver_info = _parse_driver_info(task.node)
         driver_info['macs'] = driver_utils.get_node_mac_addresses(task)
-        ssh_obj = _get_connection(task.node)
-
-        if pstate == states.POWER_ON:
-            state = _power_on(ssh_obj, driver_info)
-        elif pstate == states.POWER_OFF:
-            state = _power_off(ssh_obj, driver_info)
-        else:
-            raise exception.InvalidParameterValue(_("set_power_state called "
-                    "with invalid power state %s.") % pstate)
+        with _connection(task.node) as ssh_obj:
+            if pstate == states.POWER_ON:
+                state = _power_on(ssh_obj, driver_info)
+            elif pstate == states.POWER_OFF:
+                state = _power_off(ssh_obj, driver_info)
+            else:
+                raise exception.InvalidParameterValue(_("set_power_state "
+                        "called with invalid power state %s.") % pstate)
 
         if state != pstate:
             raise exception.PowerStateFailure(pstate=pstate)
@@ -572,12 +914,12 @@ class SSHPower(base.PowerInterface):
         """
         driver_info = _parse_driver_info(task.node)
         driver_info['macs'] = driver_utils.get_node_mac_addresses(task)
-        ssh_obj = _get_connection(task.node)
-        current_pstate = _get_power_status(ssh_obj, driver_info)
-        if current_pstate == states.POWER_ON:
-            _power_off(ssh_obj, driver_info)
+        with _connection(task.node) as ssh_obj:
+            current_pstate = _get_power_status(ssh_obj, driver_info)
+            if current_pstate == states.POWER_ON:
+                _power_off(ssh_obj, driver_info)
 
-        state = _power_on(ssh_obj, driver_info)
+            state = _power_on(ssh_obj, driver_info)
 
         if state != states.POWER_ON:
             raise exception.PowerStateFailure(pstate=states.POWER_ON)
@@ -637,11 +979,11 @@ class SSHManagement(base.ManagementInterface):
             raise exception.InvalidParameterValue(_(
                 "Invalid boot device %s specified.") % device)
         driver_info['macs'] = driver_utils.get_node_mac_addresses(task)
-        ssh_obj = _get_connection(node)
-
         boot_device_map = _get_boot_device_map(driver_info['virt_type'])
         try:
-            _set_boot_device(ssh_obj, driver_info, boot_device_map[device])
+            with _connection(node) as ssh_obj:
+                _set_boot_device(ssh_obj, driver_info,
+                                 boot_device_map[device])
         except NotImplementedError:
             LOG.error(_LE("Failed to set boot device for node %(node)s, "
                           "virt_type %(vtype)s does not support this "
@@ -672,10 +1014,11 @@ class SSHManagement(base.ManagementInterface):
         node = task.node
         driver_info = _parse_driver_info(node)
         driver_info['macs'] = driver_utils.get_node_mac_addresses(task)
-        ssh_obj = _get_connection(node)
         response = {'boot_device': None, 'persistent': None}
         try:
-            response['boot_device'] = _get_boot_device(ssh_obj, driver_info)
+            with _connection(node) as ssh_obj:
+                response['boot_device'] = _get_boot_device(ssh_obj,
+                                                           driver_info)
         except NotImplementedError:
             LOG.warning(_LW("Failed to get boot device for node %(node)s, "
                             "virt_type %(vtype)s does not support this "
@@ -683,12 +1026,13 @@ class SSHManagement(base.ManagementInterface):
                         {'node': node.uuid, 'vtype': driver_info['virt_type']})
         return response
 
-    def get_sensors_data(self, task):
+    def get_sensors_data(self, task, sensor_types=None):
         """Get sensors data.
 
         Not implemented by this driver.
 
         :param task: a TaskManager instance.
+        :param sensor_types: a list of sensor types, or None.
 
         """
         raise NotImplementedError()
@@ -31,7 +31,8 @@ class Node(base.IronicObject):
     # Version 1.6: Add reserve() and release()
     # Version 1.7: Add conductor_affinity
     # Version 1.8: Add maintenance_reason
-    VERSION = '1.8'
+    # Version 1.9: Add use_slave to list()
+    VERSION = '1.9'
 
     dbapi = db_api.get_instance()
 
@@ -133,7 +134,7 @@ class Node(base.IronicObject):
 
     @base.remotable_classmethod
     def list(cls, context, limit=None, marker=None, sort_key=None,
-             sort_dir=None, filters=None):
+             sort_dir=None, filters=None, use_slave=False):
         """Return a list of Node objects.
 
         :param context: Security context.
@@ -142,12 +143,15 @@ class Node(base.IronicObject):
         :param sort_key: column to sort results by.
         :param sort_dir: direction to sort. "asc" or "desc".
         :param filters: Filters to apply.
+        :param use_slave: If True, read from the slave database, if one
+                          is configured.
         :returns: a list of :class:`Node` object.
 
         """
         db_nodes = cls.dbapi.get_node_list(filters=filters, limit=limit,
                                            marker=marker, sort_key=sort_key,
-                                           sort_dir=sort_dir)
+                                           sort_dir=sort_dir,
+                                           use_slave=use_slave)
         return [Node._from_db_object(cls(context), obj) for obj in db_nodes]
 
     @base.remotable_classmethod
@@ -232,7 +236,8 @@ class Node(base.IronicObject):
                         object, e.g.: Node(context)
         """
         updates = self.obj_get_changes()
-        self.dbapi.update_node(self.uuid, updates)
+        if updates:
+            self.dbapi.update_node(self.uuid, updates)
         self.obj_reset_changes()
 
     @base.remotable
@@ -21,7 +21,10 @@ from oslo.config import cfg
 from oslo import messaging
 
 from ironic.api.controllers import root
+from ironic.api import hooks
+from ironic.conductor import rpcapi
 from ironic.tests.api import base
+from ironic.tests import base as tests_base
 
 
 class TestNoExceptionTracebackHook(base.FunctionalTest):
@@ -96,3 +99,17 @@ class TestNoExceptionTracebackHook(base.FunctionalTest):
         actual_msg = json.loads(
             response.json['error_message'])['faultstring']
         self.assertEqual(self.MSG_WITH_TRACE, actual_msg)
+
+
+class TestRPCHook(tests_base.TestCase):
+
+    @mock.patch.object(rpcapi, 'ConductorAPI')
+    def test_rpcapi_shared_between_requests(self, mock_rpcapi):
+        hook = hooks.RPCHook()
+        state1 = mock.Mock()
+        state2 = mock.Mock()
+        hook.before(state1)
+        hook.before(state2)
+        mock_rpcapi.assert_called_once_with()
+        self.assertIs(mock_rpcapi.return_value, state1.request.rpcapi)
+        self.assertIs(mock_rpcapi.return_value, state2.request.rpcapi)
@@ -31,7 +31,9 @@ import fixtures
 from oslo.config import cfg
 import testtools
 
+from ironic.common.glance_service import base_image_service
 from ironic.common import hash_ring
+from ironic.conductor import utils as conductor_utils
 from ironic.objects import base as objects_base
 from ironic.openstack.common import context as ironic_context
 from ironic.openstack.common import log as logging
@@ -106,6 +108,8 @@ class TestCase(testtools.TestCase):
 
         self.addCleanup(self._clear_attrs)
         self.addCleanup(hash_ring.HashRingManager().reset)
+        self.addCleanup(base_image_service._IMAGE_CACHE.clear)
+        self.addCleanup(conductor_utils._POWER_STATES.clear)
         self.useFixture(fixtures.EnvironmentVariable('http_proxy'))
         self.policy = self.useFixture(policy_fixture.PolicyFixture())
         CONF.set_override('fatal_exception_format_errors', True)
@@ -260,6 +260,126 @@ class NodePowerActionTestCase(base.DbTestCase):
                 self.assertIsNone(node['target_power_state'])
                 self.assertIsNotNone(node['last_error'])
 
+    def test_node_power_action_recent_power_state(self):
+        """Test the pre-read is skipped with a recent power state."""
+        node = obj_utils.create_test_node(self.context,
+                                          uuid=cmn_utils.generate_uuid(),
+                                          driver='fake',
+                                          power_state=states.POWER_OFF)
+        task = task_manager.TaskManager(self.context, node.uuid)
+        conductor_utils.record_power_state(node.uuid, states.POWER_OFF)
+
+        with mock.patch.object(self.driver.power,
+                               'get_power_state') as get_power_mock:
+            with mock.patch.object(self.driver.power,
+                                   'set_power_state') as set_power_mock:
+                conductor_utils.node_power_action(task, states.POWER_ON)
+
+                self.assertFalse(get_power_mock.called)
+                set_power_mock.assert_called_once_with(mock.ANY,
+                                                       states.POWER_ON)
+                self.assertEqual(states.POWER_ON,
+                                 conductor_utils.get_recent_power_state(
+                                     node.uuid))
+
+    def test_node_power_action_recent_power_state_same(self):
+        """Test the power state is read when the recent one is the target."""
+        node = obj_utils.create_test_node(self.context,
+                                          uuid=cmn_utils.generate_uuid(),
+                                          driver='fake',
+                                          power_state=states.POWER_ON)
+        task = task_manager.TaskManager(self.context, node.uuid)
+        conductor_utils.record_power_state(node.uuid, states.POWER_OFF)
+
+        with mock.patch.object(self.driver.power,
+                               'get_power_state') as get_power_mock:
+            with mock.patch.object(self.driver.power,
+                                   'set_power_state') as set_power_mock:
+                get_power_mock.return_value = states.POWER_ON
+
+                conductor_utils.node_power_action(task, states.POWER_OFF)
+
+                get_power_mock.assert_called_once_with(mock.ANY)
+                set_power_mock.assert_called_once_with(mock.ANY,
+                                                       states.POWER_OFF)
+
+    @mock.patch.object(conductor_utils.time, 'time')
+    def test_node_power_action_stale_power_state(self, time_mock):
+        """Test the power state is read when the recorded one is stale."""
+        self.config(power_state_cache_max_age=60, group='conductor')
+        node = obj_utils.create_test_node(self.context,
+                                          uuid=cmn_utils.generate_uuid(),
+                                          driver='fake',
+                                          power_state=states.POWER_OFF)
+        task = task_manager.TaskManager(self.context, node.uuid)
+        time_mock.return_value = 1000
+        conductor_utils.record_power_state(node.uuid, states.POWER_OFF)
+        time_mock.return_value = 1061
+
+        with mock.patch.object(self.driver.power,
+                               'get_power_state') as get_power_mock:
+            get_power_mock.return_value = states.POWER_OFF
+
+            conductor_utils.node_power_action(task, states.POWER_ON)
+
+            get_power_mock.assert_called_once_with(mock.ANY)
+
+    def test_node_power_action_failure_forgets_power_state(self):
+        """Test a failed power action forgets the recorded power state."""
+        node = obj_utils.create_test_node(self.context,
+                                          uuid=cmn_utils.generate_uuid(),
+                                          driver='fake',
+                                          power_state=states.POWER_OFF)
+        task = task_manager.TaskManager(self.context, node.uuid)
+        conductor_utils.record_power_state(node.uuid, states.POWER_OFF)
+
+        with mock.patch.object(self.driver.power,
+                               'set_power_state') as set_power_mock:
+            set_power_mock.side_effect = exception.IronicException()
+
+            self.assertRaises(exception.IronicException,
+                              conductor_utils.node_power_action,
+                              task, states.POWER_ON)
+
+            self.assertIsNone(conductor_utils.get_recent_power_state(
+                node.uuid))
+
+
+class RecordPowerStateTestCase(tests_base.TestCase):
+
+    def test_record_power_state(self):
+        conductor_utils.record_power_state('fake-uuid', states.POWER_ON)
+        self.assertEqual(states.POWER_ON,
+                         conductor_utils.get_recent_power_state('fake-uuid'))
+
+    def test_record_power_state_error(self):
+        conductor_utils.record_power_state('fake-uuid', states.POWER_ON)
+        conductor_utils.record_power_state('fake-uuid', states.ERROR)
+        self.assertIsNone(conductor_utils.get_recent_power_state('fake-uuid'))
+
+    def test_get_recent_power_state_disabled(self):
+        self.config(power_state_cache_max_age=0, group='conductor')
+        with mock.patch.object(conductor_utils.time, 'time') as time_mock:
+            time_mock.return_value = 1000
+            conductor_utils.record_power_state('fake-uuid', states.POWER_ON)
+            time_mock.return_value = 1000.5
+            self.assertIsNone(
+                conductor_utils.get_recent_power_state('fake-uuid'))
+
+    def test_prune_power_states(self):
+        with mock.patch.object(conductor_utils.time, 'time') as time_mock:
+            time_mock.return_value = 1000
+            conductor_utils.record_power_state('old-uuid', states.POWER_ON)
+            time_mock.return_value = 1050
+            conductor_utils.record_power_state('mapped-uuid', states.POWER_ON)
+            conductor_utils.record_power_state('other-uuid', states.POWER_ON)
+            time_mock.return_value = 1070
+
+            conductor_utils.prune_power_states(set(['old-uuid',
+                                                    'mapped-uuid']))
+
+        self.assertEqual(['mapped-uuid'], list(conductor_utils._POWER_STATES))
+
 
 class CleanupAfterTimeoutTestCase(tests_base.TestCase):
     def setUp(self):
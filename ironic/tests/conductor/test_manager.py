@@ -23,6 +23,8 @@ import mock
 from oslo.config import cfg
 from oslo.db import exception as db_exception
 from oslo import messaging
+from oslo.utils import timeutils
+from six.moves import queue
 
 from ironic.common import boot_devices
 from ironic.common import driver_factory
@@ -31,6 +33,7 @@ from ironic.common import keystone
 from ironic.common import states
 from ironic.common import utils as ironic_utils
 from ironic.conductor import manager
+from ironic.conductor import rpcapi
 from ironic.conductor import task_manager
 from ironic.conductor import utils as conductor_utils
 from ironic.db import api as dbapi
@@ -187,6 +190,33 @@ class StartStopTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
                           objects.Conductor.get_by_hostname,
                           self.context, self.hostname)
 
+    def test_stop_stops_periodic_tasks(self):
+        self._start_service()
+        thread = mock.Mock()
+        self.service._periodic_task_threads['fake'] = thread
+        self.service.del_host()
+        thread.kill.assert_called_once_with()
+        self.assertEqual({}, self.service._periodic_task_threads)
+
+    @mock.patch.object(manager.ConductorManager, '_hand_off_nodes')
+    def test_stop_hands_off_nodes(self, hand_off_mock):
+        self.config(handoff_on_shutdown=True, group='conductor')
+        self._start_service()
+        hand_off_mock.side_effect = lambda: self.assertFalse(
+            self.service._keepalive_evt.is_set())
+        self.service.del_host()
+        hand_off_mock.assert_called_once_with()
+        self.assertTrue(self.service._keepalive_evt.is_set())
+        self.assertRaises(exception.ConductorNotFound,
+                          objects.Conductor.get_by_hostname,
+                          self.context, self.hostname)
+
+    @mock.patch.object(manager.ConductorManager, '_hand_off_nodes')
+    def test_stop_no_hand_off(self, hand_off_mock):
+        self._start_service()
+        self.service.del_host()
+        self.assertFalse(hand_off_mock.called)
+
     def test_start_registers_driver_names(self):
         init_names = ['fake1', 'fake2']
         restart_names = ['fake3', 'fake4']
@@ -275,6 +305,26 @@ class ChangeNodePowerStateTestCase(_ServiceSetUpMixin,
             # background task's link callback.
             self.assertIsNone(node.reservation)
 
+    @mock.patch.object(conductor_utils, 'node_power_action')
+    def test_change_node_power_state_waits_before_locking(self,
+                                                          pwr_act_mock):
+        node = obj_utils.create_test_node(self.context, driver='fake',
+                                          power_state=states.POWER_OFF)
+        self._start_service()
+
+        def wait():
+            node.refresh()
+            self.assertIsNone(node.reservation)
+
+        with mock.patch.object(self.service, '_wait_for_free_worker',
+                               side_effect=wait) as wait_mock:
+            self.service.change_node_power_state(self.context, node.uuid,
+                                                 states.POWER_ON)
+            self.service._worker_pool.waitall()
+
+        wait_mock.assert_called_once_with()
+        pwr_act_mock.assert_called_once_with(mock.ANY, states.POWER_ON)
+
     @mock.patch.object(conductor_utils, 'node_power_action')
     def test_change_node_power_state_node_already_locked(self,
                                                          pwr_act_mock):
@@ -502,13 +552,15 @@ class VendorPassthruTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
         info = {'bar': 'baz'}
         self._start_service()
 
-        ret, is_async = self.service.vendor_passthru(self.context, node.uuid,
-                                                     'first_method', 'POST',
-                                                     info)
+        with mock.patch.object(self.service,
+                               '_wait_for_free_worker') as wait_mock:
+            ret, is_async = self.service.vendor_passthru(
+                self.context, node.uuid, 'first_method', 'POST', info)
         # Waiting to make sure the below assertions are valid.
         self.service._worker_pool.waitall()
 
         # Assert spawn_after was called
+        wait_mock.assert_called_once_with()
         self.assertTrue(mock_spawn.called)
         self.assertIsNone(ret)
         self.assertTrue(is_async)
@@ -524,13 +576,15 @@ class VendorPassthruTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
         info = {'bar': 'meow'}
         self._start_service()
 
-        ret, is_async = self.service.vendor_passthru(self.context, node.uuid,
-                                                     'third_method_sync',
-                                                     'POST', info)
+        with mock.patch.object(self.service,
+                               '_wait_for_free_worker') as wait_mock:
+            ret, is_async = self.service.vendor_passthru(
+                self.context, node.uuid, 'third_method_sync', 'POST', info)
         # Waiting to make sure the below assertions are valid.
         self.service._worker_pool.waitall()
 
-        # Assert no workers were used
+        # Assert no workers were used, nor waited for
+        self.assertFalse(wait_mock.called)
         self.assertFalse(mock_spawn.called)
         self.assertTrue(ret)
         self.assertFalse(is_async)
@@ -863,6 +917,7 @@ class VendorPassthruTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
 class DoNodeDeployTearDownTestCase(_ServiceSetUpMixin,
                                    tests_db_base.DbTestCase):
     def test_do_node_deploy_invalid_state(self):
+        self._start_service()
         # test node['provision_state'] is not NOSTATE
         node = obj_utils.create_test_node(self.context, driver='fake',
                                           provision_state=states.ACTIVE)
@@ -877,6 +932,7 @@ class DoNodeDeployTearDownTestCase(_ServiceSetUpMixin,
         self.assertIsNone(node.reservation)
 
     def test_do_node_deploy_maintenance(self):
+        self._start_service()
         node = obj_utils.create_test_node(self.context, driver='fake',
                                           maintenance=True)
         exc = self.assertRaises(messaging.rpc.ExpectedException,
@@ -905,10 +961,12 @@ class DoNodeDeployTearDownTestCase(_ServiceSetUpMixin,
 
     @mock.patch('ironic.drivers.modules.fake.FakeDeploy.validate')
     def test_do_node_deploy_validate_fail(self, mock_validate):
+        self._start_service()
         self._test_do_node_deploy_validate_fail(mock_validate)
 
     @mock.patch('ironic.drivers.modules.fake.FakePower.validate')
     def test_do_node_deploy_power_validate_fail(self, mock_validate):
+        self._start_service()
         self._test_do_node_deploy_validate_fail(mock_validate)
 
     @mock.patch('ironic.drivers.modules.fake.FakeDeploy.deploy')
@@ -1018,6 +1076,7 @@ class DoNodeDeployTearDownTestCase(_ServiceSetUpMixin,
         mock_deploy.assert_called_once_with(mock.ANY)
 
     def test_do_node_deploy_rebuild_nostate_state(self):
+        self._start_service()
         # test node will not rebuild if state is NOSTATE
         node = obj_utils.create_test_node(self.context, driver='fake',
                                           provision_state=states.NOSTATE)
@@ -1058,6 +1117,7 @@ class DoNodeDeployTearDownTestCase(_ServiceSetUpMixin,
             self.assertIsNone(node.reservation)
 
     def test_do_node_tear_down_invalid_state(self):
+        self._start_service()
         # test node.provision_state is incorrect for tear_down
         node = obj_utils.create_test_node(self.context, driver='fake',
                                           provision_state=states.NOSTATE)
@@ -1069,6 +1129,7 @@ class DoNodeDeployTearDownTestCase(_ServiceSetUpMixin,
 
     @mock.patch('ironic.drivers.modules.fake.FakePower.validate')
     def test_do_node_tear_down_validate_fail(self, mock_validate):
+        self._start_service()
         # InvalidParameterValue should be re-raised as InstanceDeployFailure
         mock_validate.side_effect = exception.InvalidParameterValue('error')
         node = obj_utils.create_test_node(self.context, driver='fake',
@@ -1563,6 +1624,112 @@ class UpdatePortTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
                 self.assertFalse(get_sensors_data_mock.called)
                 self.assertFalse(validate_mock.called)
 
+    @mock.patch.object(manager.ConductorManager, '_sensors_nodes_task')
+    @mock.patch.object(dbapi.IMPL, 'get_nodeinfo_list')
+    def test___send_sensor_data_multiple_workers(self, get_nodeinfo_list_mock,
+                                                 sensors_nodes_task_mock):
+        self._start_service()
+        CONF.set_override('send_sensor_data', True, group='conductor')
+        CONF.set_override('send_sensor_data_workers', 2, group='conductor')
+        get_nodeinfo_list_mock.return_value = [
+            ('fake-uuid-%d' % i, 'fake', None) for i in range(3)]
+        sensors_nodes_task_mock.return_value = 0
+
+        self.service._send_sensor_data(self.context)
+
+        self.assertEqual(2, sensors_nodes_task_mock.call_count)
+        nodes = sensors_nodes_task_mock.call_args[0][1]
+        self.assertEqual(3, nodes.qsize())
+
+    @mock.patch.object(manager.ConductorManager, '_spawn_periodic_worker')
+    @mock.patch.object(dbapi.IMPL, 'get_nodeinfo_list')
+    def test___send_sensor_data_no_free_worker(self, get_nodeinfo_list_mock,
+                                               spawn_mock):
+        self._start_service()
+        spawn_mock.reset_mock()
+        CONF.set_override('send_sensor_data', True, group='conductor')
+        get_nodeinfo_list_mock.return_value = [
+            ('fake-uuid-%d' % i, 'fake', None) for i in range(3)]
+        spawn_mock.side_effect = exception.NoFreeConductorWorker()
+
+        self.service._send_sensor_data(self.context)
+
+        spawn_mock.assert_called_once_with(self.service._sensors_nodes_task,
+                                           self.context, mock.ANY)
+
+    @mock.patch.object(manager.ConductorManager, '_spawn_periodic_worker')
+    @mock.patch.object(dbapi.IMPL, 'get_nodeinfo_list')
+    def test___send_sensor_data_timeout(self, get_nodeinfo_list_mock,
+                                        spawn_mock):
+        self._start_service()
+        spawn_mock.reset_mock()
+        CONF.set_override('send_sensor_data', True, group='conductor')
+        CONF.set_override('send_sensor_data_workers', 1, group='conductor')
+        CONF.set_override('send_sensor_data_wait_timeout', 0,
+                          group='conductor')
+        get_nodeinfo_list_mock.return_value = [
+            ('fake-uuid-%d' % i, 'fake', None) for i in range(3)]
+        worker = spawn_mock.return_value
+        worker.wait.side_effect = lambda: eventlet.sleep(1)
+        worker.dead = False
+
+        self.service._send_sensor_data(self.context)
+
+        # the nodes left in the queue are skipped until the next run
+        nodes = spawn_mock.call_args[0][2]
+        self.assertTrue(nodes.empty())
+
+    @mock.patch.object(manager.ConductorManager, '_mapped_to_this_conductor')
+    @mock.patch.object(task_manager, 'acquire')
+    def test__sensors_nodes_task(self, acquire_mock, mapped_mock):
+        self._start_service()
+        mapped_mock.side_effect = [True, False]
+        acquire_mock.return_value.__enter__.return_value.driver = self.driver
+        nodes = queue.Queue()
+        nodes.put_nowait(('fake-uuid-1', 'fake', 'fake-instance'))
+        nodes.put_nowait(('fake-uuid-2', 'fake', None))
+        with mock.patch.object(self.driver.management,
+                               'get_sensors_data') as get_sensors_data_mock:
+            with mock.patch.object(self.driver.management, 'validate'):
+                get_sensors_data_mock.return_value = {'t1': {'f1': 'v1'}}
+                with mock.patch.object(self.service.notifier,
+                                       'info') as info_mock:
+                    result = self.service._sensors_nodes_task(self.context,
+                                                              nodes)
+
+        self.assertEqual(1, result)
+        self.assertTrue(nodes.empty())
+        acquire_mock.assert_called_once_with(self.context, 'fake-uuid-1',
+                                             shared=True)
+        get_sensors_data_mock.assert_called_once_with(
+            acquire_mock.return_value.__enter__.return_value,
+            sensor_types=None)
+        self.assertEqual(1, info_mock.call_count)
+        message = info_mock.call_args[0][2]
+        self.assertEqual('fake-uuid-1', message['node_uuid'])
+        self.assertEqual('fake-instance', message['instance_uuid'])
+
+    @mock.patch.object(manager.ConductorManager, '_mapped_to_this_conductor')
+    @mock.patch.object(task_manager, 'acquire')
+    def test__sensors_nodes_task_sensor_types(self, acquire_mock,
+                                              mapped_mock):
+        self._start_service()
+        CONF.set_override('send_sensor_data_types', ['Temperature', 'Fan'],
+                          group='conductor')
+        mapped_mock.return_value = True
+        task = acquire_mock.return_value.__enter__.return_value
+        task.driver = self.driver
+        nodes = queue.Queue()
+        nodes.put_nowait(('fake-uuid-1', 'fake', None))
+        with mock.patch.object(self.driver.management,
+                               'get_sensors_data') as get_sensors_data_mock:
+            with mock.patch.object(self.driver.management, 'validate'):
+                get_sensors_data_mock.return_value = {}
+                self.service._sensors_nodes_task(self.context, nodes)
+
+        get_sensors_data_mock.assert_called_once_with(
+            task, sensor_types=['Temperature', 'Fan'])
+
     def test_set_boot_device(self):
         node = obj_utils.create_test_node(self.context, driver='fake')
         with mock.patch.object(self.driver.management, 'validate') as mock_val:
@@ -1658,6 +1825,110 @@ class UpdatePortTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
                          exc.exc_info[0])
 
 
+class ManagerPeriodicTasksTestCase(tests_base.TestCase):
+    def setUp(self):
+        super(ManagerPeriodicTasksTestCase, self).setUp()
+        self.service = manager.ConductorManager('hostname', 'test-topic')
+        self.context = context.get_admin_context()
+
+    def test_periodic_tasks_threaded(self):
+        self.assertEqual(set(name for name, task in
+                             self.service._periodic_tasks),
+                         set(self.service.periodic_task_stats))
+        with mock.patch.object(manager.ConductorManager,
+                               '_sync_power_states') as sync_mock:
+            self.service._periodic_tasks = [
+                ('_sync_power_states', self.service._periodic_task_runner(
+                    '_sync_power_states', sync_mock))]
+            self.service._periodic_last_run['_sync_power_states'] = None
+            self.service.periodic_tasks(self.context)
+            self.service._periodic_task_threads['_sync_power_states'].wait()
+
+        sync_mock.assert_called_once_with(self.service, self.context)
+        stats = self.service.periodic_task_stats['_sync_power_states']
+        self.assertEqual(1, stats['runs'])
+        self.assertIsNotNone(stats['last_run'])
+        self.assertIsNotNone(stats['last_duration'])
+
+    def test_periodic_task_overrun(self):
+        event = eventlet.event.Event()
+        task = mock.Mock(side_effect=lambda manager, context: event.wait())
+        run = self.service._periodic_task_runner('fake', task)
+
+        run(self.service, self.context)
+        eventlet.sleep(0)
+        run(self.service, self.context)
+        event.send()
+        self.service._periodic_task_threads['fake'].wait()
+        run(self.service, self.context)
+        self.service._periodic_task_threads['fake'].wait()
+
+        self.assertEqual(2, task.call_count)
+        stats = self.service.periodic_task_stats['fake']
+        self.assertEqual(2, stats['runs'])
+        self.assertEqual(1, stats['overruns'])
+
+    def test_periodic_task_error(self):
+        task = mock.Mock(side_effect=Exception('boom'))
+        run = self.service._periodic_task_runner('fake', task)
+
+        run(self.service, self.context)
+        self.service._periodic_task_threads['fake'].wait()
+
+        self.assertEqual(1, self.service.periodic_task_stats['fake']['runs'])
+
+    def test_periodic_tasks_raise_on_error(self):
+        task = mock.Mock(side_effect=exception.IronicException('boom'))
+        self.service._periodic_tasks = [
+            ('_sync_power_states', self.service._periodic_task_runner(
+                '_sync_power_states', task))]
+        self.service._periodic_last_run['_sync_power_states'] = None
+
+        self.assertRaises(exception.IronicException,
+                          self.service.periodic_tasks, self.context,
+                          raise_on_error=True)
+        task.assert_called_once_with(self.service, self.context)
+
+    def test__stop_periodic_tasks(self):
+        event = eventlet.event.Event()
+        task = mock.Mock(side_effect=lambda manager, context: event.wait())
+        run = self.service._periodic_task_runner('fake', task)
+        run(self.service, self.context)
+        eventlet.sleep(0)
+        thread = self.service._periodic_task_threads['fake']
+
+        self.service._stop_periodic_tasks()
+
+        self.assertTrue(thread.dead)
+        self.assertEqual({}, self.service._periodic_task_threads)
+        self.assertEqual(1, self.service.periodic_task_stats['fake']['runs'])
+
+    def test__stop_periodic_tasks_workers(self):
+        self.service._worker_pool = eventlet.GreenPool(size=3)
+        event = eventlet.event.Event()
+        worker = self.service._spawn_periodic_worker(event.wait)
+        eventlet.sleep(0)
+
+        self.service._stop_periodic_tasks()
+
+        self.assertTrue(worker.dead)
+        self.assertEqual(set(), self.service._periodic_workers)
+        self.assertEqual(3, self.service._worker_pool.free())
+
+    def test_periodic_task_overrun_not_started(self):
+        task = mock.Mock()
+        run = self.service._periodic_task_runner('fake', task)
+
+        run(self.service, self.context)
+        # The first run has not started yet, so has no start time
+        run(self.service, self.context)
+        self.service._periodic_task_threads['fake'].wait()
+
+        task.assert_called_once_with(self.service, self.context)
+        stats = self.service.periodic_task_stats['fake']
+        self.assertEqual(1, stats['overruns'])
+
+
 class ManagerSpawnWorkerTestCase(tests_base.TestCase):
     def setUp(self):
         super(ManagerSpawnWorkerTestCase, self).setUp()
@@ -1683,6 +1954,114 @@ class ManagerSpawnWorkerTestCase(tests_base.TestCase):
 
         self.assertFalse(worker_pool.spawn.called)
 
+    @mock.patch.object(eventlet, 'sleep')
+    def test__wait_for_free_worker_free(self, sleep_mock):
+        worker_pool = mock.Mock(spec_set=['free'])
+        worker_pool.free.return_value = True
+        self.service._worker_pool = worker_pool
+
+        self.service._wait_for_free_worker()
+
+        self.assertFalse(sleep_mock.called)
+
+    @mock.patch.object(eventlet, 'sleep')
+    def test__wait_for_free_worker_freed_while_waiting(self, sleep_mock):
+        worker_pool = mock.Mock(spec_set=['free'])
+        worker_pool.free.side_effect = [False, False, False, True]
+        self.service._worker_pool = worker_pool
+
+        self.service._wait_for_free_worker()
+
+        self.assertEqual([mock.call(manager.WORKER_WAIT_POLL_INTERVAL)] * 2,
+                         sleep_mock.call_args_list)
+
+    @mock.patch.object(manager, 'time')
+    @mock.patch.object(eventlet, 'sleep')
+    def test__wait_for_free_worker_timeout(self, sleep_mock, time_mock):
+        worker_pool = mock.Mock(spec_set=['free'])
+        worker_pool.free.return_value = False
+        self.service._worker_pool = worker_pool
+        time_mock.time.side_effect = [0, 0, 2.5, 5, 5]
+
+        self.service._wait_for_free_worker()
+
+        self.assertEqual(2, sleep_mock.call_count)
+
+    @mock.patch.object(eventlet, 'sleep')
+    def test__wait_for_free_worker_no_wait(self, sleep_mock):
+        self.config(workers_pool_wait_timeout=0, group='conductor')
+        worker_pool = mock.Mock(spec_set=['free'])
+        worker_pool.free.return_value = False
+        self.service._worker_pool = worker_pool
+
+        self.service._wait_for_free_worker()
+
+        self.assertFalse(sleep_mock.called)
+
+    @mock.patch.object(manager, 'WORKER_WAIT_POLL_INTERVAL', 0.01)
+    def test__wait_for_free_worker_then_spawn(self):
+        self.service._worker_pool = eventlet.GreenPool(size=1)
+        event = eventlet.event.Event()
+        self.service._spawn_worker(event.wait)
+        results = []
+
+        def request():
+            self.service._wait_for_free_worker()
+            self.service._spawn_worker(results.append, True)
+
+        requests = [eventlet.spawn(request) for i in range(3)]
+        eventlet.sleep(0)
+        event.send()
+        # The requests take the freed worker in turn, none of them blocks
+        # in the pool or is rejected.
+        for thread in requests:
+            thread.wait()
+        self.service._worker_pool.waitall()
+
+        self.assertEqual([True] * 3, results)
+
+    def test__spawn_worker_concurrent(self):
+        self.config(workers_pool_wait_timeout=0, group='conductor')
+        self.service._worker_pool = eventlet.GreenPool(size=10)
+        event = eventlet.event.Event()
+        results = []
+
+        def spawn():
+            try:
+                self.service._spawn_worker(event.wait)
+            except exception.NoFreeConductorWorker:
+                results.append(False)
+            else:
+                results.append(True)
+
+        requests = eventlet.GreenPool(size=1000)
+        for i in range(1000):
+            requests.spawn(spawn)
+        requests.waitall()
+
+        self.assertEqual(10, results.count(True))
+        self.assertEqual(990, results.count(False))
+        event.send()
+        self.service._worker_pool.waitall()
+
+    def test__spawn_periodic_worker(self):
+        self.service._worker_pool = eventlet.GreenPool(size=3)
+        self.service._periodic_workers = set()
+        self.config(periodic_workers_pool_size=2, group='conductor')
+        event = eventlet.event.Event()
+
+        threads = [self.service._spawn_periodic_worker(event.wait)
+                   for i in range(2)]
+        self.assertRaises(exception.NoFreeConductorWorker,
+                          self.service._spawn_periodic_worker, event.wait)
+        self.assertEqual(set(threads), self.service._periodic_workers)
+        # The rest of the pool is left to the requests of users
+        self.service._spawn_worker(event.wait)
+
+        event.send()
+        self.service._worker_pool.waitall()
+        self.assertEqual(set(), self.service._periodic_workers)
+
 
 @mock.patch.object(conductor_utils, 'node_power_action')
 class ManagerDoSyncPowerStateTestCase(tests_db_base.DbTestCase):
@@ -1714,10 +2093,12 @@ class ManagerDoSyncPowerStateTestCase(tests_db_base.DbTestCase):
                 self.power.get_power_state.side_effect = new_power_state
             else:
                 self.power.get_power_state.return_value = new_power_state
-            self.service._do_sync_power_state(self.task)
+            in_sync = self.service._do_sync_power_state(self.task)
+        return in_sync
 
     def test_state_unchanged(self, node_power_action):
-        self._do_sync_power_state('fake-power', 'fake-power')
+        self.assertIs(True, self._do_sync_power_state('fake-power',
+                                                      'fake-power'))
 
         self.assertFalse(self.power.validate.called)
         self.power.get_power_state.assert_called_once_with(self.task)
@@ -1725,6 +2106,13 @@ class ManagerDoSyncPowerStateTestCase(tests_db_base.DbTestCase):
         self.assertFalse(self.node.save.called)
         self.assertFalse(node_power_action.called)
 
+    def test_state_recorded(self, node_power_action):
+        self.node.uuid = 'fake-uuid'
+        self._do_sync_power_state(states.POWER_ON, states.POWER_ON)
+
+        self.assertEqual(states.POWER_ON,
+                         conductor_utils.get_recent_power_state('fake-uuid'))
+
     def test_state_not_set(self, node_power_action):
         self._do_sync_power_state(None, states.POWER_ON)
 
@@ -1735,8 +2123,8 @@ class ManagerDoSyncPowerStateTestCase(tests_db_base.DbTestCase):
         self.assertEqual(states.POWER_ON, self.node.power_state)
 
     def test_validate_fail(self, node_power_action):
-        self._do_sync_power_state(None, states.POWER_ON,
-                                  fail_validate=True)
+        self.assertIs(False, self._do_sync_power_state(None, states.POWER_ON,
+                                                       fail_validate=True))
 
         self.power.validate.assert_called_once_with(self.task)
         self.assertFalse(self.power.get_power_state.called)
@@ -1745,8 +2133,8 @@ class ManagerDoSyncPowerStateTestCase(tests_db_base.DbTestCase):
         self.assertEqual(None, self.node.power_state)
 
     def test_get_power_state_fail(self, node_power_action):
-        self._do_sync_power_state('fake',
-                                  exception.IronicException('foo'))
+        self.assertIs(False, self._do_sync_power_state(
+            'fake', exception.IronicException('foo')))
 
         self.assertFalse(self.power.validate.called)
         self.power.get_power_state.assert_called_once_with(self.task)
@@ -1767,7 +2155,8 @@ class ManagerDoSyncPowerStateTestCase(tests_db_base.DbTestCase):
                          self.service.power_state_sync_count[self.node.uuid])
 
     def test_state_changed_no_sync(self, node_power_action):
-        self._do_sync_power_state(states.POWER_ON, states.POWER_OFF)
+        self.assertIs(False, self._do_sync_power_state(states.POWER_ON,
+                                                       states.POWER_OFF))
 
         self.assertFalse(self.power.validate.called)
         self.power.get_power_state.assert_called_once_with(self.task)
@@ -1779,7 +2168,8 @@ class ManagerDoSyncPowerStateTestCase(tests_db_base.DbTestCase):
         self.config(force_power_state_during_sync=True, group='conductor')
         self.config(power_state_sync_max_retries=1, group='conductor')
 
-        self._do_sync_power_state(states.POWER_ON, states.POWER_OFF)
+        self.assertIs(False, self._do_sync_power_state(states.POWER_ON,
+                                                       states.POWER_OFF))
 
         self.assertFalse(self.power.validate.called)
         self.power.get_power_state.assert_called_once_with(self.task)
@@ -1901,7 +2291,7 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.service._sync_power_states(self.context)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters, use_slave=True)
         mapped_mock.assert_called_once_with(self.node.uuid,
                                             self.node.driver)
         self.assertFalse(get_node_mock.called)
@@ -1918,7 +2308,7 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.service._sync_power_states(self.context)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters, use_slave=True)
         mapped_mock.assert_called_once_with(self.node.uuid,
                                             self.node.driver)
         get_node_mock.assert_called_once_with(self.context, self.node.id)
@@ -1934,7 +2324,7 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.service._sync_power_states(self.context)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters, use_slave=True)
         mapped_mock.assert_called_once_with(self.node.uuid,
                                             self.node.driver)
         get_node_mock.assert_called_once_with(self.context, self.node.id)
@@ -1950,7 +2340,7 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.service._sync_power_states(self.context)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters, use_slave=True)
         mapped_mock.assert_called_once_with(self.node.uuid,
                                             self.node.driver)
         get_node_mock.assert_called_once_with(self.context, self.node.id)
@@ -1966,7 +2356,7 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.service._sync_power_states(self.context)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters, use_slave=True)
         mapped_mock.assert_called_once_with(self.node.uuid,
                                             self.node.driver)
         get_node_mock.assert_called_once_with(self.context, self.node.id)
@@ -1984,7 +2374,7 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.service._sync_power_states(self.context)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters, use_slave=True)
         mapped_mock.assert_called_once_with(self.node.uuid,
                                             self.node.driver)
         get_node_mock.assert_called_once_with(self.context, self.node.id)
@@ -2005,7 +2395,7 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.service._sync_power_states(self.context)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters, use_slave=True)
         mapped_mock.assert_called_once_with(self.node.uuid,
                                             self.node.driver)
         get_node_mock.assert_called_once_with(self.context, self.node.id)
@@ -2025,7 +2415,7 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.service._sync_power_states(self.context)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters, use_slave=True)
         mapped_mock.assert_called_once_with(self.node.uuid,
                                             self.node.driver)
         get_node_mock.assert_called_once_with(self.context, self.node.id)
@@ -2044,7 +2434,7 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.service._sync_power_states(self.context)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters, use_slave=True)
         mapped_mock.assert_called_once_with(self.node.uuid,
                                             self.node.driver)
         get_node_mock.assert_called_once_with(self.context, self.node.id)
@@ -2062,7 +2452,7 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.service._sync_power_states(self.context)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters, use_slave=True)
         mapped_mock.assert_called_once_with(self.node.uuid,
                                             self.node.driver)
         get_node_mock.assert_called_once_with(self.context, self.node.id)
@@ -2126,11 +2516,12 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
 
         with mock.patch.object(eventlet, 'sleep') as sleep_mock:
             self.service._sync_power_states(self.context)
-            # Ensure we've yielded on every iteration
-            self.assertEqual(len(nodes), sleep_mock.call_count)
+            # Ensure we've yielded on every iteration, when checking the
+            # nodes and then when syncing the nodes to be synced
+            self.assertEqual(len(nodes) + len(tasks), sleep_mock.call_count)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters, use_slave=True)
         mapped_calls = [mock.call(x.uuid, x.driver) for x in nodes]
         self.assertEqual(mapped_calls, mapped_mock.call_args_list)
         get_node_calls = [mock.call(self.context, x.id)
@@ -2143,6 +2534,276 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         sync_calls = [mock.call(tasks[0]), mock.call(tasks[5])]
         self.assertEqual(sync_calls, sync_mock.call_args_list)
 
+    @mock.patch.object(manager.ConductorManager, '_get_power_states')
+    def test_node_power_state_unchanged(self, get_power_states_mock,
+                                        get_nodeinfo_mock, get_node_mock,
+                                        mapped_mock, acquire_mock, sync_mock):
+        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
+        get_node_mock.return_value = self.node
+        mapped_mock.return_value = True
+        self.node.power_state = states.POWER_ON
+        get_power_states_mock.return_value = {self.node.uuid: states.POWER_ON}
+        self.service.power_state_sync_count[self.node.uuid] = 1
+
+        self.service._sync_power_states(self.context)
+
+        get_power_states_mock.assert_called_once_with(self.context,
+                                                      [self.node])
+        self.assertFalse(acquire_mock.called)
+        self.assertFalse(sync_mock.called)
+        self.assertNotIn(self.node.uuid, self.service.power_state_sync_count)
+
+    @mock.patch.object(manager.ConductorManager, '_get_power_states')
+    def test_node_power_state_changed(self, get_power_states_mock,
+                                      get_nodeinfo_mock, get_node_mock,
+                                      mapped_mock, acquire_mock, sync_mock):
+        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
+        get_node_mock.return_value = self.node
+        mapped_mock.return_value = True
+        self.node.power_state = states.POWER_ON
+        get_power_states_mock.return_value = {self.node.uuid: states.POWER_OFF}
+        task = self._create_task(node_attrs=dict(id=self.node.id))
+        acquire_mock.side_effect = self._get_acquire_side_effect(task)
+
+        self.service._sync_power_states(self.context)
+
+        acquire_mock.assert_called_once_with(self.context, self.node.id)
+        sync_mock.assert_called_once_with(task)
+
+    def test_records_pruned_node_not_mapped(self, get_nodeinfo_mock,
+                                            get_node_mock, mapped_mock,
+                                            acquire_mock, sync_mock):
+        # 'other-uuid' is not listed for the sync, nor found by UUID
+        get_nodeinfo_mock.side_effect = [self._get_nodeinfo_list_response(),
+                                         []]
+        mapped_mock.return_value = False
+        self.service.power_state_sync_count[self.node.uuid] = 1
+        self.service.power_state_sync_count['other-uuid'] = 2
+        self.service.power_state_sync_schedule[self.node.uuid] = (None, 60)
+        conductor_utils.record_power_state(self.node.uuid, states.POWER_ON)
+
+        self.service._sync_power_states(self.context)
+
+        get_nodeinfo_mock.assert_called_with(
+                columns=['uuid', 'driver'], filters={'uuids': ['other-uuid']},
+                use_slave=True)
+        self.assertEqual({}, self.service.power_state_sync_count)
+        self.assertEqual({}, self.service.power_state_sync_schedule)
+        self.assertIsNone(
+            conductor_utils.get_recent_power_state(self.node.uuid))
+
+    def test_records_pruned_node_disappeared(self, get_nodeinfo_mock,
+                                             get_node_mock, mapped_mock,
+                                             acquire_mock, sync_mock):
+        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
+        mapped_mock.return_value = True
+        get_node_mock.side_effect = exception.NodeNotFound(node=self.node.uuid)
+        self.service.power_state_sync_count[self.node.uuid] = 1
+
+        self.service._sync_power_states(self.context)
+
+        self.assertEqual({}, self.service.power_state_sync_count)
+
+    def test_records_kept_node_reserved(self, get_nodeinfo_mock,
+                                        get_node_mock, mapped_mock,
+                                        acquire_mock, sync_mock):
+        # The node is not listed for the sync, but is still mapped to this
+        # conductor
+        get_nodeinfo_mock.side_effect = [[],
+                                         [(self.node.uuid, self.node.driver)]]
+        mapped_mock.return_value = True
+        self.service.power_state_sync_count[self.node.uuid] = 1
+        self.service.power_state_sync_schedule[self.node.uuid] = (None, 60)
+
+        self.service._sync_power_states(self.context)
+
+        get_nodeinfo_mock.assert_called_with(
+                columns=['uuid', 'driver'],
+                filters={'uuids': [self.node.uuid]}, use_slave=True)
+        mapped_mock.assert_called_once_with(self.node.uuid, self.node.driver)
+        self.assertFalse(get_node_mock.called)
+        self.assertFalse(sync_mock.called)
+        self.assertEqual({self.node.uuid: 1},
+                         self.service.power_state_sync_count)
+        self.assertEqual({self.node.uuid: (None, 60)},
+                         self.service.power_state_sync_schedule)
+
+    def test_records_pruned_unlisted_node_not_mapped(self, get_nodeinfo_mock,
+                                                     get_node_mock,
+                                                     mapped_mock,
+                                                     acquire_mock, sync_mock):
+        get_nodeinfo_mock.side_effect = [[],
+                                         [(self.node.uuid, self.node.driver)]]
+        mapped_mock.return_value = False
+        self.service.power_state_sync_count[self.node.uuid] = 1
+
+        self.service._sync_power_states(self.context)
+
+        self.assertEqual(2, get_nodeinfo_mock.call_count)
+        self.assertEqual({}, self.service.power_state_sync_count)
+
+    def test_records_kept_node_in_deploywait(self, get_nodeinfo_mock,
+                                             get_node_mock, mapped_mock,
+                                             acquire_mock, sync_mock):
+        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
+        get_node_mock.return_value = self.node
+        mapped_mock.return_value = True
+        self.node.provision_state = states.DEPLOYWAIT
+        self.service.power_state_sync_count[self.node.uuid] = 1
+
+        self.service._sync_power_states(self.context)
+
+        self.assertFalse(sync_mock.called)
+        self.assertEqual({self.node.uuid: 1},
+                         self.service.power_state_sync_count)
+
+    def _sync_power_states_adaptive(self, get_nodeinfo_mock, get_node_mock,
+                                    mapped_mock, acquire_mock, sync_mock):
+        self.config(sync_power_state_adaptive=True, group='conductor')
+        self.config(sync_power_state_interval=60, group='conductor')
+        self.config(sync_power_state_max_interval=200, group='conductor')
+        timeutils.set_time_override()
+        self.addCleanup(timeutils.clear_time_override)
+        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
+        self.node.updated_at = None
+        get_node_mock.return_value = self.node
+        mapped_mock.return_value = True
+        task = self._create_task(node_attrs=dict(id=self.node.id))
+        acquire_mock.side_effect = self._get_acquire_side_effect([task] * 5)
+        sync_mock.return_value = True
+
+        self.service._sync_power_states(self.context)
+        self.assertEqual(1, sync_mock.call_count)
+        self.assertEqual(60, self.service.power_state_sync_schedule[
+            self.node.uuid][1])
+
+    def test_adaptive_not_due(self, get_nodeinfo_mock, get_node_mock,
+                              mapped_mock, acquire_mock, sync_mock):
+        self._sync_power_states_adaptive(get_nodeinfo_mock, get_node_mock,
+                                         mapped_mock, acquire_mock, sync_mock)
+        timeutils.advance_time_seconds(60)
+        self.service._sync_power_states(self.context)
+        # The interval is now 120 seconds
+        timeutils.advance_time_seconds(60)
+
+        self.service._sync_power_states(self.context)
+
+        self.assertEqual(2, sync_mock.call_count)
+        self.assertIn(self.node.uuid, self.service.power_state_sync_schedule)
+
+    def test_adaptive_due_early_run(self, get_nodeinfo_mock, get_node_mock,
+                                    mapped_mock, acquire_mock, sync_mock):
+        self._sync_power_states_adaptive(get_nodeinfo_mock, get_node_mock,
+                                         mapped_mock, acquire_mock, sync_mock)
+        # A run starting a bit early, eg. after a longer scan of the nodes
+        # in the previous one, is not skipped.
+        timeutils.advance_time_seconds(58)
+
+        self.service._sync_power_states(self.context)
+
+        self.assertEqual(2, sync_mock.call_count)
+
+    def test_adaptive_interval_grows(self, get_nodeinfo_mock, get_node_mock,
+                                     mapped_mock, acquire_mock, sync_mock):
+        self._sync_power_states_adaptive(get_nodeinfo_mock, get_node_mock,
+                                         mapped_mock, acquire_mock, sync_mock)
+        for interval in (120, 200, 200):
+            timeutils.advance_time_seconds(
+                self.service.power_state_sync_schedule[self.node.uuid][1])
+            self.service._sync_power_states(self.context)
+            self.assertEqual(interval, self.service.power_state_sync_schedule[
+                self.node.uuid][1])
+        self.assertEqual(4, sync_mock.call_count)
+
+    def test_adaptive_out_of_sync(self, get_nodeinfo_mock, get_node_mock,
+                                  mapped_mock, acquire_mock, sync_mock):
+        self._sync_power_states_adaptive(get_nodeinfo_mock, get_node_mock,
+                                         mapped_mock, acquire_mock, sync_mock)
+        timeutils.advance_time_seconds(60)
+        self.service._sync_power_states(self.context)
+        sync_mock.return_value = False
+        timeutils.advance_time_seconds(120)
+
+        self.service._sync_power_states(self.context)
+
+        self.assertEqual(3, sync_mock.call_count)
+        self.assertEqual(60, self.service.power_state_sync_schedule[
+            self.node.uuid][1])
+
+    def test_adaptive_node_updated(self, get_nodeinfo_mock, get_node_mock,
+                                   mapped_mock, acquire_mock, sync_mock):
+        self._sync_power_states_adaptive(get_nodeinfo_mock, get_node_mock,
+                                         mapped_mock, acquire_mock, sync_mock)
+        timeutils.advance_time_seconds(10)
+        self.node.updated_at = timeutils.utcnow()
+
+        self.service._sync_power_states(self.context)
+
+        self.assertEqual(2, sync_mock.call_count)
+
+    def test_adaptive_disabled(self, get_nodeinfo_mock, get_node_mock,
+                               mapped_mock, acquire_mock, sync_mock):
+        self._sync_power_states_adaptive(get_nodeinfo_mock, get_node_mock,
+                                         mapped_mock, acquire_mock, sync_mock)
+        self.config(sync_power_state_adaptive=False, group='conductor')
+
+        self.service._sync_power_states(self.context)
+
+        self.assertEqual(2, sync_mock.call_count)
+
+    def test_adaptive_node_not_mapped(self, get_nodeinfo_mock, get_node_mock,
+                                      mapped_mock, acquire_mock, sync_mock):
+        self._sync_power_states_adaptive(get_nodeinfo_mock, get_node_mock,
+                                         mapped_mock, acquire_mock, sync_mock)
+        mapped_mock.return_value = False
+
+        self.service._sync_power_states(self.context)
+
+        self.assertEqual({}, self.service.power_state_sync_schedule)
+
+
+class ManagerGetPowerStatesTestCase(_ServiceSetUpMixin,
+                                    tests_db_base.DbTestCase):
+    def setUp(self):
+        super(ManagerGetPowerStatesTestCase, self).setUp()
+        self.nodes = [obj_utils.create_test_node(
+                          self.context, id=i, driver='fake',
+                          uuid=ironic_utils.generate_uuid())
+                      for i in range(1, 3)]
+
+    @mock.patch.object(task_manager, 'acquire')
+    def test__get_power_states_not_implemented(self, acquire_mock):
+        power_states = self.service._get_power_states(self.context,
+                                                      self.nodes)
+        self.assertEqual({}, power_states)
+        self.assertFalse(acquire_mock.called)
+
+    def test__get_power_states(self):
+        expected = {self.nodes[0].uuid: states.POWER_ON,
+                    self.nodes[1].uuid: states.POWER_OFF}
+
+        def _get_power_states(tasks):
+            self.assertTrue(all(t.shared for t in tasks))
+            self.assertEqual([n.uuid for n in self.nodes],
+                             [t.node.uuid for t in tasks])
+            return expected
+
+        with mock.patch.object(type(self.driver.power),
+                               'get_power_states') as get_power_states_mock:
+            get_power_states_mock.side_effect = _get_power_states
+            power_states = self.service._get_power_states(self.context,
+                                                          self.nodes)
+        self.assertEqual(expected, power_states)
+        self.assertEqual(1, get_power_states_mock.call_count)
+
+    def test__get_power_states_exception(self):
+        with mock.patch.object(type(self.driver.power),
+                               'get_power_states') as get_power_states_mock:
+            get_power_states_mock.side_effect = exception.IronicException()
+            power_states = self.service._get_power_states(self.context,
+                                                          self.nodes)
+        self.assertEqual({}, power_states)
+
 
 @mock.patch.object(task_manager, 'acquire')
 @mock.patch.object(manager.ConductorManager, '_mapped_to_this_conductor')
@@ -2169,7 +2830,8 @@ class ManagerCheckDeployTimeoutsTestCase(_CommonMixIn,
     def _assert_get_nodeinfo_args(self, get_nodeinfo_mock):
         get_nodeinfo_mock.assert_called_once_with(
                 columns=self.columns, filters=self.filters,
-                sort_key='provision_updated_at', sort_dir='asc')
+                sort_key='provision_updated_at', sort_dir='asc',
+                use_slave=True)
 
     def test_disabled(self, get_nodeinfo_mock, mapped_mock,
                       acquire_mock):
@@ -2202,7 +2864,7 @@ class ManagerCheckDeployTimeoutsTestCase(_CommonMixIn,
         mapped_mock.assert_called_once_with(self.node.uuid, self.node.driver)
         acquire_mock.assert_called_once_with(self.context, self.node.uuid)
         self.task.spawn_after.assert_called_with(
-                self.service._spawn_worker,
+                self.service._spawn_periodic_worker,
                 conductor_utils.cleanup_after_timeout, self.task)
 
     def test_acquire_node_disappears(self, get_nodeinfo_mock, mapped_mock,
@@ -2281,7 +2943,7 @@ class ManagerCheckDeployTimeoutsTestCase(_CommonMixIn,
         self.assertFalse(task.spawn_after.called)
         # Second node spawned
         self.task2.spawn_after.assert_called_with(
-                self.service._spawn_worker,
+                self.service._spawn_periodic_worker,
                 conductor_utils.cleanup_after_timeout, self.task2)
 
     def test_exiting_no_worker_avail(self, get_nodeinfo_mock, mapped_mock,
@@ -2303,7 +2965,7 @@ class ManagerCheckDeployTimeoutsTestCase(_CommonMixIn,
         acquire_mock.assert_called_once_with(self.context,
                                              self.node.uuid)
         self.task.spawn_after.assert_called_with(
-                self.service._spawn_worker,
+                self.service._spawn_periodic_worker,
                 conductor_utils.cleanup_after_timeout, self.task)
 
     def test_exiting_with_other_exception(self, get_nodeinfo_mock,
@@ -2327,7 +2989,7 @@ class ManagerCheckDeployTimeoutsTestCase(_CommonMixIn,
         acquire_mock.assert_called_once_with(self.context,
                                              self.node.uuid)
         self.task.spawn_after.assert_called_with(
-                self.service._spawn_worker,
+                self.service._spawn_periodic_worker,
                 conductor_utils.cleanup_after_timeout, self.task)
 
     def test_worker_limit(self, get_nodeinfo_mock, mapped_mock, acquire_mock):
@@ -2349,7 +3011,7 @@ class ManagerCheckDeployTimeoutsTestCase(_CommonMixIn,
                          mapped_mock.call_args_list)
         self.assertEqual([mock.call(self.context, self.node.uuid)] * 2,
                          acquire_mock.call_args_list)
-        spawn_after_call = mock.call(self.service._spawn_worker,
+        spawn_after_call = mock.call(self.service._spawn_periodic_worker,
                                      conductor_utils.cleanup_after_timeout,
                                      self.task)
         self.assertEqual([spawn_after_call] * 2,
@@ -2503,7 +3165,8 @@ class ManagerSyncLocalStateTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.service.dbapi = self.dbapi
         self.service.ring_manager = mock.Mock()
 
-        self.node = self._create_node(provision_state=states.ACTIVE)
+        self.node = self._create_node(provision_state=states.ACTIVE,
+                                      driver_info={}, instance_info={})
         self.task = self._create_task(node=self.node)
 
         self.filters = {'reserved': False,
@@ -2511,13 +3174,49 @@ class ManagerSyncLocalStateTestCase(_CommonMixIn, tests_db_base.DbTestCase):
                         'provision_state': states.ACTIVE}
         self.columns = ['id', 'uuid', 'driver', 'conductor_affinity']
 
-    def _assert_get_nodeinfo_args(self, get_nodeinfo_mock):
-        get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+    def _get_nodeinfo_side_effect(self, nodes=None):
+        if nodes is None:
+            nodes = [self.node]
+
+        def _get_nodeinfo_list(columns, filters, use_slave):
+            return [tuple(getattr(n, c) for c in columns) for n in nodes
+                    if n.id in filters.get('ids', [n.id])]
+
+        return _get_nodeinfo_list
+
+    def _assert_get_nodeinfo_args(self, get_nodeinfo_mock, node_ids=None):
+        expected = [mock.call(columns=self.columns, filters=self.filters,
+                              use_slave=True)]
+        if node_ids is not None:
+            expected.append(mock.call(
+                columns=['id', 'driver', 'driver_info', 'instance_info'],
+                filters={'ids': node_ids}, use_slave=True))
+        self.assertEqual(expected, get_nodeinfo_mock.call_args_list)
+
+    @mock.patch.object(manager, 'TAKEOVER_IDS_PER_QUERY', 2)
+    def test__get_takeover_groups_chunked(self, get_nodeinfo_mock,
+                                          mapped_mock, acquire_mock,
+                                          get_authtoken_mock):
+        nodes = [self.node] + [
+            self._create_node(id=i, uuid=ironic_utils.generate_uuid(),
+                              driver_info={}, instance_info={})
+            for i in range(2, 5)]
+        get_nodeinfo_mock.side_effect = self._get_nodeinfo_side_effect(nodes)
+
+        groups = self.service._get_takeover_groups([n.id for n in nodes])
+
+        self.assertEqual(set(n.id for n in nodes), set(groups))
+        columns = ['id', 'driver', 'driver_info', 'instance_info']
+        self.assertEqual(
+            [mock.call(columns=columns, filters={'ids': [1, 2]},
+                       use_slave=True),
+             mock.call(columns=columns, filters={'ids': [3, 4]},
+                       use_slave=True)],
+            get_nodeinfo_mock.call_args_list)
 
     def test_not_mapped(self, get_nodeinfo_mock, mapped_mock, acquire_mock,
                         get_authtoken_mock):
-        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
+        get_nodeinfo_mock.side_effect = self._get_nodeinfo_side_effect()
         mapped_mock.return_value = False
 
         self.service._sync_local_state(self.context)
@@ -2534,7 +3233,7 @@ class ManagerSyncLocalStateTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.node.conductor_affinity = 123
         self.service.conductor.id = 123
 
-        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
+        get_nodeinfo_mock.side_effect = self._get_nodeinfo_side_effect()
         mapped_mock.return_value = True
 
         self.service._sync_local_state(self.context)
@@ -2545,80 +3244,71 @@ class ManagerSyncLocalStateTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.assertFalse(get_authtoken_mock.called)
         self.service.ring_manager.reset.assert_called_once_with()
 
+    def _spawn_periodic_worker(self, func, *args, **kwargs):
+        return eventlet.spawn(func, *args, **kwargs)
+
+    @mock.patch.object(manager.ConductorManager, '_do_takeover')
     @mock.patch.object(context, 'get_admin_context')
-    def test_good(self, get_ctx_mock, get_nodeinfo_mock, mapped_mock,
-                  acquire_mock, get_authtoken_mock):
+    def test_good(self, get_ctx_mock, takeover_mock, get_nodeinfo_mock,
+                  mapped_mock, acquire_mock, get_authtoken_mock):
         get_ctx_mock.return_value = self.context
-        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
+        get_nodeinfo_mock.side_effect = self._get_nodeinfo_side_effect()
         mapped_mock.return_value = True
         acquire_mock.side_effect = self._get_acquire_side_effect(self.task)
 
-        self.service._sync_local_state(self.context)
+        with mock.patch.object(self.service, '_spawn_periodic_worker',
+                               autospec=True) as spawn_mock:
+            spawn_mock.side_effect = self._spawn_periodic_worker
+            self.service._sync_local_state(self.context)
 
-        self._assert_get_nodeinfo_args(get_nodeinfo_mock)
+        self._assert_get_nodeinfo_args(get_nodeinfo_mock, [self.node.id])
         mapped_mock.assert_called_once_with(self.node.uuid, self.node.driver)
         get_authtoken_mock.assert_called_once_with()
+        spawn_mock.assert_called_once_with(self.service._takeover_nodes_task,
+                                           mock.ANY)
         acquire_mock.assert_called_once_with(self.context, self.node.id)
-        # assert spawn_after has been called
-        self.task.spawn_after.assert_called_once_with(
-                self.service._spawn_worker,
-                self.service._do_takeover, self.task)
+        takeover_mock.assert_called_once_with(self.task)
 
+    @mock.patch.object(manager.ConductorManager, '_do_takeover')
     @mock.patch.object(context, 'get_admin_context')
-    def test_no_free_worker(self, get_ctx_mock, get_nodeinfo_mock, mapped_mock,
-                            acquire_mock, get_authtoken_mock):
+    def test_no_free_worker(self, get_ctx_mock, takeover_mock,
+                            get_nodeinfo_mock, mapped_mock, acquire_mock,
+                            get_authtoken_mock):
         get_ctx_mock.return_value = self.context
         mapped_mock.return_value = True
-        acquire_mock.side_effect = self._get_acquire_side_effect(
-                                       [self.task] * 3)
-        self.task.spawn_after.side_effect = [
-            None,
-            exception.NoFreeConductorWorker('error')
-        ]
-
-        # 3 nodes to be checked
-        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response(
+        get_nodeinfo_mock.side_effect = self._get_nodeinfo_side_effect(
                                              [self.node] * 3)
 
-        self.service._sync_local_state(self.context)
-
-        self._assert_get_nodeinfo_args(get_nodeinfo_mock)
-
-        # assert  _mapped_to_this_conductor() gets called 2 times only
-        # instead of 3. When NoFreeConductorWorker is raised the loop
-        # should be broken
-        expected = [mock.call(self.node.uuid, self.node.driver)] * 2
-        self.assertEqual(expected, mapped_mock.call_args_list)
-
-        # assert  acquire() gets called 2 times only instead of 3. When
-        # NoFreeConductorWorker is raised the loop should be broken
-        expected = [mock.call(self.context, self.node.id)] * 2
-        self.assertEqual(expected, acquire_mock.call_args_list)
-
-        # Only one auth token needed for all runs
-        get_authtoken_mock.assert_called_once_with()
+        with mock.patch.object(self.service, '_spawn_periodic_worker',
+                               autospec=True) as spawn_mock:
+            spawn_mock.side_effect = exception.NoFreeConductorWorker()
+            self.service._sync_local_state(self.context)
 
-        # assert spawn_after has been called twice
-        expected = [mock.call(self.service._spawn_worker,
-                    self.service._do_takeover, self.task)] * 2
-        self.assertEqual(expected, self.task.spawn_after.call_args_list)
+        # The nodes are left to the next run
+        spawn_mock.assert_called_once_with(self.service._takeover_nodes_task,
+                                           mock.ANY)
+        self.assertFalse(acquire_mock.called)
+        self.assertFalse(takeover_mock.called)
 
+    @mock.patch.object(manager.ConductorManager, '_do_takeover')
     @mock.patch.object(context, 'get_admin_context')
-    def test_node_locked(self, get_ctx_mock, get_nodeinfo_mock, mapped_mock,
-                            acquire_mock, get_authtoken_mock):
+    def test_node_locked(self, get_ctx_mock, takeover_mock, get_nodeinfo_mock,
+                         mapped_mock, acquire_mock, get_authtoken_mock):
         get_ctx_mock.return_value = self.context
         mapped_mock.return_value = True
         acquire_mock.side_effect = self._get_acquire_side_effect(
                 [self.task, exception.NodeLocked('error'), self.task])
-        self.task.spawn_after.side_effect = [None, None]
 
         # 3 nodes to be checked
-        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response(
+        get_nodeinfo_mock.side_effect = self._get_nodeinfo_side_effect(
                                              [self.node] * 3)
 
-        self.service._sync_local_state(self.context)
+        with mock.patch.object(self.service, '_spawn_periodic_worker',
+                               autospec=True) as spawn_mock:
+            spawn_mock.side_effect = self._spawn_periodic_worker
+            self.service._sync_local_state(self.context)
 
-        self._assert_get_nodeinfo_args(get_nodeinfo_mock)
+        self._assert_get_nodeinfo_args(get_nodeinfo_mock, [self.node.id] * 3)
 
         # assert _mapped_to_this_conductor() gets called 3 times
         expected = [mock.call(self.node.uuid, self.node.driver)] * 3
@@ -2628,44 +3318,267 @@ class ManagerSyncLocalStateTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         expected = [mock.call(self.context, self.node.id)] * 3
         self.assertEqual(expected, acquire_mock.call_args_list)
 
-        # Only one auth token needed for all runs
-        get_authtoken_mock.assert_called_once_with()
+        # An auth token is got for each node
+        self.assertEqual(3, get_authtoken_mock.call_count)
 
-        # assert spawn_after has been called only 2 times
-        expected = [mock.call(self.service._spawn_worker,
-                    self.service._do_takeover, self.task)] * 2
-        self.assertEqual(expected, self.task.spawn_after.call_args_list)
+        # assert the takeover has been done only 2 times
+        self.assertEqual([mock.call(self.task)] * 2,
+                         takeover_mock.call_args_list)
 
+    @mock.patch.object(manager.ConductorManager, '_do_takeover')
     @mock.patch.object(context, 'get_admin_context')
-    def test_worker_limit(self, get_ctx_mock, get_nodeinfo_mock, mapped_mock,
-                          acquire_mock, get_authtoken_mock):
+    def test_worker_limit(self, get_ctx_mock, takeover_mock,
+                          get_nodeinfo_mock, mapped_mock, acquire_mock,
+                          get_authtoken_mock):
         # Limit to only 1 worker
         self.config(periodic_max_workers=1, group='conductor')
         get_ctx_mock.return_value = self.context
         mapped_mock.return_value = True
         acquire_mock.side_effect = self._get_acquire_side_effect(
                                        [self.task] * 3)
-        self.task.spawn_after.side_effect = [None] * 3
 
         # 3 nodes to be checked
-        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response(
+        get_nodeinfo_mock.side_effect = self._get_nodeinfo_side_effect(
                                              [self.node] * 3)
 
+        with mock.patch.object(self.service, '_spawn_periodic_worker',
+                               autospec=True) as spawn_mock:
+            spawn_mock.side_effect = self._spawn_periodic_worker
+            self.service._sync_local_state(self.context)
+
+        # assert only one worker took over all the nodes
+        spawn_mock.assert_called_once_with(self.service._takeover_nodes_task,
+                                           mock.ANY)
+        self.assertEqual([mock.call(self.context, self.node.id)] * 3,
+                         acquire_mock.call_args_list)
+        self.assertEqual([mock.call(self.task)] * 3,
+                         takeover_mock.call_args_list)
+
+    @mock.patch.object(manager.ConductorManager, '_do_takeover')
+    def test_auth_token_per_node(self, takeover_mock, get_nodeinfo_mock,
+                                 mapped_mock, acquire_mock,
+                                 get_authtoken_mock):
+        self.config(periodic_max_workers=1, group='conductor')
+        mapped_mock.return_value = True
+        get_authtoken_mock.side_effect = ['token1', 'token2']
+        acquire_mock.side_effect = self._get_acquire_side_effect(
+                                       [self.task] * 2)
+        get_nodeinfo_mock.side_effect = self._get_nodeinfo_side_effect(
+                                            [self.node] * 2)
+
+        with mock.patch.object(self.service, '_spawn_periodic_worker',
+                               autospec=True) as spawn_mock:
+            spawn_mock.side_effect = self._spawn_periodic_worker
+            self.service._sync_local_state(self.context)
+
+        # A token about to expire is refreshed during a long run
+        self.assertEqual(['token1', 'token2'],
+                         [call[0][0].auth_token
+                          for call in acquire_mock.call_args_list])
+
+    @mock.patch.object(manager.ConductorManager, '_do_takeover')
+    @mock.patch.object(context, 'get_admin_context')
+    def test_takeover_fails(self, get_ctx_mock, takeover_mock,
+                            get_nodeinfo_mock, mapped_mock, acquire_mock,
+                            get_authtoken_mock):
+        self.config(periodic_max_workers=1, group='conductor')
+        get_ctx_mock.return_value = self.context
+        mapped_mock.return_value = True
+        acquire_mock.side_effect = self._get_acquire_side_effect(
+                                       [self.task] * 2)
+        takeover_mock.side_effect = [exception.InstanceDeployFailure('boom'),
+                                     None]
+        get_nodeinfo_mock.side_effect = self._get_nodeinfo_side_effect(
+                                             [self.node] * 2)
+
+        with mock.patch.object(self.service, '_spawn_periodic_worker',
+                               autospec=True) as spawn_mock:
+            spawn_mock.side_effect = self._spawn_periodic_worker
+            self.service._sync_local_state(self.context)
+
+        self.assertEqual([mock.call(self.task)] * 2,
+                         takeover_mock.call_args_list)
+
+    @mock.patch.object(manager.ConductorManager, '_do_takeover')
+    @mock.patch.object(context, 'get_admin_context')
+    def test_grouped_by_images(self, get_ctx_mock, takeover_mock,
+                               get_nodeinfo_mock, mapped_mock, acquire_mock,
+                               get_authtoken_mock):
+        self.config(periodic_max_workers=1, group='conductor')
+        get_ctx_mock.return_value = self.context
+        mapped_mock.return_value = True
+        nodes = [self._create_node(id=i, driver='fake',
+                                   provision_state=states.ACTIVE,
+                                   driver_info={'deploy_kernel': kernel},
+                                   instance_info={})
+                 for i, kernel in enumerate(['k1', 'k2', 'k1', 'k2'])]
+        tasks = [self._create_task(node=nodes[i]) for i in (0, 2, 1, 3)]
+        acquire_mock.side_effect = self._get_acquire_side_effect(tasks)
+        get_nodeinfo_mock.side_effect = self._get_nodeinfo_side_effect(
+                                             nodes)
+
+        with mock.patch.object(self.service, '_spawn_periodic_worker',
+                               autospec=True) as spawn_mock:
+            spawn_mock.side_effect = self._spawn_periodic_worker
+            self.service._sync_local_state(self.context)
+
+        self.assertEqual([mock.call(self.context, i) for i in (0, 2, 1, 3)],
+                         acquire_mock.call_args_list)
+        self.assertEqual([mock.call(task) for task in tasks],
+                         takeover_mock.call_args_list)
+
+    @mock.patch.object(manager.ConductorManager, '_prepare_standby_nodes')
+    @mock.patch.object(manager.ConductorManager, '_take_over_nodes')
+    @mock.patch.object(manager.ConductorManager, '_is_primary_conductor')
+    def test_replica(self, primary_mock, take_over_mock, standby_mock,
+                     get_nodeinfo_mock, mapped_mock, acquire_mock,
+                     get_authtoken_mock):
+        self.config(hash_distribution_replicas=2)
+        mapped_mock.return_value = True
+        primary_mock.side_effect = [True, False, False, False]
+        nodes = [self._create_node(id=i, driver='fake',
+                                   provision_state=states.ACTIVE,
+                                   driver_info={'deploy_kernel': kernel},
+                                   instance_info={})
+                 for i, kernel in enumerate(['k1', 'k2', 'k1', 'k2'])]
+        get_nodeinfo_mock.side_effect = self._get_nodeinfo_side_effect(
+                                             nodes)
+
         self.service._sync_local_state(self.context)
 
-        self._assert_get_nodeinfo_args(get_nodeinfo_mock)
+        take_over_mock.assert_called_once_with([0])
+        # A single node per set of images is prepared for
+        standby_mock.assert_called_once_with([2, 1])
 
-        # assert _mapped_to_this_conductor() gets called only once
-        # because of the worker limit
-        mapped_mock.assert_called_once_with(self.node.uuid, self.node.driver)
+    @mock.patch.object(manager.ConductorManager, '_prepare_standby_nodes')
+    @mock.patch.object(manager.ConductorManager, '_is_primary_conductor')
+    def test_no_replica(self, primary_mock, standby_mock, get_nodeinfo_mock,
+                        mapped_mock, acquire_mock, get_authtoken_mock):
+        mapped_mock.return_value = True
+        get_nodeinfo_mock.side_effect = self._get_nodeinfo_side_effect()
+        acquire_mock.side_effect = self._get_acquire_side_effect(self.task)
 
-        # assert acquire() gets called only once because of the worker limit
-        acquire_mock.assert_called_once_with(self.context, self.node.id)
+        with mock.patch.object(self.service, '_spawn_periodic_worker',
+                               autospec=True) as spawn_mock:
+            spawn_mock.side_effect = self._spawn_periodic_worker
+            self.service._sync_local_state(self.context)
 
-        # Only one auth token needed for all runs
-        get_authtoken_mock.assert_called_once_with()
+        self.assertFalse(primary_mock.called)
+        self.assertFalse(standby_mock.called)
+
+    @mock.patch.object(context, 'get_admin_context')
+    def test__prepare_standby_nodes(self, get_ctx_mock, get_nodeinfo_mock,
+                                    mapped_mock, acquire_mock,
+                                    get_authtoken_mock):
+        get_ctx_mock.return_value = self.context
+        task = mock.Mock(node=self.node)
+        acquire_mock.side_effect = self._get_acquire_side_effect(
+            [task, exception.NodeNotFound(node='fake'), task])
+        task.driver.deploy.prepare_standby.side_effect = [
+            exception.InsufficientDiskSpace(path='/tftpboot', required=1,
+                                            actual=0), None]
+
+        self.service._prepare_standby_nodes([self.node.id] * 3)
+
+        self.assertEqual(3, get_authtoken_mock.call_count)
+        self.assertEqual(
+            [mock.call(self.context, self.node.id, shared=True)] * 3,
+            acquire_mock.call_args_list)
+        self.assertEqual(
+            [mock.call(task)] * 2,
+            task.driver.deploy.prepare_standby.call_args_list)
+
+    def test__is_primary_conductor(self, get_nodeinfo_mock, mapped_mock,
+                                   acquire_mock, get_authtoken_mock):
+        self.service.host = 'host1'
+        self.service.ring_manager = mock.MagicMock()
+        ring = self.service.ring_manager.__getitem__.return_value
+        ring.get_hosts.return_value = ['host1', 'host2']
+        self.assertTrue(self.service._is_primary_conductor('uuid', 'fake'))
+        ring.get_hosts.return_value = ['host2', 'host1']
+        self.assertFalse(self.service._is_primary_conductor('uuid', 'fake'))
+        ring.get_hosts.assert_called_with('uuid')
+
+    def test__is_primary_conductor_no_driver(self, get_nodeinfo_mock,
+                                             mapped_mock, acquire_mock,
+                                             get_authtoken_mock):
+        self.service.ring_manager = mock.MagicMock()
+        self.service.ring_manager.__getitem__.side_effect = (
+            exception.DriverNotFound(driver_name='fake'))
+        self.assertFalse(self.service._is_primary_conductor('uuid', 'fake'))
+
+
+@mock.patch.object(rpcapi.ConductorAPI, 'take_over_nodes')
+@mock.patch.object(dbapi.IMPL, 'get_nodeinfo_list')
+class ManagerHandOffNodesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
+
+    def setUp(self):
+        super(ManagerHandOffNodesTestCase, self).setUp()
+        self.service = manager.ConductorManager('hostname', 'test-topic')
+        self.service.conductor = mock.Mock(id=1)
+        self.service.dbapi = self.dbapi
+        self.service.ring_manager = mock.MagicMock()
+        self.hosts = {}
+        ring = self.service.ring_manager.__getitem__.return_value
+        ring.get_hosts.side_effect = lambda uuid, ignore_hosts: [
+            self.hosts[uuid]]
+        self.columns = ['id', 'uuid', 'driver', 'conductor_affinity',
+                        'driver_info', 'instance_info']
+        self.nodes = []
+        for i, host in enumerate(['host2', 'host3', 'host2']):
+            node = self._create_node(id=i, driver='fake',
+                                     conductor_affinity=1, driver_info={},
+                                     instance_info={})
+            self.hosts[node.uuid] = host
+            self.nodes.append(node)
+        self.nodes.append(self._create_node(id=3, driver='fake',
+                                            conductor_affinity=2,
+                                            driver_info={}, instance_info={}))
+
+    def test__hand_off_nodes(self, get_nodeinfo_mock, take_over_mock):
+        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response(
+                                             self.nodes)
+
+        self.service._hand_off_nodes()
+
+        get_nodeinfo_mock.assert_called_once_with(
+            columns=self.columns,
+            filters={'reserved': False, 'maintenance': False,
+                     'provision_state': states.ACTIVE})
+        self.service.ring_manager.reset.assert_called_once_with()
+        ring = self.service.ring_manager.__getitem__.return_value
+        ring.get_hosts.assert_any_call(self.nodes[0].uuid,
+                                       ignore_hosts=['hostname'])
+        self.assertEqual(2, take_over_mock.call_count)
+        take_over_mock.assert_any_call(
+            mock.ANY, [0, 2], topic=manager.MANAGER_TOPIC + '.host2',
+            timeout=600)
+        take_over_mock.assert_any_call(
+            mock.ANY, [1], topic=manager.MANAGER_TOPIC + '.host3',
+            timeout=600)
+
+    def test__hand_off_nodes_none(self, get_nodeinfo_mock, take_over_mock):
+        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response(
+                                             self.nodes[3:])
+
+        self.service._hand_off_nodes()
+
+        self.assertFalse(take_over_mock.called)
+
+    def test__hand_off_nodes_fails(self, get_nodeinfo_mock, take_over_mock):
+        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response(
+                                             self.nodes)
+        take_over_mock.side_effect = [messaging.MessagingTimeout(), 1]
+
+        self.service._hand_off_nodes()
+
+        self.assertEqual(2, take_over_mock.call_count)
+
+    @mock.patch.object(manager.ConductorManager, '_take_over_nodes')
+    def test_take_over_nodes(self, take_over_nodes_mock, get_nodeinfo_mock,
+                             take_over_mock):
+        take_over_nodes_mock.return_value = 2
 
-        # assert spawn_after has been called
-        self.task.spawn_after.assert_called_once_with(
-                self.service._spawn_worker,
-                self.service._do_takeover, self.task)
+        self.assertEqual(2, self.service.take_over_nodes(self.context,
+                                                         [1, 2]))
+        take_over_nodes_mock.assert_called_once_with([1, 2])
@@ -281,3 +281,18 @@ class RPCAPITestCase(base.DbTestCase):
                           'call',
                           version='1.21',
                           driver_name='fake-driver')
+
+    def test_take_over_nodes(self):
+        rpcapi = conductor_rpcapi.ConductorAPI(topic='fake-topic')
+        with mock.patch.object(rpcapi.client, 'prepare') as prepare_mock:
+            prepare_mock.return_value.call.return_value = 2
+
+            result = rpcapi.take_over_nodes(self.context, [1, 2],
+                                            topic='fake-topic.host',
+                                            timeout=60)
+
+        self.assertEqual(2, result)
+        prepare_mock.assert_called_once_with(topic='fake-topic.host',
+                                             version='1.22', timeout=60)
+        prepare_mock.return_value.call.assert_called_once_with(
+            self.context, 'take_over_nodes', node_ids=[1, 2])
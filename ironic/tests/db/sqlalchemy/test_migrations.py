@@ -328,6 +328,20 @@ class MigrationCheckersMixin(object):
         self.assertIsInstance(nodes.c.maintenance_reason.type,
                               sqlalchemy.types.String)
 
+    def _check_c54ca8c6e77f(self, engine, data):
+        insp = sqlalchemy.engine.reflection.Inspector.from_engine(engine)
+        node_indexes = dict((i['name'], i['column_names'])
+                            for i in insp.get_indexes('nodes'))
+        self.assertEqual(['provision_state', 'provision_updated_at'],
+                         node_indexes['provision_and_update_idx'])
+        self.assertEqual(['reservation', 'maintenance'],
+                         node_indexes['reservation_maintenance_idx'])
+        self.assertEqual(['driver'], node_indexes['driver_idx'])
+        conductor_indexes = dict((i['name'], i['column_names'])
+                                 for i in insp.get_indexes('conductors'))
+        self.assertEqual(['online', 'updated_at'],
+                         conductor_indexes['online_and_update_idx'])
+
     def test_upgrade_and_version(self):
         with patch_with_engine(self.engine):
             self.migration_api.upgrade('head')
@@ -0,0 +1,122 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests that the queries of periodic tasks and API filters use indexes."""
+
+import mock
+from sqlalchemy import event
+
+from ironic.common import states
+from ironic.conductor import manager
+import ironic.db.sqlalchemy.api as sa_api
+from ironic.tests.db import base
+from ironic.tests.db import utils
+
+
+class SqlAlchemyQueryPlanTestCase(base.DbTestCase):
+
+    # The plans below are produced by SQLite from the statements the DB API
+    # actually issues, so a change to a filter or to the models which makes
+    # a hot query fall back to a full table scan fails here.
+
+    def setUp(self):
+        super(SqlAlchemyQueryPlanTestCase, self).setUp()
+        utils.create_test_node()
+        self.engine = sa_api.get_engine()
+
+    def _get_query_plans(self, func, *args, **kwargs):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, many):
+            if statement.lstrip().upper().startswith('SELECT'):
+                statements.append((statement, parameters))
+
+        event.listen(self.engine, 'before_cursor_execute', capture)
+        try:
+            func(*args, **kwargs)
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', capture)
+
+        plans = []
+        conn = self.engine.raw_connection()
+        try:
+            for statement, parameters in statements:
+                # skip the connection liveness checks
+                if 'FROM' not in statement:
+                    continue
+                cursor = conn.cursor()
+                cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+                plans.append(' '.join(row[-1] for row in cursor.fetchall()))
+        finally:
+            conn.close()
+        return plans
+
+    def _assert_uses_index(self, plans, index=None):
+        self.assertEqual(1, len(plans))
+        if index is None:
+            self.assertIn('USING INDEX', plans[0])
+        else:
+            self.assertIn('USING INDEX %s ' % index, plans[0])
+
+    @mock.patch.object(manager.ConductorManager, '_mapped_to_this_conductor',
+                       return_value=False)
+    def test_sync_power_states_query(self, mapped_mock):
+        # Run the periodic task itself, so that the plan checked is the one
+        # of the query the conductor builds
+        service = manager.ConductorManager('hostname', 'test-topic')
+        service.dbapi = self.dbapi
+        plans = self._get_query_plans(service._sync_power_states,
+                                      self.context)
+        self.assertTrue(mapped_mock.called)
+        self._assert_uses_index(plans, 'reservation_maintenance_idx')
+
+    def test_prune_power_state_sync_records_query(self):
+        plans = self._get_query_plans(
+            self.dbapi.get_nodeinfo_list,
+            columns=['uuid', 'driver'],
+            filters={'uuids': ['fake-uuid']})
+        self._assert_uses_index(plans)
+
+    def test_check_deploy_timeouts_query(self):
+        plans = self._get_query_plans(
+            self.dbapi.get_nodeinfo_list,
+            columns=['uuid', 'driver'],
+            filters={'reserved': False,
+                     'provision_state': states.DEPLOYWAIT,
+                     'maintenance': False,
+                     'provisioned_before': 60},
+            sort_key='provision_updated_at', sort_dir='asc')
+        self._assert_uses_index(plans, 'provision_and_update_idx')
+
+    def test_sync_local_state_query(self):
+        plans = self._get_query_plans(
+            self.dbapi.get_nodeinfo_list,
+            columns=['id', 'uuid', 'driver', 'conductor_affinity'],
+            filters={'reserved': False,
+                     'maintenance': False,
+                     'provision_state': states.ACTIVE})
+        self._assert_uses_index(plans)
+
+    def test_node_list_by_driver_query(self):
+        plans = self._get_query_plans(self.dbapi.get_node_list,
+                                      filters={'driver': 'fake'})
+        self._assert_uses_index(plans, 'driver_idx')
+
+    def test_node_list_by_provision_state_query(self):
+        plans = self._get_query_plans(
+            self.dbapi.get_node_list,
+            filters={'provision_state': states.DEPLOYWAIT})
+        self._assert_uses_index(plans, 'provision_and_update_idx')
+
+    def test_get_active_driver_dict_query(self):
+        plans = self._get_query_plans(self.dbapi.get_active_driver_dict)
+        self._assert_uses_index(plans, 'online_and_update_idx')
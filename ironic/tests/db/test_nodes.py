@@ -17,6 +17,7 @@
 
 import datetime
 
+import iso8601
 import mock
 from oslo.utils import timeutils
 import six
@@ -24,6 +25,7 @@ import six
 from ironic.common import exception
 from ironic.common import states
 from ironic.common import utils as ironic_utils
+from ironic.db.sqlalchemy import api as sqlalchemy_api
 from ironic.tests.db import base
 from ironic.tests.db import utils
 
@@ -117,6 +119,15 @@ class DbNodeTestCase(base.DbTestCase):
         res = self.dbapi.get_nodeinfo_list(filters={'reserved': False})
         self.assertEqual([node2.id], [r[0] for r in res])
 
+        res = self.dbapi.get_nodeinfo_list(filters={'ids': [node2.id]})
+        self.assertEqual([node2.id], [r[0] for r in res])
+
+        res = self.dbapi.get_nodeinfo_list(filters={'ids': []})
+        self.assertEqual([], [r[0] for r in res])
+
+        res = self.dbapi.get_nodeinfo_list(filters={'uuids': [node1.uuid]})
+        self.assertEqual([node1.id], [r[0] for r in res])
+
         res = self.dbapi.get_node_list(filters={'maintenance': True})
         self.assertEqual([node2.id], [r.id for r in res])
 
@@ -157,6 +168,22 @@ class DbNodeTestCase(base.DbTestCase):
         res_uuids = [r.uuid for r in res]
         self.assertEqual(uuids.sort(), res_uuids.sort())
 
+    def test_get_node_list_use_slave(self):
+        node = utils.create_test_node()
+        with mock.patch.object(sqlalchemy_api, 'get_session',
+                               wraps=sqlalchemy_api.get_session) as mock_gs:
+            res = self.dbapi.get_node_list(use_slave=True)
+            mock_gs.assert_called_once_with(use_slave=True)
+        self.assertEqual([node.id], [r.id for r in res])
+
+    def test_get_nodeinfo_list_use_slave(self):
+        node = utils.create_test_node()
+        with mock.patch.object(sqlalchemy_api, 'get_session',
+                               wraps=sqlalchemy_api.get_session) as mock_gs:
+            res = self.dbapi.get_nodeinfo_list(use_slave=True)
+            mock_gs.assert_called_once_with(use_slave=True)
+        self.assertEqual([node.id], [r[0] for r in res])
+
     def test_get_node_list_with_filters(self):
         ch1 = utils.get_test_chassis(id=1, uuid=ironic_utils.generate_uuid())
         ch2 = utils.get_test_chassis(id=2, uuid=ironic_utils.generate_uuid())
@@ -307,6 +334,85 @@ class DbNodeTestCase(base.DbTestCase):
                           node.id,
                           {'instance_uuid': new_i_uuid_two})
 
+    def test_update_node_already_associated_no_partial_update(self):
+        node = utils.create_test_node()
+        new_i_uuid_one = ironic_utils.generate_uuid()
+        self.dbapi.update_node(node.id, {'instance_uuid': new_i_uuid_one})
+        self.assertRaises(exception.NodeAssociated,
+                          self.dbapi.update_node,
+                          node.id,
+                          {'instance_uuid': ironic_utils.generate_uuid(),
+                           'extra': {'foo': 'bar'}})
+        res = self.dbapi.get_node_by_id(node.id)
+        self.assertEqual(new_i_uuid_one, res.instance_uuid)
+        self.assertEqual(node.extra, res.extra)
+
+    def test_update_node_concurrent_update(self):
+        node = utils.create_test_node()
+        value_changed = sqlalchemy_api._value_changed
+        calls = []
+
+        def concurrent_update(old, new):
+            if not calls:
+                # Another writer updates the node after it has been read
+                calls.append(True)
+                sqlalchemy_api.get_session().query(
+                    sqlalchemy_api.models.Node).filter_by(
+                        id=node.id).update(
+                            {'extra': {'foo': 'baz'},
+                             'updated_at': datetime.datetime(2000, 1, 1)})
+            return value_changed(old, new)
+
+        with mock.patch.object(sqlalchemy_api, '_value_changed',
+                               side_effect=concurrent_update) as mock_changed:
+            res = self.dbapi.update_node(node.id, {'extra': {'foo': 'bar'}})
+
+        # The update started over from a fresh read of the node
+        self.assertEqual(2, mock_changed.call_count)
+        self.assertEqual({'foo': 'bar'}, res.extra)
+        res = self.dbapi.get_node_by_id(node.id)
+        self.assertEqual({'foo': 'bar'}, res.extra)
+        self.assertNotEqual(datetime.datetime(2000, 1, 1), res.updated_at)
+
+    def test_update_node_no_values(self):
+        node = utils.create_test_node()
+        res = self.dbapi.update_node(node.id, {})
+        self.assertEqual(node.uuid, res.uuid)
+        self.assertIsNone(res.updated_at)
+
+    def test_update_node_unchanged_values(self):
+        node = utils.create_test_node()
+        res = self.dbapi.update_node(node.id,
+                                     {'driver_info': node.driver_info,
+                                      'power_state': node.power_state})
+        self.assertEqual(node.driver_info, res.driver_info)
+        self.assertIsNone(res.updated_at)
+
+    def test_update_node_only_changed_values(self):
+        node = utils.create_test_node()
+        driver_info = dict(node.driver_info, agent_url='http://1.2.3.4')
+        res = self.dbapi.update_node(node.id,
+                                     {'driver_info': driver_info,
+                                      'power_state': node.power_state})
+        self.assertEqual(driver_info, res.driver_info)
+        self.assertIsNotNone(res.updated_at)
+        res = self.dbapi.get_node_by_id(node.id)
+        self.assertEqual(driver_info, res.driver_info)
+
+    def test_update_node_unchanged_datetime(self):
+        provision_updated_at = datetime.datetime(2000, 1, 1, 0, 0)
+        node = utils.create_test_node(
+            provision_updated_at=provision_updated_at)
+        # the objects hand over timezone-aware datetimes
+        aware = provision_updated_at.replace(tzinfo=iso8601.iso8601.Utc())
+        res = self.dbapi.update_node(node.id,
+                                     {'provision_updated_at': aware})
+        self.assertIsNone(res.updated_at)
+
+    def test_update_node_no_values_not_found(self):
+        self.assertRaises(exception.NodeNotFound, self.dbapi.update_node,
+                          ironic_utils.generate_uuid(), {})
+
     def test_update_node_instance_already_associated(self):
         node1 = utils.create_test_node(uuid=ironic_utils.generate_uuid())
         new_i_uuid = ironic_utils.generate_uuid()
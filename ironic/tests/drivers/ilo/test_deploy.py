@@ -15,6 +15,7 @@
 
 """Test class for common methods used by iLO modules."""
 
+import os
 import tempfile
 
 import mock
@@ -94,30 +95,28 @@ class IloDeployPrivateMethodsTestCase(db_base.DbTestCase):
             get_node_cap_mock.assert_called_once_with(task.node, 'boot_mode')
             self.assertIsNone(boot_iso_result)
 
-    @mock.patch.object(tempfile, 'NamedTemporaryFile')
-    @mock.patch.object(images, 'create_boot_iso')
+    @mock.patch.object(utils, 'rmtree_without_raise')
+    @mock.patch.object(tempfile, 'mkdtemp')
+    @mock.patch.object(ilo_deploy, 'BootISOImageCache')
     @mock.patch.object(swift, 'SwiftAPI')
     @mock.patch.object(ilo_deploy, '_get_boot_iso_object_name')
     @mock.patch.object(images, 'get_glance_image_property')
     @mock.patch.object(ilo_deploy, '_parse_deploy_info')
     def test__get_boot_iso_create(self, deploy_info_mock, image_prop_mock,
                                   boot_object_name_mock, swift_api_mock,
-                                  create_boot_iso_mock, tempfile_mock):
+                                  cache_mock, mkdtemp_mock, rmtree_mock):
         CONF.keystone_authtoken.auth_uri = 'http://authurl'
         CONF.ilo.swift_ilo_container = 'ilo-cont'
         CONF.pxe.pxe_append_params = 'kernel-params'
 
         swift_obj_mock = swift_api_mock.return_value
-        fileobj_mock = mock.MagicMock()
-        fileobj_mock.name = 'tmpfile'
-        mock_file_handle = mock.MagicMock(spec=file)
-        mock_file_handle.__enter__.return_value = fileobj_mock
-        tempfile_mock.return_value = mock_file_handle
+        cache_obj_mock = cache_mock.return_value
+        cache_obj_mock.master_dir = '/master'
+        mkdtemp_mock.return_value = '/master/tmpdir'
 
         deploy_info_mock.return_value = {'image_source': 'image-uuid'}
         image_prop_mock.side_effect = [None, 'kernel-uuid', 'ramdisk-uuid']
         boot_object_name_mock.return_value = 'abcdef'
-        create_boot_iso_mock.return_value = '/path/to/boot-iso'
 
         with task_manager.acquire(self.context, self.node.uuid,
                                   shared=False) as task:
@@ -130,12 +129,13 @@ class IloDeployPrivateMethodsTestCase(db_base.DbTestCase):
             image_prop_mock.assert_any_call(task.context, 'image-uuid',
                 'ramdisk_id')
             boot_object_name_mock.assert_called_once_with(task.node)
-            create_boot_iso_mock.assert_called_once_with(task.context,
-                    'tmpfile', 'kernel-uuid', 'ramdisk-uuid',
-                    'root-uuid', 'kernel-params')
-            swift_obj_mock.create_object.assert_called_once_with('ilo-cont',
-                                                                 'abcdef',
-                                                                 'tmpfile')
+            mkdtemp_mock.assert_called_once_with(dir='/master')
+            cache_obj_mock.fetch_boot_iso.assert_called_once_with(
+                    task.context, '/master/tmpdir/abcdef', 'kernel-uuid',
+                    'ramdisk-uuid', 'root-uuid', 'kernel-params')
+            swift_obj_mock.create_object.assert_called_once_with(
+                    'ilo-cont', 'abcdef', '/master/tmpdir/abcdef')
+            rmtree_mock.assert_called_once_with('/master/tmpdir')
             boot_iso_expected = 'swift:abcdef'
             self.assertEqual(boot_iso_expected, boot_iso_actual)
 
@@ -194,6 +194,51 @@ class IloDeployPrivateMethodsTestCase(db_base.DbTestCase):
             node_power_action_mock.assert_called_once_with(task, states.REBOOT)
 
 
+def _write_boot_iso(ctx, output_file, *args):
+    with open(output_file, 'w') as f:
+        f.write('iso')
+
+
+@mock.patch.object(images, 'create_boot_iso', side_effect=_write_boot_iso)
+class BootISOImageCacheTestCase(db_base.DbTestCase):
+
+    def setUp(self):
+        super(BootISOImageCacheTestCase, self).setUp()
+        self.master_dir = tempfile.mkdtemp()
+        self.addCleanup(utils.rmtree_without_raise, self.master_dir)
+        self.config(boot_iso_master_path=self.master_dir, group='ilo')
+        self.cache = ilo_deploy.BootISOImageCache()
+
+    def _fetch(self, root_uuid='root-uuid'):
+        dest_dir = tempfile.mkdtemp(dir=self.master_dir)
+        dest_path = os.path.join(dest_dir, 'boot-iso')
+        self.cache.fetch_boot_iso(self.context, dest_path, 'kernel-uuid',
+                                  'ramdisk-uuid', root_uuid, 'params')
+        return dest_path
+
+    def test_fetch_boot_iso(self, create_boot_iso_mock):
+        dest_path = self._fetch()
+        self.assertTrue(os.path.isfile(dest_path))
+        create_boot_iso_mock.assert_called_once_with(self.context, mock.ANY,
+                'kernel-uuid', 'ramdisk-uuid', 'root-uuid', 'params')
+
+    def test_fetch_boot_iso_same_inputs_shares_build(self,
+                                                     create_boot_iso_mock):
+        first_path = self._fetch()
+        second_path = self._fetch()
+        self.assertEqual(1, create_boot_iso_mock.call_count)
+        self.assertEqual(os.stat(first_path).st_ino,
+                         os.stat(second_path).st_ino)
+
+    def test_fetch_boot_iso_other_root_uuid_builds(self,
+                                                   create_boot_iso_mock):
+        first_path = self._fetch()
+        second_path = self._fetch(root_uuid='other-root-uuid')
+        self.assertEqual(2, create_boot_iso_mock.call_count)
+        self.assertNotEqual(os.stat(first_path).st_ino,
+                            os.stat(second_path).st_ino)
+
+
 class IloVirtualMediaIscsiDeployTestCase(db_base.DbTestCase):
 
     def setUp(self):
@@ -190,6 +190,8 @@ class IloManagementTestCase(db_base.DbTestCase):
     def test_get_sensor_data(self, get_sensors_data_mock, update_ipmi_mock):
         with task_manager.acquire(self.context, self.node.uuid,
                                   shared=False) as task:
-            task.driver.management.get_sensors_data(task)
+            task.driver.management.get_sensors_data(task,
+                                                    sensor_types=['Fan'])
             update_ipmi_mock.assert_called_once_with(task)
-            get_sensors_data_mock.assert_called_once_with(task)
+            get_sensors_data_mock.assert_called_once_with(
+                task, sensor_types=['Fan'])
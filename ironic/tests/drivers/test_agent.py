@@ -22,6 +22,7 @@ from ironic.common import pxe_utils
 from ironic.common import states
 from ironic.conductor import task_manager
 from ironic.drivers.modules import agent
+from ironic.drivers.modules import image_cache
 from ironic import objects
 from ironic.tests.conductor import utils as mgr_utils
 from ironic.tests.db import base as db_base
@@ -118,6 +119,19 @@ class TestAgentDeploy(db_base.DbTestCase):
             update_dhcp_mock.assert_called_once_with(
                 task, CONF.agent.agent_pxe_bootfile_name)
 
+    @mock.patch.object(image_cache.ImageCache, 'cache_image')
+    @mock.patch.object(agent, '_get_tftp_image_info')
+    def test_prepare_standby(self, mock_img_info, mock_cache_image):
+        pxe_info = {'deploy_kernel': ('kernel-uuid', '/path/kernel')}
+        mock_img_info.return_value = pxe_info
+        mock_cache_image.return_value = True
+        with task_manager.acquire(
+                self.context, self.node['uuid'], shared=True) as task:
+            task.driver.deploy.prepare_standby(task)
+            mock_img_info.assert_called_once_with(task.node)
+            mock_cache_image.assert_called_once_with('kernel-uuid',
+                                                     ctx=self.context)
+
 
 class TestAgentVendor(db_base.DbTestCase):
     def setUp(self):
@@ -108,6 +108,57 @@ class TestImageCacheFetch(base.TestCase):
         with open(self.dest_path) as fp:
             self.assertEqual("TEST", fp.read())
 
+    @mock.patch.object(images, 'download_size')
+    @mock.patch.object(image_cache.ImageCache, 'clean_up')
+    def test_cache_image(self, mock_clean_up, mock_size, mock_fetch):
+        mock_fetch.side_effect = lambda ctx, uuid, tmp_path, *args: touch(
+            tmp_path)
+        mock_size.return_value = 10
+        self.cache._cache_size = 10
+
+        self.assertTrue(self.cache.cache_image(self.uuid))
+
+        mock_size.assert_called_once_with(None, self.uuid, None)
+        self.assertTrue(os.path.isfile(self.master_path))
+        self.assertEqual(1, os.stat(self.master_path).st_nlink)
+        self.assertEqual([self.uuid], os.listdir(self.master_dir))
+        self.assertFalse(mock_clean_up.called)
+
+    @mock.patch.object(images, 'download_size')
+    def test_cache_image_master_exists(self, mock_size, mock_fetch):
+        touch(self.master_path)
+
+        self.assertTrue(self.cache.cache_image(self.uuid))
+
+        self.assertFalse(mock_size.called)
+        self.assertFalse(mock_fetch.called)
+        self.assertEqual([self.uuid], os.listdir(self.master_dir))
+
+    @mock.patch.object(images, 'download_size')
+    @mock.patch.object(image_cache.ImageCache, 'clean_up')
+    def test_cache_image_cache_full(self, mock_clean_up, mock_size,
+                                    mock_fetch):
+        other_path = os.path.join(self.master_dir, 'other')
+        with open(other_path, 'w') as fp:
+            fp.write('TEST')
+        mock_size.return_value = 7
+        self.cache._cache_size = 10
+
+        self.assertFalse(self.cache.cache_image(self.uuid))
+
+        self.assertFalse(mock_fetch.called)
+        self.assertFalse(mock_clean_up.called)
+        self.assertEqual(['other'], os.listdir(self.master_dir))
+
+    @mock.patch.object(image_cache.ImageCache, 'fetch_image')
+    def test_cache_image_no_master_dir(self, mock_fetch_image, mock_fetch):
+        self.cache.master_dir = None
+
+        self.assertFalse(self.cache.cache_image(self.uuid))
+
+        self.assertFalse(mock_fetch_image.called)
+        self.assertFalse(mock_fetch.called)
+
 
 class TestImageCacheCleanUp(base.TestCase):
 
@@ -50,6 +50,7 @@ class IPMINativePrivateMethodTestCase(db_base.DbTestCase):
                                                driver='fake_ipminative',
                                                driver_info=INFO_DICT)
         self.info = ipminative._parse_driver_info(self.node)
+        self.addCleanup(ipminative._COMMANDS.clear)
 
     def test__parse_driver_info(self):
         # make sure we get back the expected things
@@ -67,6 +68,57 @@ class IPMINativePrivateMethodTestCase(db_base.DbTestCase):
                           ipminative._parse_driver_info,
                           node)
 
+    def _get_logged_command(self):
+        ipmicmd = mock.Mock()
+        ipmicmd.ipmi_session.logged = 1
+        ipmicmd.ipmi_session.broken = False
+        return ipmicmd
+
+    @mock.patch('pyghmi.ipmi.command.Command')
+    def test__get_command_reused(self, ipmi_mock):
+        ipmi_mock.return_value = self._get_logged_command()
+
+        ipmicmd = ipminative._get_command(self.info)
+
+        self.assertEqual(ipmicmd, ipminative._get_command(self.info))
+        ipmi_mock.assert_called_once_with(bmc=self.info['address'],
+                                          userid=self.info['username'],
+                                          password=self.info['password'])
+
+    @mock.patch('pyghmi.ipmi.command.Command')
+    def test__get_command_broken_session(self, ipmi_mock):
+        broken_cmd = self._get_logged_command()
+        broken_cmd.ipmi_session.broken = True
+        ipmi_mock.side_effect = [broken_cmd, self._get_logged_command()]
+
+        ipminative._get_command(self.info)
+
+        self.assertNotEqual(broken_cmd, ipminative._get_command(self.info))
+        self.assertEqual(2, ipmi_mock.call_count)
+
+    @mock.patch('pyghmi.ipmi.command.Command')
+    def test__get_command_disabled(self, ipmi_mock):
+        self.config(session_idle_timeout=0, group='ipmi')
+        ipmi_mock.return_value = self._get_logged_command()
+
+        ipminative._get_command(self.info)
+        ipminative._get_command(self.info)
+
+        self.assertEqual(2, ipmi_mock.call_count)
+
+    @mock.patch.object(ipminative.time, 'time')
+    @mock.patch('pyghmi.ipmi.command.Command')
+    def test__get_command_idle_logout(self, ipmi_mock, time_mock):
+        self.config(session_idle_timeout=60, group='ipmi')
+        old_cmd = self._get_logged_command()
+        ipmi_mock.side_effect = [old_cmd, self._get_logged_command()]
+        time_mock.return_value = 1000
+        ipminative._get_command(self.info)
+        time_mock.return_value = 1060
+
+        self.assertNotEqual(old_cmd, ipminative._get_command(self.info))
+        old_cmd.ipmi_session.logout.assert_called_once_with()
+
     @mock.patch('pyghmi.ipmi.command.Command')
     def test__power_status_on(self, ipmi_mock):
         ipmicmd = ipmi_mock.return_value
@@ -217,6 +269,7 @@ class IPMINativeDriverTestCase(db_base.DbTestCase):
                                                driver='fake_ipminative',
                                                driver_info=INFO_DICT)
         self.info = ipminative._parse_driver_info(self.node)
+        self.addCleanup(ipminative._COMMANDS.clear)
 
     def test_get_properties(self):
         expected = ipminative.COMMON_PROPERTIES
@@ -1511,6 +1511,79 @@ class IPMIToolDriverTestCase(db_base.DbTestCase):
 
         self.assertEqual(expected_return, ret)
 
+    _FAKE_SENSORS_DATA = """
+                            Sensor ID              : Temp (0x1)
+                             Entity ID             : 3.1 (Processor)
+                             Sensor Type (Analog)  : Temperature
+                             Sensor Reading        : -58 (+/- 1) degrees C
+                             Status                : ok
+
+                            Sensor ID              : FAN MOD 1A RPM (0x30)
+                             Entity ID             : 7.1 (System Board)
+                             Sensor Type (Analog)  : Fan
+                             Sensor Reading        : 8400 (+/- 75) RPM
+                             Status                : ok
+                             """
+
+    def test__parse_ipmi_sensor_data_sensor_types(self):
+        expected_return = {
+                             'Fan': {
+                                 'FAN MOD 1A RPM (0x30)': {
+                                     'Status': 'ok',
+                                     'Sensor Reading': '8400 (+/- 75) RPM',
+                                     'Entity ID': '7.1 (System Board)',
+                                     'Sensor Type (Analog)': 'Fan',
+                                     'Sensor ID': 'FAN MOD 1A RPM (0x30)',
+                                 }
+                             }
+                          }
+        ret = ipmi._parse_ipmi_sensors_data(self.node,
+                                            self._FAKE_SENSORS_DATA,
+                                            ['fan'])
+
+        self.assertEqual(expected_return, ret)
+
+    def test__parse_ipmi_sensor_data_sensor_types_none_found(self):
+        ret = ipmi._parse_ipmi_sensors_data(self.node,
+                                            self._FAKE_SENSORS_DATA,
+                                            ['Voltage'])
+
+        self.assertEqual({}, ret)
+
+    def test__parse_ipmi_sensor_data_unknown_type(self):
+        fake_sensors_data = """
+                            Sensor ID              : Temp (0x1)
+                             Sensor Reading        : -58 (+/- 1) degrees C
+                             """
+        self.assertRaises(exception.FailedToParseSensorData,
+                          ipmi._parse_ipmi_sensors_data,
+                          self.node,
+                          fake_sensors_data)
+
+    @mock.patch.object(ipmi, '_parse_ipmi_sensors_data', autospec=True)
+    @mock.patch.object(ipmi, '_exec_ipmitool', autospec=True)
+    def test_management_interface_get_sensors_data(self, mock_exec,
+                                                   mock_parse):
+        mock_exec.return_value = ('fake-data', '')
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            ret = task.driver.management.get_sensors_data(
+                task, sensor_types=['Temperature', 'Fan'])
+
+            mock_exec.assert_called_once_with(mock.ANY, 'sdr -v')
+            mock_parse.assert_called_once_with(task.node, 'fake-data',
+                                               ['Temperature', 'Fan'])
+        self.assertEqual(mock_parse.return_value, ret)
+
+    @mock.patch.object(ipmi, '_parse_ipmi_sensors_data', autospec=True)
+    @mock.patch.object(ipmi, '_exec_ipmitool', autospec=True)
+    def test_management_interface_get_sensors_data_all(self, mock_exec,
+                                                       mock_parse):
+        mock_exec.return_value = ('fake-data', '')
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            task.driver.management.get_sensors_data(task)
+
+            mock_parse.assert_called_once_with(task.node, 'fake-data', None)
+
     def test__parse_ipmi_sensor_data_failed(self):
         fake_sensors_data = "abcdef"
         self.assertRaises(exception.FailedToParseSensorData,
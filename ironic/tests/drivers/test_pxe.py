@@ -35,6 +35,7 @@ from ironic.common import utils
 from ironic.conductor import task_manager
 from ironic.conductor import utils as manager_utils
 from ironic.drivers.modules import deploy_utils
+from ironic.drivers.modules import image_cache
 from ironic.drivers.modules import iscsi_deploy
 from ironic.drivers.modules import pxe
 from ironic.openstack.common import fileutils
@@ -543,7 +544,7 @@ class PXEDriverTestCase(db_base.DbTestCase):
             task.driver.deploy.deploy(task)
 
             mock_expire.assert_called_once_with(self.context.auth_token, 600)
-            mock_admin_token.assert_called_once_with()
+            mock_admin_token.assert_called_once_with(600)
             # ensure token file created with new token
             t_path = pxe._get_token_file_path(self.node.uuid)
             token = open(t_path, 'r').read()
@@ -585,6 +586,33 @@ class PXEDriverTestCase(db_base.DbTestCase):
             update_dhcp_mock.assert_called_once_with(
                 task, dhcp_opts)
 
+    @mock.patch.object(image_cache.ImageCache, 'cache_image')
+    @mock.patch.object(pxe, '_get_image_info')
+    def test_prepare_standby(self, mock_img_info, mock_cache_image):
+        pxe_info = {'kernel': ('kernel-uuid', '/path/kernel')}
+        mock_img_info.return_value = pxe_info
+        mock_cache_image.return_value = True
+        with task_manager.acquire(
+                self.context, self.node.uuid, shared=True) as task:
+            task.driver.deploy.prepare_standby(task)
+            mock_img_info.assert_called_once_with(task.node, self.context)
+            mock_cache_image.assert_called_once_with(
+                'kernel-uuid', ctx=self.context,
+                force_raw=CONF.force_raw_images)
+
+    @mock.patch.object(image_cache.ImageCache, 'cache_image')
+    @mock.patch.object(pxe, '_get_image_info')
+    def test_prepare_standby_cache_full(self, mock_img_info,
+                                        mock_cache_image):
+        mock_img_info.return_value = {
+            'kernel': ('kernel-uuid', '/path/kernel'),
+            'ramdisk': ('ramdisk-uuid', '/path/ramdisk')}
+        mock_cache_image.return_value = False
+        with task_manager.acquire(
+                self.context, self.node.uuid, shared=True) as task:
+            task.driver.deploy.prepare_standby(task)
+            self.assertEqual(1, mock_cache_image.call_count)
+
     @mock.patch.object(deploy_utils, 'notify_deploy_complete')
     @mock.patch.object(deploy_utils, 'switch_pxe_config')
     @mock.patch.object(iscsi_deploy, 'InstanceImageCache')
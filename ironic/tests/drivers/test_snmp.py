@@ -27,6 +27,7 @@ from pysnmp import error as snmp_error
 
 from ironic.common import exception
 from ironic.common import states
+from ironic.common import utils
 from ironic.conductor import task_manager
 from ironic.drivers.modules import snmp as snmp
 from ironic.tests import base
@@ -99,6 +100,18 @@ class SNMPClientTestCase(base.TestCase):
         mock_cmdgenerator.getCmd.assert_called_once_with(mock.ANY, mock.ANY,
                                                          self.oid)
 
+    @mock.patch.object(snmp.SNMPClient, '_get_transport')
+    @mock.patch.object(snmp.SNMPClient, '_get_auth')
+    def test_get_many(self, mock_auth, mock_transport, mock_cmdgen):
+        var_binds = [('oid1', 'value1'), ('oid2', 'value2')]
+        mock_cmdgenerator = mock_cmdgen.return_value
+        mock_cmdgenerator.getCmd.return_value = ("", None, 0, var_binds)
+        client = snmp.SNMPClient(self.address, self.port, snmp.SNMP_V3)
+        vals = client.get_many(['oid1', 'oid2'])
+        self.assertEqual(['value1', 'value2'], vals)
+        mock_cmdgenerator.getCmd.assert_called_once_with(mock.ANY, mock.ANY,
+                                                         'oid1', 'oid2')
+
     @mock.patch.object(snmp.SNMPClient, '_get_transport')
     @mock.patch.object(snmp.SNMPClient, '_get_auth')
     def test_get_err_transport(self, mock_auth, mock_transport, mock_cmdgen):
@@ -1152,3 +1165,93 @@ class SNMPDriverTestCase(db_base.DbTestCase):
             self.assertRaises(exception.PowerStateFailure,
                               task.driver.power.reboot, task)
         mock_driver.power_reset.assert_called_once_with()
+
+
+@mock.patch.object(snmp, '_get_client')
+class SNMPPowerStatesTestCase(db_base.DbTestCase):
+    """Tests for reading the power states of several nodes at once."""
+
+    def setUp(self):
+        super(SNMPPowerStatesTestCase, self).setUp()
+        mgr_utils.mock_the_extension_manager(driver='fake_snmp')
+        self.nodes = []
+        for outlet in ('1', '2', '3'):
+            info = db_utils.get_test_snmp_info(snmp_outlet=outlet)
+            node = obj_utils.create_test_node(
+                self.context, driver='fake_snmp', driver_info=info,
+                id=int(outlet), uuid=utils.generate_uuid())
+            self.nodes.append(node)
+
+    def _get_tasks(self):
+        return [mock.Mock(node=node) for node in self.nodes]
+
+    def test_get_power_states_one_request_per_pdu(self, mock_get_client):
+        mock_client = mock_get_client.return_value
+        value_on = snmp.SNMPDriverTeltronix.value_power_on
+        value_off = snmp.SNMPDriverTeltronix.value_power_off
+        mock_client.get_many.return_value = [value_on, value_off, value_on]
+        power = snmp.SNMPPower()
+        pstates = power.get_power_states(self._get_tasks())
+        self.assertEqual(1, mock_get_client.call_count)
+        self.assertEqual(1, mock_client.get_many.call_count)
+        oids = mock_client.get_many.call_args[0][0]
+        self.assertEqual(3, len(oids))
+        self.assertEqual({self.nodes[0].uuid: states.POWER_ON,
+                          self.nodes[1].uuid: states.POWER_OFF,
+                          self.nodes[2].uuid: states.POWER_ON}, pstates)
+
+    def test_get_power_states_max_oids_per_get(self, mock_get_client):
+        self.config(max_oids_per_get=2, group='snmp')
+        mock_client = mock_get_client.return_value
+        value_on = snmp.SNMPDriverTeltronix.value_power_on
+        mock_client.get_many.side_effect = [[value_on, value_on], [value_on]]
+        power = snmp.SNMPPower()
+        pstates = power.get_power_states(self._get_tasks())
+        self.assertEqual(2, mock_client.get_many.call_count)
+        self.assertEqual(2, len(mock_client.get_many.call_args_list[0][0][0]))
+        self.assertEqual(1, len(mock_client.get_many.call_args_list[1][0][0]))
+        self.assertEqual(3, len(pstates))
+
+    def test_get_power_states_per_pdu(self, mock_get_client):
+        self.nodes[2].driver_info = db_utils.get_test_snmp_info(
+            snmp_address='5.6.7.8')
+        self.nodes[2].save()
+        mock_client = mock_get_client.return_value
+        value_on = snmp.SNMPDriverTeltronix.value_power_on
+        mock_client.get_many.side_effect = [[value_on, value_on], [value_on]]
+        power = snmp.SNMPPower()
+        pstates = power.get_power_states(self._get_tasks())
+        self.assertEqual(2, mock_get_client.call_count)
+        self.assertEqual(2, mock_client.get_many.call_count)
+        self.assertEqual(3, len(pstates))
+
+    def test_get_power_states_snmp_failure(self, mock_get_client):
+        mock_client = mock_get_client.return_value
+        mock_client.get_many.side_effect = exception.SNMPFailure(
+            operation='GET', error='test-error')
+        power = snmp.SNMPPower()
+        pstates = power.get_power_states(self._get_tasks())
+        self.assertEqual({}, pstates)
+
+    def test_get_power_states_invalid_info(self, mock_get_client):
+        del self.nodes[0].driver_info['snmp_address']
+        mock_client = mock_get_client.return_value
+        value_on = snmp.SNMPDriverTeltronix.value_power_on
+        mock_client.get_many.return_value = [value_on, value_on]
+        power = snmp.SNMPPower()
+        pstates = power.get_power_states(self._get_tasks())
+        self.assertNotIn(self.nodes[0].uuid, pstates)
+        self.assertEqual(2, len(pstates))
+
+    def test_get_power_states_invalid_outlet(self, mock_get_client):
+        self.nodes[1].driver_info['snmp_outlet'] = 'not-a-number'
+        mock_client = mock_get_client.return_value
+        value_on = snmp.SNMPDriverTeltronix.value_power_on
+        value_off = snmp.SNMPDriverTeltronix.value_power_off
+        mock_client.get_many.return_value = [value_on, value_off]
+        power = snmp.SNMPPower()
+        pstates = power.get_power_states(self._get_tasks())
+        self.assertEqual(1, mock_client.get_many.call_count)
+        self.assertEqual(2, len(mock_client.get_many.call_args[0][0]))
+        self.assertEqual({self.nodes[0].uuid: states.POWER_ON,
+                          self.nodes[2].uuid: states.POWER_OFF}, pstates)
@@ -15,6 +15,7 @@
 
 """Test class for Ironic SSH power driver."""
 
+import eventlet
 import fixtures
 import mock
 import paramiko
@@ -198,6 +199,8 @@ class SSHPrivateMethodsTestCase(db_base.DbTestCase):
                         driver='fake_ssh',
                         driver_info=db_utils.get_test_ssh_info())
         self.sshclient = paramiko.SSHClient()
+        self.addCleanup(ssh._CONNECTION_POOL.clear)
+        self.addCleanup(ssh._VM_MAC_INDEX.clear)
 
     @mock.patch.object(utils, 'ssh_connect')
     def test__get_connection_client(self, ssh_connect_mock):
@@ -216,6 +219,124 @@ class SSHPrivateMethodsTestCase(db_base.DbTestCase):
         driver_info = ssh._parse_driver_info(self.node)
         ssh_connect_mock.assert_called_once_with(driver_info)
 
+    def _get_other_host_node(self):
+        driver_info = db_utils.get_test_ssh_info()
+        driver_info['ssh_address'] = '5.6.7.8'
+        return obj_utils.get_test_node(self.context, driver='fake_ssh',
+                                       driver_info=driver_info)
+
+    @mock.patch.object(utils, 'ssh_connect')
+    def test__get_connection_reused(self, ssh_connect_mock):
+        client = ssh._get_connection(self.node)
+        self.assertEqual(client, ssh._get_connection(self.node))
+        ssh_connect_mock.assert_called_once_with(mock.ANY)
+
+    @mock.patch.object(utils, 'ssh_connect')
+    def test__get_connection_reconnect_inactive(self, ssh_connect_mock):
+        old_client = mock.Mock()
+        old_client.get_transport.return_value.is_active.return_value = False
+        new_client = mock.Mock()
+        ssh_connect_mock.side_effect = [old_client, new_client]
+        with ssh._connection(self.node):
+            pass
+        self.assertEqual(new_client, ssh._get_connection(self.node))
+        old_client.close.assert_called_once_with()
+        self.assertEqual(2, ssh_connect_mock.call_count)
+
+    @mock.patch.object(utils, 'ssh_connect')
+    def test__get_connection_per_host(self, ssh_connect_mock):
+        other_node = self._get_other_host_node()
+        ssh_connect_mock.side_effect = [mock.Mock(), mock.Mock()]
+        client = ssh._get_connection(self.node)
+        self.assertNotEqual(client, ssh._get_connection(other_node))
+        self.assertEqual(2, ssh_connect_mock.call_count)
+
+    @mock.patch.object(utils, 'ssh_connect')
+    def test__get_connection_pool_size(self, ssh_connect_mock):
+        self.config(connection_pool_size=1, group='ssh')
+        other_node = self._get_other_host_node()
+        client = mock.Mock()
+        ssh_connect_mock.side_effect = [client, mock.Mock()]
+        with ssh._connection(self.node):
+            pass
+        ssh._get_connection(other_node)
+        client.close.assert_called_once_with()
+
+    @mock.patch.object(utils, 'ssh_connect')
+    def test__get_connection_pool_size_checked_out(self, ssh_connect_mock):
+        self.config(connection_pool_size=1, group='ssh')
+        other_node = self._get_other_host_node()
+        client = mock.Mock()
+        ssh_connect_mock.side_effect = [client, mock.Mock()]
+        checked_out = eventlet.event.Event()
+        released = eventlet.event.Event()
+
+        def _use_connection():
+            with ssh._connection(self.node):
+                checked_out.send()
+                released.wait()
+
+        thread = eventlet.spawn(_use_connection)
+        checked_out.wait()
+        with ssh._connection(other_node):
+            pass
+        self.assertFalse(client.close.called)
+        released.send()
+        thread.wait()
+        client.close.assert_called_once_with()
+
+    @mock.patch.object(utils, 'ssh_connect')
+    def test__connection_shared(self, ssh_connect_mock):
+        self.config(connection_pool_size=1, group='ssh')
+        other_node = self._get_other_host_node()
+        client = mock.Mock()
+        ssh_connect_mock.side_effect = [client, mock.Mock()]
+        with ssh._connection(self.node):
+            with ssh._connection(self.node):
+                pass
+            with ssh._connection(other_node):
+                pass
+            self.assertFalse(client.close.called)
+        client.close.assert_called_once_with()
+
+    @mock.patch.object(utils, 'ssh_connect')
+    def test__get_connection_pool_disabled(self, ssh_connect_mock):
+        self.config(connection_pool_size=0, group='ssh')
+        client = mock.Mock()
+        ssh_connect_mock.side_effect = [client, mock.Mock()]
+        with ssh._connection(self.node):
+            ssh._get_connection(self.node)
+            self.assertFalse(client.close.called)
+        self.assertEqual(2, ssh_connect_mock.call_count)
+        client.close.assert_called_once_with()
+
+    @mock.patch.object(ssh.time, 'time')
+    @mock.patch.object(utils, 'ssh_connect')
+    def test__get_connection_idle_timeout(self, ssh_connect_mock, time_mock):
+        self.config(connection_idle_timeout=60, group='ssh')
+        client = mock.Mock()
+        ssh_connect_mock.side_effect = [client, mock.Mock()]
+        time_mock.return_value = 1000
+        with ssh._connection(self.node):
+            pass
+        time_mock.return_value = 1061
+        self.assertNotEqual(client, ssh._get_connection(self.node))
+        client.close.assert_called_once_with()
+
+    @mock.patch.object(ssh.time, 'time')
+    @mock.patch.object(utils, 'ssh_connect')
+    def test__get_connection_idle_timeout_checked_out(self, ssh_connect_mock,
+                                                      time_mock):
+        self.config(connection_idle_timeout=60, group='ssh')
+        client = mock.Mock()
+        ssh_connect_mock.side_effect = [client, mock.Mock()]
+        time_mock.return_value = 1000
+        with ssh._connection(self.node):
+            time_mock.return_value = 1061
+            self.assertNotEqual(client, ssh._get_connection(self.node))
+            self.assertFalse(client.close.called)
+        client.close.assert_called_once_with()
+
     @mock.patch.object(processutils, 'ssh_execute')
     def test__ssh_execute(self, exec_ssh_mock):
         ssh_cmd = "somecmd"
@@ -306,65 +427,140 @@ class SSHPrivateMethodsTestCase(db_base.DbTestCase):
     def test__get_hosts_name_for_node_match(self, exec_ssh_mock):
         info = ssh._parse_driver_info(self.node)
         info['macs'] = ["11:11:11:11:11:11", "52:54:00:cf:2d:31"]
-        ssh_cmd = "%s %s" % (info['cmd_set']['base_cmd'],
-                             info['cmd_set']['list_all'])
-
-        cmd_to_exec = "%s %s" % (info['cmd_set']['base_cmd'],
-                                 info['cmd_set']['get_node_macs'])
-        cmd_to_exec = cmd_to_exec.replace('{_NodeName_}', 'NodeName')
-        exec_ssh_mock.side_effect = [('NodeName', ''),
-                                          ('52:54:00:cf:2d:31', '')]
-        expected = [mock.call(self.sshclient, ssh_cmd),
-                    mock.call(self.sshclient, cmd_to_exec)]
+        exec_ssh_mock.return_value = ('OtherNode 52:54:00:cf:2d:32\n'
+                                      'NodeName 52:54:00:cf:2d:31\n', '')
 
         found_name = ssh._get_hosts_name_for_node(self.sshclient, info)
 
         self.assertEqual('NodeName', found_name)
-        self.assertEqual(expected, exec_ssh_mock.call_args_list)
+        exec_ssh_mock.assert_called_once_with(self.sshclient, mock.ANY)
 
     @mock.patch.object(processutils, 'ssh_execute')
     def test__get_hosts_name_for_node_no_match(self, exec_ssh_mock):
         info = ssh._parse_driver_info(self.node)
         info['macs'] = ["11:11:11:11:11:11", "22:22:22:22:22:22"]
-        exec_ssh_mock.side_effect = [('NodeName', ''),
-                                          ('52:54:00:cf:2d:31', '')]
-
-        ssh_cmd = "%s %s" % (info['cmd_set']['base_cmd'],
-                             info['cmd_set']['list_all'])
-
-        cmd_to_exec = "%s %s" % (info['cmd_set']['base_cmd'],
-                                 info['cmd_set']['get_node_macs'])
-
-        cmd_to_exec = cmd_to_exec.replace('{_NodeName_}', 'NodeName')
-        expected = [mock.call(self.sshclient, ssh_cmd),
-                    mock.call(self.sshclient, cmd_to_exec)]
+        exec_ssh_mock.return_value = ('NodeName 52:54:00:cf:2d:31\n', '')
 
         found_name = ssh._get_hosts_name_for_node(self.sshclient, info)
 
         self.assertIsNone(found_name)
-        self.assertEqual(expected, exec_ssh_mock.call_args_list)
+        exec_ssh_mock.assert_called_once_with(self.sshclient, mock.ANY)
 
     @mock.patch.object(processutils, 'ssh_execute')
     def test__get_hosts_name_for_node_exception(self, exec_ssh_mock):
         info = ssh._parse_driver_info(self.node)
         info['macs'] = ["11:11:11:11:11:11", "52:54:00:cf:2d:31"]
-        ssh_cmd = "%s %s" % (info['cmd_set']['base_cmd'],
-                             info['cmd_set']['list_all'])
-
-        cmd_to_exec = "%s %s" % (info['cmd_set']['base_cmd'],
-                                 info['cmd_set']['get_node_macs'])
-        cmd_to_exec = cmd_to_exec.replace('{_NodeName_}', 'NodeName')
-
-        exec_ssh_mock.side_effect = [('NodeName', ''),
-                                     processutils.ProcessExecutionError]
-        expected = [mock.call(self.sshclient, ssh_cmd),
-                    mock.call(self.sshclient, cmd_to_exec)]
+        exec_ssh_mock.side_effect = processutils.ProcessExecutionError
 
         self.assertRaises(exception.SSHCommandFailed,
                           ssh._get_hosts_name_for_node,
                           self.sshclient,
                           info)
-        self.assertEqual(expected, exec_ssh_mock.call_args_list)
+        exec_ssh_mock.assert_called_once_with(self.sshclient, mock.ANY)
+
+    @mock.patch.object(processutils, 'ssh_execute')
+    def test__get_hosts_name_for_node_cached(self, exec_ssh_mock):
+        info = ssh._parse_driver_info(self.node)
+        info['macs'] = ["52:54:00:cf:2d:31"]
+        exec_ssh_mock.return_value = ('NodeName 52:54:00:cf:2d:31\n', '')
+
+        ssh._get_hosts_name_for_node(self.sshclient, info)
+        found_name = ssh._get_hosts_name_for_node(self.sshclient, info)
+
+        self.assertEqual('NodeName', found_name)
+        exec_ssh_mock.assert_called_once_with(self.sshclient, mock.ANY)
+
+    @mock.patch.object(processutils, 'ssh_execute')
+    def test__get_hosts_name_for_node_cache_miss(self, exec_ssh_mock):
+        info = ssh._parse_driver_info(self.node)
+        info['macs'] = ["52:54:00:cf:2d:31"]
+        exec_ssh_mock.side_effect = [
+            ('OtherNode 52:54:00:cf:2d:32\n', ''),
+            ('OtherNode 52:54:00:cf:2d:32\nNodeName 52:54:00:cf:2d:31\n',
+             '')]
+        other_info = dict(info, macs=["52:54:00:cf:2d:32"])
+        ssh._get_hosts_name_for_node(self.sshclient, other_info)
+
+        found_name = ssh._get_hosts_name_for_node(self.sshclient, info)
+
+        self.assertEqual('NodeName', found_name)
+        self.assertEqual(2, exec_ssh_mock.call_count)
+
+    @mock.patch.object(ssh.time, 'time')
+    @mock.patch.object(processutils, 'ssh_execute')
+    def test__get_hosts_name_for_node_cache_expired(self, exec_ssh_mock,
+                                                    time_mock):
+        self.config(vm_mac_cache_timeout=60, group='ssh')
+        info = ssh._parse_driver_info(self.node)
+        info['macs'] = ["52:54:00:cf:2d:31"]
+        exec_ssh_mock.side_effect = [('OldName 52:54:00:cf:2d:31\n', ''),
+                                     ('NewName 52:54:00:cf:2d:31\n', '')]
+        time_mock.return_value = 1000
+        ssh._get_hosts_name_for_node(self.sshclient, info)
+        time_mock.return_value = 1060
+
+        found_name = ssh._get_hosts_name_for_node(self.sshclient, info)
+
+        self.assertEqual('NewName', found_name)
+        self.assertEqual(2, exec_ssh_mock.call_count)
+
+    @mock.patch.object(processutils, 'ssh_execute')
+    def test__get_hosts_name_for_node_cache_disabled(self, exec_ssh_mock):
+        self.config(vm_mac_cache_timeout=0, group='ssh')
+        info = ssh._parse_driver_info(self.node)
+        info['macs'] = ["52:54:00:cf:2d:31"]
+        exec_ssh_mock.return_value = ('NodeName 52:54:00:cf:2d:31\n', '')
+
+        ssh._get_hosts_name_for_node(self.sshclient, info)
+        ssh._get_hosts_name_for_node(self.sshclient, info)
+
+        self.assertEqual(2, exec_ssh_mock.call_count)
+
+    @mock.patch.object(processutils, 'ssh_execute')
+    def test__list_vm_macs(self, exec_ssh_mock):
+        info = ssh._parse_driver_info(self.node)
+        exec_ssh_mock.return_value = ('Node 1 52:54:00:CF:2D:31\n'
+                                      'Node 1 52-54-00-cf-2d-32\n'
+                                      '\n'
+                                      'Node2 52:54:00:cf:2d:33\n', '')
+
+        vm_macs = ssh._list_vm_macs(self.sshclient, info)
+
+        self.assertEqual({'525400cf2d31': 'Node 1',
+                          '525400cf2d32': 'Node 1',
+                          '525400cf2d33': 'Node2'}, vm_macs)
+        cmd = exec_ssh_mock.call_args[0][1]
+        self.assertIn(info['cmd_set']['list_all'], cmd)
+        self.assertNotIn('{_NodeName_}', cmd)
+        self.assertIn('"$_NodeName_"', cmd)
+        self.assertIn(') </dev/null | while read -r _Mac_;', cmd)
+
+    @mock.patch.object(processutils, 'ssh_execute')
+    def test__list_vm_macs_quoted_node_name(self, exec_ssh_mock):
+        info = ssh._parse_driver_info(self.node)
+        info['cmd_set'] = ssh._get_command_sets('parallels')
+        exec_ssh_mock.return_value = ('', '')
+
+        ssh._list_vm_macs(self.sshclient, info)
+
+        cmd = exec_ssh_mock.call_args[0][1]
+        self.assertIn(' "$_NodeName_" ', cmd)
+        self.assertNotIn('""$_NodeName_""', cmd)
+
+    @mock.patch.object(processutils, 'ssh_execute')
+    def test__ssh_execute_on_vm_failure_drops_vm_macs(self, exec_ssh_mock):
+        info = ssh._parse_driver_info(self.node)
+        info['macs'] = ["52:54:00:cf:2d:31"]
+        exec_ssh_mock.return_value = ('NodeName 52:54:00:cf:2d:31\n', '')
+        ssh._get_hosts_name_for_node(self.sshclient, info)
+        self.assertEqual(1, len(ssh._VM_MAC_INDEX))
+        exec_ssh_mock.side_effect = processutils.ProcessExecutionError
+
+        self.assertRaises(exception.SSHCommandFailed,
+                          ssh._ssh_execute_on_vm,
+                          self.sshclient, info, 'start NodeName')
+
+        self.assertEqual({}, ssh._VM_MAC_INDEX)
 
     @mock.patch.object(processutils, 'ssh_execute')
     @mock.patch.object(ssh, '_get_power_status')
@@ -573,6 +769,8 @@ class SSHDriverTestCase(db_base.DbTestCase):
         self.port = obj_utils.create_test_port(self.context,
                                                node_id=self.node.id)
         self.sshclient = paramiko.SSHClient()
+        self.addCleanup(ssh._CONNECTION_POOL.clear)
+        self.addCleanup(ssh._VM_MAC_INDEX.clear)
 
     @mock.patch.object(utils, 'ssh_connect')
     def test__validate_info_ssh_connect_failed(self, ssh_connect_mock):
@@ -941,3 +1139,104 @@ class SSHDriverTestCase(db_base.DbTestCase):
         with task_manager.acquire(self.context, node.uuid) as task:
             self.assertRaises(exception.MissingParameterValue,
                               task.driver.management.validate, task)
+
+    def _create_other_node(self, address='52:54:00:cf:2d:32', **info):
+        driver_info = db_utils.get_test_ssh_info()
+        driver_info.update(info)
+        node = obj_utils.create_test_node(self.context,
+                                          id=self.node.id + 1,
+                                          uuid=utils.generate_uuid(),
+                                          driver='fake_ssh',
+                                          driver_info=driver_info)
+        obj_utils.create_test_port(self.context, id=self.port.id + 1,
+                                   uuid=utils.generate_uuid(),
+                                   node_id=node.id, address=address)
+        return node
+
+    def _get_power_states(self, nodes):
+        with task_manager.acquire(self.context, nodes[0].uuid,
+                                  shared=True) as task:
+            tasks = [task]
+            for node in nodes[1:]:
+                tasks.append(task_manager.acquire(self.context, node.uuid,
+                                                  shared=True))
+            return task.driver.power.get_power_states(tasks)
+
+    @mock.patch.object(ssh, '_get_connection')
+    @mock.patch.object(ssh, '_ssh_execute')
+    def test_get_power_states(self, exec_mock, get_conn_mock):
+        other_node = self._create_other_node()
+        get_conn_mock.return_value = self.sshclient
+        exec_mock.side_effect = [['"NodeA" {1}', ''],
+                                 ['NodeA 52:54:00:cf:2d:31',
+                                  'NodeB 52:54:00:cf:2d:32', '']]
+
+        power_states = self._get_power_states([self.node, other_node])
+
+        self.assertEqual({self.node.uuid: states.POWER_ON,
+                          other_node.uuid: states.POWER_OFF}, power_states)
+        get_conn_mock.assert_called_once_with(mock.ANY)
+        # list_running is run once for both nodes
+        self.assertEqual(2, exec_mock.call_count)
+
+    @mock.patch.object(ssh, '_get_connection')
+    @mock.patch.object(ssh, '_ssh_execute')
+    def test_get_power_states_per_host(self, exec_mock, get_conn_mock):
+        other_node = self._create_other_node(ssh_address='5.6.7.8')
+        get_conn_mock.return_value = self.sshclient
+        exec_mock.side_effect = [['"NodeA" {1}', ''],
+                                 ['NodeA 52:54:00:cf:2d:31', ''],
+                                 [''],
+                                 ['NodeB 52:54:00:cf:2d:32', '']]
+
+        power_states = self._get_power_states([self.node, other_node])
+
+        self.assertEqual(2, len(power_states))
+        self.assertEqual(2, get_conn_mock.call_count)
+
+    @mock.patch.object(ssh, '_get_connection')
+    def test_get_power_states_connect_failed(self, get_conn_mock):
+        get_conn_mock.side_effect = exception.SSHConnectFailed(host='fake')
+
+        power_states = self._get_power_states([self.node])
+
+        self.assertEqual({}, power_states)
+
+    @mock.patch.object(ssh, '_get_connection')
+    @mock.patch.object(ssh, '_ssh_execute')
+    def test_get_power_states_node_not_found(self, exec_mock, get_conn_mock):
+        other_node = self._create_other_node()
+        get_conn_mock.return_value = self.sshclient
+        exec_mock.side_effect = [['"NodeA" {1}', ''],
+                                 ['NodeA 52:54:00:cf:2d:31', ''],
+                                 ['NodeA 52:54:00:cf:2d:31', '']]
+
+        power_states = self._get_power_states([self.node, other_node])
+
+        self.assertEqual({self.node.uuid: states.POWER_ON}, power_states)
+
+    def test_get_power_states_invalid_info(self):
+        node = obj_utils.create_test_node(self.context,
+                                          uuid=utils.generate_uuid(),
+                                          id=self.node.id + 1,
+                                          driver='fake_ssh')
+
+        power_states = self._get_power_states([node])
+
+        self.assertEqual({}, power_states)
+
+    @mock.patch.object(ssh, '_get_connection')
+    @mock.patch.object(ssh, '_get_power_status')
+    def test_get_power_states_per_node_list_running(self, get_status_mock,
+                                                    get_conn_mock):
+        other_node = self._create_other_node(ssh_virt_type='vmware')
+        self.node.driver_info = other_node.driver_info
+        self.node.save()
+        get_conn_mock.return_value = self.sshclient
+        get_status_mock.side_effect = [states.POWER_ON,
+                                       exception.NodeNotFound(node='fake')]
+
+        power_states = self._get_power_states([self.node, other_node])
+
+        self.assertEqual({self.node.uuid: states.POWER_ON}, power_states)
+        self.assertEqual(2, get_status_mock.call_count)
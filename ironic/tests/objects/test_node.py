@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+
 import mock
 from testtools.matchers import HasLength
 
@@ -71,6 +73,32 @@ class TestNodeObject(base.DbTestCase):
                         uuid, {'properties': {"fake": "property"}})
                 self.assertEqual(self.context, n._context)
 
+    def test_save_no_changes(self):
+        uuid = self.fake_node['uuid']
+        with mock.patch.object(self.dbapi, 'get_node_by_uuid',
+                               autospec=True) as mock_get_node:
+            mock_get_node.return_value = self.fake_node
+            with mock.patch.object(self.dbapi, 'update_node',
+                                   autospec=True) as mock_update_node:
+
+                n = objects.Node.get(self.context, uuid)
+                n.save()
+
+                self.assertFalse(mock_update_node.called)
+
+    def test_save_datetime_loaded_from_db(self):
+        db_node = utils.create_test_node(
+            provision_updated_at=datetime.datetime(2000, 1, 1, 0, 0))
+        n = objects.Node.get(self.context, db_node.uuid)
+        n.provision_updated_at = n.provision_updated_at
+        n.maintenance = True
+        n.save()
+
+        db_node = self.dbapi.get_node_by_uuid(db_node.uuid)
+        self.assertTrue(db_node.maintenance)
+        self.assertEqual(datetime.datetime(2000, 1, 1, 0, 0),
+                         db_node.provision_updated_at)
+
     def test_refresh(self):
         uuid = self.fake_node['uuid']
         returns = [dict(self.fake_node, properties={"fake": "first"}),
@@ -95,6 +123,16 @@ class TestNodeObject(base.DbTestCase):
             self.assertIsInstance(nodes[0], objects.Node)
             self.assertEqual(self.context, nodes[0]._context)
 
+    def test_list_use_slave(self):
+        with mock.patch.object(self.dbapi, 'get_node_list',
+                               autospec=True) as mock_get_list:
+            mock_get_list.return_value = [self.fake_node]
+            nodes = objects.Node.list(self.context, use_slave=True)
+            self.assertThat(nodes, HasLength(1))
+            mock_get_list.assert_called_once_with(
+                filters=None, limit=None, marker=None, sort_key=None,
+                sort_dir=None, use_slave=True)
+
     def test_reserve(self):
         with mock.patch.object(self.dbapi, 'reserve_node',
                                autospec=True) as mock_reserve:
@@ -458,6 +458,134 @@ class TestGlanceImageService(base.TestCase):
         self.assertEqual(self.NOW_DATETIME, image_meta['created_at'])
         self.assertEqual(self.NOW_DATETIME, image_meta['updated_at'])
 
+    def _create_active_image(self, **kwargs):
+        image_id = self.service.create(self._make_fixture(**kwargs))['id']
+        # The status is read only, set it as glance would on upload.
+        self.service.client.update(image_id, status='active')
+        return image_id
+
+    def test_show_caches_active_images(self):
+        image_id = self._create_active_image(name='image1', is_public=True)
+
+        with mock.patch.object(self.service.client.images, 'get',
+                               wraps=self.service.client.get) as get_mock:
+            image_meta = self.service.show(image_id)
+            self.assertEqual(image_meta, self.service.show(image_id))
+            get_mock.assert_called_once_with(image_id)
+
+    def test_show_does_not_cache_inactive_images(self):
+        fixture = self._make_fixture(name='image1', is_public=True)
+        image_id = self.service.create(fixture)['id']
+        self.service.client.update(image_id, status='saving')
+
+        with mock.patch.object(self.service.client.images, 'get',
+                               wraps=self.service.client.get) as get_mock:
+            self.service.show(image_id)
+            self.service.show(image_id)
+            self.assertEqual(2, get_mock.call_count)
+
+    @mock.patch.object(base_image_service.time, 'time')
+    def test_show_cache_expires(self, time_mock):
+        self.config(image_metadata_cache_ttl=60, group='glance')
+        image_id = self._create_active_image(name='image1', is_public=True)
+
+        with mock.patch.object(self.service.client.images, 'get',
+                               wraps=self.service.client.get) as get_mock:
+            time_mock.return_value = 1000
+            self.service.show(image_id)
+            time_mock.return_value = 1060
+            self.service.show(image_id)
+            self.assertEqual(1, get_mock.call_count)
+            time_mock.return_value = 1061
+            self.service.show(image_id)
+            self.assertEqual(2, get_mock.call_count)
+
+    def test_show_cache_size(self):
+        self.config(image_metadata_cache_size=2, group='glance')
+        image_ids = [self._create_active_image(name='image%d' % i,
+                                               is_public=True)
+                     for i in range(3)]
+
+        for image_id in image_ids:
+            self.service.show(image_id)
+
+        self.assertEqual(image_ids[1:],
+                         [key[-1] for key in base_image_service._IMAGE_CACHE])
+
+    def test_show_cache_per_credentials(self):
+        image_id = self._create_active_image(name='image1', is_public=False)
+        other_context = context.RequestContext(auth_token='other-token')
+        other_service = service.Service(self.service.client, 1, other_context)
+
+        with mock.patch.object(self.service.client.images, 'get',
+                               wraps=self.service.client.get) as get_mock:
+            self.service.show(image_id)
+            other_service.show(image_id)
+            self.assertEqual(2, get_mock.call_count)
+            self.service.show(image_id)
+            self.assertEqual(2, get_mock.call_count)
+
+    def test_show_cache_per_endpoint(self):
+        image_id = self._create_active_image(name='image1', is_public=True)
+
+        with mock.patch.object(self.service.client.images, 'get',
+                               wraps=self.service.client.get) as get_mock:
+            self.service.show(image_id)
+            self.service.show('glance://%s' % image_id)
+            self.assertEqual(1, get_mock.call_count)
+            self.service.show('http://host1:9292/v1/images/%s' % image_id)
+            self.service.show('http://host2:9292/v1/images/%s' % image_id)
+            self.assertEqual(3, get_mock.call_count)
+
+    def test_show_cache_per_api_version(self):
+        image_id = self._create_active_image(name='image1', is_public=True)
+        v2_service = service.Service(self.service.client, 2, self.context)
+
+        with mock.patch.object(self.service.client.images, 'get',
+                               wraps=self.service.client.get) as get_mock:
+            self.service.show(image_id)
+            v2_service.show(image_id)
+            self.assertEqual(2, get_mock.call_count)
+            self.service.show(image_id)
+            v2_service.show(image_id)
+            self.assertEqual(2, get_mock.call_count)
+
+    def test_update_invalidates_image_of_all_api_versions(self):
+        image_id = self._create_active_image(name='image1', is_public=True)
+        v2_service = service.Service(self.service.client, 2, self.context)
+        self.service.show(image_id)
+        v2_service.show(image_id)
+
+        self.service.update(image_id, {'name': 'image2'})
+
+        self.assertEqual({}, base_image_service._IMAGE_CACHE)
+        self.assertEqual('image2', v2_service.show(image_id)['name'])
+
+    def test_show_cache_disabled(self):
+        self.config(image_metadata_cache_ttl=0, group='glance')
+        image_id = self._create_active_image(name='image1', is_public=True)
+
+        self.service.show(image_id)
+
+        self.assertEqual({}, base_image_service._IMAGE_CACHE)
+
+    def test_show_cached_checks_access(self):
+        image_id = self._create_active_image(name='image1', is_public=False)
+        self.service.show(image_id)
+
+        self.context.auth_token = False
+        self.assertRaises(exception.ImageNotFound,
+                          self.service.show,
+                          image_id)
+
+    def test_update_invalidates_cached_image(self):
+        image_id = self._create_active_image(name='image1', is_public=True)
+        self.service.show(image_id)
+
+        self.service.update(image_id, {'name': 'image2'})
+
+        self.assertEqual('image2', self.service.show(image_id)['name'])
+
     def test_download_with_retries(self):
         tries = [0]
 
@@ -14,6 +14,7 @@
 #    under the License.
 
 import hashlib
+import time
 
 import mock
 from oslo.config import cfg
@@ -248,3 +249,19 @@ class HashRingManagerTestCase(db_base.DbTestCase):
         self.assertRaises(exception.DriverNotFound,
                           self.ring_manager.__getitem__,
                           'driver1')
+
+    @mock.patch.object(time, 'time')
+    def test_hash_ring_manager_refresh_after_interval(self, mock_time):
+        CONF.set_override('hash_ring_reset_interval', 30)
+        mock_time.return_value = 1000
+        self.assertRaises(exception.DriverNotFound,
+                          self.ring_manager.__getitem__,
+                          'driver1')
+        self.register_conductors()
+        mock_time.return_value = 1030
+        self.assertRaises(exception.DriverNotFound,
+                          self.ring_manager.__getitem__,
+                          'driver1')
+        mock_time.return_value = 1031
+        ring = self.ring_manager['driver1']
+        self.assertEqual(sorted(['host1', 'host2']), sorted(ring.hosts))
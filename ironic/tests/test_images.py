@@ -19,6 +19,7 @@
 import os
 import shutil
 
+import fixtures
 import mock
 from oslo.concurrency import processutils
 from oslo.config import cfg
@@ -28,6 +29,7 @@ from ironic.common import exception
 from ironic.common import image_service
 from ironic.common import images
 from ironic.common import utils
+from ironic.common import vfat
 from ironic.openstack.common import imageutils
 from ironic.tests import base
 
@@ -245,97 +247,49 @@ class FsImageTestCase(base.TestCase):
         dirname_mock.assert_any_call('root_dir/sub_dir/b3')
         mkdir_mock.assert_called_once_with('root_dir/sub_dir')
 
-    @mock.patch.object(images, '_create_root_fs')
-    @mock.patch.object(utils, 'tempdir')
-    @mock.patch.object(utils, 'write_to_file')
-    @mock.patch.object(utils, 'dd')
-    @mock.patch.object(utils, 'umount')
-    @mock.patch.object(utils, 'mount')
-    @mock.patch.object(utils, 'mkfs')
-    def test_create_vfat_image(self, mkfs_mock, mount_mock, umount_mock,
-            dd_mock, write_mock, tempdir_mock, create_root_fs_mock):
+    def _get_temp_path(self, name):
+        temp_dir = self.useFixture(fixtures.TempDir()).path
+        return os.path.join(temp_dir, name)
 
-        mock_file_handle = mock.MagicMock(spec=file)
-        mock_file_handle.__enter__.return_value = 'tempdir'
-        tempdir_mock.return_value = mock_file_handle
+    @mock.patch.object(vfat, 'create_image')
+    def test_create_vfat_image(self, create_image_mock):
+        src_file = self._get_temp_path('src')
+        utils.write_to_file(src_file, 'file-contents')
+        output_file = self._get_temp_path('output')
 
         parameters = {'p1': 'v1'}
-        files_info = {'a': 'b'}
-        images.create_vfat_image('tgt_file', parameters=parameters,
+        files_info = {src_file: 'b'}
+        images.create_vfat_image(output_file, parameters=parameters,
                 files_info=files_info, parameters_file='qwe',
                 fs_size_kib=1000)
 
-        dd_mock.assert_called_once_with('/dev/zero',
-                                         'tgt_file',
-                                         'count=1',
-                                         'bs=1000KiB')
+        create_image_mock.assert_called_once_with(mock.ANY,
+                {'b': 'file-contents', 'qwe': 'p1=v1'}, 1000)
+        self.assertEqual(output_file, create_image_mock.call_args[0][0].name)
 
-        mkfs_mock.assert_called_once_with('vfat', 'tgt_file')
-        mount_mock.assert_called_once_with('tgt_file', 'tempdir',
-                                           '-o', 'umask=0')
+    def test_create_vfat_image_writes_image(self):
+        output_file = self._get_temp_path('output')
 
-        parameters_file_path = os.path.join('tempdir', 'qwe')
-        write_mock.assert_called_once_with(parameters_file_path, 'p1=v1')
-        create_root_fs_mock.assert_called_once_with('tempdir', files_info)
-        umount_mock.assert_called_once_with('tempdir')
+        images.create_vfat_image(output_file, parameters={'p1': 'v1'})
 
-    @mock.patch.object(images, '_create_root_fs')
-    @mock.patch.object(utils, 'tempdir')
-    @mock.patch.object(utils, 'dd')
-    @mock.patch.object(utils, 'umount')
-    @mock.patch.object(utils, 'mount')
-    @mock.patch.object(utils, 'mkfs')
-    def test_create_vfat_image_always_umount(self, mkfs_mock, mount_mock,
-            umount_mock, dd_mock, tempdir_mock, create_root_fs_mock):
+        self.assertEqual(100 * 1024, os.path.getsize(output_file))
 
-        mock_file_handle = mock.MagicMock(spec=file)
-        mock_file_handle.__enter__.return_value = 'tempdir'
-        tempdir_mock.return_value = mock_file_handle
-        files_info = {'a': 'b'}
-        create_root_fs_mock.side_effect = OSError()
+    @mock.patch.object(vfat, 'create_image')
+    def test_create_vfat_image_read_fails(self, create_image_mock):
+        output_file = self._get_temp_path('output')
+        files_info = {'/does/not/exist': 'b'}
         self.assertRaises(exception.ImageCreationFailed,
-                          images.create_vfat_image, 'tgt_file',
+                          images.create_vfat_image, output_file,
                           files_info=files_info)
+        self.assertFalse(create_image_mock.called)
 
-        umount_mock.assert_called_once_with('tempdir')
-
-    @mock.patch.object(utils, 'dd')
-    def test_create_vfat_image_dd_fails(self, dd_mock):
-
-        dd_mock.side_effect = processutils.ProcessExecutionError
-        self.assertRaises(exception.ImageCreationFailed,
-                          images.create_vfat_image, 'tgt_file')
-
-    @mock.patch.object(utils, 'tempdir')
-    @mock.patch.object(utils, 'dd')
-    @mock.patch.object(utils, 'mkfs')
-    def test_create_vfat_image_mkfs_fails(self, mkfs_mock, dd_mock,
-                                          tempdir_mock):
-
-        mock_file_handle = mock.MagicMock(spec=file)
-        mock_file_handle.__enter__.return_value = 'tempdir'
-        tempdir_mock.return_value = mock_file_handle
-
-        mkfs_mock.side_effect = processutils.ProcessExecutionError
-        self.assertRaises(exception.ImageCreationFailed,
-                          images.create_vfat_image, 'tgt_file')
-
-    @mock.patch.object(images, '_create_root_fs')
-    @mock.patch.object(utils, 'tempdir')
-    @mock.patch.object(utils, 'dd')
-    @mock.patch.object(utils, 'umount')
-    @mock.patch.object(utils, 'mount')
-    @mock.patch.object(utils, 'mkfs')
-    def test_create_vfat_image_umount_fails(self, mkfs_mock, mount_mock,
-            umount_mock, dd_mock, tempdir_mock, create_root_fs_mock):
-
-        mock_file_handle = mock.MagicMock(spec=file)
-        mock_file_handle.__enter__.return_value = 'tempdir'
-        tempdir_mock.return_value = mock_file_handle
-        umount_mock.side_effect = processutils.ProcessExecutionError
-
+    @mock.patch.object(vfat, 'create_image')
+    def test_create_vfat_image_does_not_fit(self, create_image_mock):
+        output_file = self._get_temp_path('output')
+        create_image_mock.side_effect = ValueError()
         self.assertRaises(exception.ImageCreationFailed,
-                          images.create_vfat_image, 'tgt_file')
+                          images.create_vfat_image, output_file,
+                          parameters={'p1': 'v1'})
 
     def test__generate_isolinux_cfg(self):
 
@@ -12,8 +12,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+
 from keystoneclient import exceptions as ksexception
 import mock
+from oslo.utils import timeutils
 
 from ironic.common import exception
 from ironic.common import keystone
@@ -28,6 +31,9 @@ class FakeCatalog:
 class FakeClient:
     def __init__(self, **kwargs):
         self.service_catalog = FakeCatalog()
+        self.auth_ref = mock.Mock()
+        self.auth_ref.will_expire_soon.return_value = False
+        self.auth_token = 'fake-token'
 
     def has_service_catalog(self):
         return True
@@ -41,6 +47,8 @@ class KeystoneTestCase(base.TestCase):
                     auth_uri='http://127.0.0.1:9898/',
                     admin_user='fake', admin_password='fake',
                     admin_tenant_name='fake')
+        self.addCleanup(keystone._ADMIN_CLIENT.clear)
+        self.addCleanup(keystone._SERVICE_URLS.clear)
 
     def test_failure_authorization(self):
         self.assertRaises(exception.KeystoneFailure, keystone.get_service_url)
@@ -117,3 +125,69 @@ class KeystoneTestCase(base.TestCase):
         fake_client.auth_token = '123456'
         mock_ks.return_value = fake_client
         self.assertEqual('123456', keystone.get_admin_auth_token())
+
+    @mock.patch('keystoneclient.v2_0.client.Client')
+    def test_get_admin_auth_token_cached(self, mock_ks):
+        fake_client = FakeClient()
+        fake_client.auth_token = '123456'
+        mock_ks.return_value = fake_client
+        self.assertEqual('123456', keystone.get_admin_auth_token())
+        self.assertEqual('123456', keystone.get_admin_auth_token(600))
+        mock_ks.assert_called_once_with(username='fake', password='fake',
+                                        tenant_name='fake',
+                                        auth_url='http://127.0.0.1:9898/v2.0')
+        fake_client.auth_ref.will_expire_soon.assert_called_once_with(
+            stale_duration=600)
+
+    @mock.patch('keystoneclient.v2_0.client.Client')
+    def test_get_admin_auth_token_expires_soon(self, mock_ks):
+        old_client = FakeClient()
+        old_client.auth_ref.will_expire_soon.return_value = True
+        new_client = FakeClient()
+        new_client.auth_token = 'new-token'
+        mock_ks.side_effect = [old_client, new_client]
+        keystone.get_admin_auth_token()
+        self.assertEqual('new-token', keystone.get_admin_auth_token())
+        self.assertEqual(2, mock_ks.call_count)
+
+    @mock.patch('keystoneclient.v2_0.client.Client')
+    def test_get_admin_auth_token_config_changed(self, mock_ks):
+        mock_ks.return_value = FakeClient()
+        keystone.get_admin_auth_token()
+        self.config(group='keystone_authtoken', admin_user='other')
+        keystone.get_admin_auth_token()
+        self.assertEqual(2, mock_ks.call_count)
+
+    @mock.patch.object(FakeCatalog, 'url_for')
+    @mock.patch('keystoneclient.v2_0.client.Client')
+    def test_get_service_url_cached(self, mock_ks, mock_uf):
+        mock_uf.return_value = 'http://127.0.0.1:6385'
+        mock_ks.return_value = FakeClient()
+        keystone.get_service_url()
+        self.assertEqual('http://127.0.0.1:6385', keystone.get_service_url())
+        mock_uf.assert_called_once_with(service_type='baremetal',
+                                        endpoint_type='internal')
+        self.assertEqual(1, mock_ks.call_count)
+
+    @mock.patch('keystoneclient.v2_0.client.Client')
+    def test_token_expires_soon(self, mock_ks):
+        fake_client = FakeClient()
+        fake_client.auth_ref.expires = (timeutils.utcnow() +
+                                        datetime.timedelta(seconds=300))
+        mock_ks.return_value = fake_client
+        self.assertFalse(keystone.token_expires_soon('user-token', 200))
+        self.assertTrue(keystone.token_expires_soon('user-token', 400))
+        # Keystone is asked every time, a revoked token must not be trusted
+        mock_ks.assert_called_with(token='user-token',
+                                   auth_url='http://127.0.0.1:9898/v2.0')
+        self.assertEqual(2, mock_ks.call_count)
+
+    @mock.patch('keystoneclient.v2_0.client.Client')
+    def test_token_expires_soon_admin_token(self, mock_ks):
+        fake_client = FakeClient()
+        fake_client.auth_ref.expires = (timeutils.utcnow() +
+                                        datetime.timedelta(seconds=300))
+        mock_ks.return_value = fake_client
+        token = keystone.get_admin_auth_token()
+        self.assertFalse(keystone.token_expires_soon(token))
+        self.assertEqual(1, mock_ks.call_count)
@@ -0,0 +1,189 @@
+# Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import struct
+import tempfile
+
+import six
+
+from ironic.common import utils
+from ironic.common import vfat
+from ironic.tests import base
+
+
+def _read_image(image):
+    """Returns the files of a FAT12 image as a dict path -> contents."""
+    (jump, oem, sector_size, sectors_per_cluster, reserved, num_fats,
+     root_entries, total_sectors, media, fat_sectors, sectors_per_track,
+     heads, hidden, total_sectors_32, drive, _res, boot_sig, volume_id,
+     label, fs_type) = vfat._BOOT_SECTOR.unpack_from(image)
+    cluster_size = sector_size * sectors_per_cluster
+    fat = bytearray(image[reserved * sector_size:
+                          (reserved + fat_sectors) * sector_size])
+    root_start = (reserved + num_fats * fat_sectors) * sector_size
+    data_start = root_start + root_entries * vfat.DIR_ENTRY_SIZE
+
+    def next_cluster(cluster):
+        offset = cluster * 3 // 2
+        value = fat[offset] | (fat[offset + 1] << 8)
+        return value >> 4 if cluster % 2 else value & 0xFFF
+
+    def read_chain(cluster):
+        contents = b''
+        while 2 <= cluster < 0xFF8:
+            offset = data_start + (cluster - 2) * cluster_size
+            contents += image[offset:offset + cluster_size]
+            cluster = next_cluster(cluster)
+        return contents
+
+    def read_dir(entries, prefix, files):
+        long_name = b''
+        for i in range(0, len(entries), vfat.DIR_ENTRY_SIZE):
+            entry = entries[i:i + vfat.DIR_ENTRY_SIZE]
+            if entry[0:1] == b'\x00':
+                break
+            if bytearray(entry)[11] == vfat.ATTR_LONG_NAME:
+                long_name = (entry[1:11] + entry[14:26] + entry[28:32] +
+                             long_name)
+                continue
+            (short_name, attributes, _nt, _tenth, _ctime, _cdate, _adate,
+             _hi, _wtime, _wdate, cluster, size) = vfat._DIR_ENTRY.unpack(
+                 entry)
+            if long_name:
+                name = long_name.decode('utf-16-le').split(u'\x00')[0]
+                long_name = b''
+            else:
+                name = short_name[:8].decode('ascii').rstrip()
+                ext = short_name[8:].decode('ascii').rstrip()
+                if ext:
+                    name += '.' + ext
+            if name in ('.', '..'):
+                continue
+            path = prefix + name
+            if attributes & vfat.ATTR_DIRECTORY:
+                read_dir(read_chain(cluster), path + '/', files)
+            else:
+                files[path] = read_chain(cluster)[:size]
+        return files
+
+    return read_dir(image[root_start:data_start], '', {})
+
+
+class VfatTestCase(base.TestCase):
+
+    def _create_image(self, files, size_kib=100):
+        fileobj = six.BytesIO()
+        vfat.create_image(fileobj, files, size_kib)
+        return fileobj.getvalue()
+
+    def test_create_image(self):
+        files = {'parameters.txt': b'key1=value1\nkey2=value2',
+                 'token': b'auth-token'}
+        image = self._create_image(files)
+
+        self.assertEqual(100 * 1024, len(image))
+        self.assertEqual(b'\x55\xaa', image[510:512])
+        self.assertEqual(b'FAT12   ', image[54:62])
+        self.assertEqual(files, _read_image(image))
+
+    def test_create_image_text_contents(self):
+        files = {'parameters.txt': u'key=caf\xe9 \u2603'}
+        image = self._create_image(files)
+        self.assertEqual({'parameters.txt': u'key=caf\xe9 \u2603'.encode(
+                              'utf-8')},
+                         _read_image(image))
+
+    def test_create_image_directories(self):
+        files = {'dir/sub dir/file.txt': b'a',
+                 'dir/other': b'b',
+                 'empty': b''}
+        self.assertEqual(files, _read_image(self._create_image(files)))
+
+    def test_create_image_multiple_clusters(self):
+        files = {'big': b'0123456789' * 1000}
+        self.assertEqual(files, _read_image(self._create_image(files)))
+
+    def test_create_image_large(self):
+        files = {'big': b'x' * (3 * 1024 * 1024)}
+        image = self._create_image(files, size_kib=4096)
+        sectors_per_cluster = struct.unpack_from('<B', image, 13)[0]
+        self.assertEqual(2, sectors_per_cluster)
+        self.assertEqual(files, _read_image(image))
+
+    def test_create_image_short_names(self):
+        files = {'README': b'a',
+                 'long file name 1.txt': b'b',
+                 'long file name 2.txt': b'c'}
+        image = self._create_image(files)
+        self.assertEqual(files, _read_image(image))
+        self.assertIn(b'README     ', image)
+        self.assertIn(b'LONGFI~1TXT', image)
+        self.assertIn(b'LONGFI~2TXT', image)
+
+    def test_create_image_does_not_fit(self):
+        self.assertRaises(ValueError, self._create_image,
+                          {'big': b'x' * 100 * 1024})
+
+    def test_create_image_too_many_root_files(self):
+        files = dict(('file%d' % i, b'') for i in range(200))
+        self.assertRaises(ValueError, self._create_image, files)
+
+    def test_create_image_file_and_directory(self):
+        self.assertRaises(ValueError, self._create_image,
+                          {'a': b'', 'a/b': b''})
+
+    def test__get_short_name(self):
+        used = set()
+        self.assertEqual((b'FILE    TXT', False),
+                         vfat._get_short_name('FILE.TXT', used))
+        self.assertEqual((b'FILE~1  TXT', True),
+                         vfat._get_short_name('file.txt', used))
+        self.assertEqual((b'ARCHIV~1GZ ', True),
+                         vfat._get_short_name('archive.tar.gz', used))
+
+
+class MtoolsVfatTestCase(base.TestCase):
+    """Reads the images back with mtools, rather than with _read_image."""
+
+    def setUp(self):
+        super(MtoolsVfatTestCase, self).setUp()
+        try:
+            utils.execute('mdir', '-V')
+        except OSError as exc:
+            self.skipTest('mtools were not found: %s' % exc)
+        fd, self.image_file = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.unlink, self.image_file)
+
+    def _mtools(self, *cmd):
+        env = os.environ.copy()
+        env['MTOOLS_SKIP_CHECK'] = '1'
+        return utils.execute(*cmd, env_variables=env)[0]
+
+    def test_create_image(self):
+        files = {'parameters.txt': u'key1=value1\nkey2=caf\xe9',
+                 'long file name.txt': b'b',
+                 'dir/sub dir/file': b'0123456789' * 1000}
+        with open(self.image_file, 'wb') as fileobj:
+            vfat.create_image(fileobj, files, 100)
+
+        listing = self._mtools('mdir', '-i', self.image_file, '::/')
+        self.assertIn('long file name.txt', listing)
+        self.assertIn('parameters.txt', listing)
+        for path, contents in files.items():
+            if isinstance(contents, six.text_type):
+                contents = contents.encode('utf-8')
+            self.assertEqual(contents, self._mtools(
+                'mtype', '-i', self.image_file, '::/' + path))